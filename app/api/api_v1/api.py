@@ -1,4 +1,4 @@
-from app.api.api_v1.endpoints import health, users, auth, orders, tracking
+from app.api.api_v1.endpoints import health, users, auth, orders, tracking, events
 from fastapi import APIRouter #nao apagar
 api_router = APIRouter()
 api_router.include_router(health.router, prefix="/health", tags=["health"])
@@ -6,3 +6,4 @@ api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
 api_router.include_router(orders.router, prefix="/orders", tags=["orders"])
 api_router.include_router(tracking.router, prefix="/track", tags=["tracking"])
+api_router.include_router(events.router, prefix="/events", tags=["events"])
@@ -1,38 +1,126 @@
 from datetime import timedelta
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.user import User
-from app.schemas.auth_schema import Token
-from app.services.db_service import get_db
-from app.utils.security import verify_password, create_access_token
+from app.schemas.auth_schema import RefreshTokenRequest, Token
+from app.services.db_service import get_async_db
+from app.services.session_service import (
+    InvalidRefreshToken,
+    create_session,
+    find_session_id,
+    revoke_session,
+    rotate_refresh_token,
+)
+from app.utils.security import password_hasher, create_access_token
 from app.core.config import settings
 
 router = APIRouter()
 
 
+def _token_response(user_id: int, role: str, session_id: str, refresh_token: str) -> dict:
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+
+    access_token = create_access_token(
+        data={"sub": str(user_id), "role": role, "sid": session_id},  # pode ser id ou email, aqui usei id
+        expires_delta=access_token_expires,
+    )
+
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+
 @router.post("/login", response_model=Token)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     # OAuth2PasswordRequestForm usa `username`, mas no nosso caso é o email
-    user = db.query(User).filter(User.email == form_data.username).first()
+    user = await db.scalar(select(User).where(User.email == form_data.username))
 
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    # bcrypt roda no pool dedicado, fora do event loop
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = await password_hasher.verify_and_update(
+            form_data.password, user.hashed_password
+        )
+    else:
+        await password_hasher.dummy_verify()
+
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="E-mail ou senha incorretos.",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    refresh_token, session_id = create_session(db, user.id)
+    user_id, role = user.id, user.role
 
-    access_token = create_access_token(
-        data={"sub": str(user.id)},  # pode ser id ou email, aqui usei id
-        expires_delta=access_token_expires,
+    # Custo do bcrypt mudou: regrava o hash junto com a nova sessão
+    if new_hash:
+        user.hashed_password = new_hash
+
+    try:
+        await db.commit()
+    except SQLAlchemyError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erro ao iniciar sessão. Tente novamente.",
+        )
+
+    return _token_response(user_id, role, session_id, refresh_token)
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh(
+    body: RefreshTokenRequest,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Renova o access token sem senha (e sem bcrypt).
+    O refresh token é de uso único: a resposta traz um novo.
+    """
+    invalid_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Refresh token inválido ou expirado.",
+        headers={"WWW-Authenticate": "Bearer"},
     )
 
-    return {"access_token": access_token, "token_type": "bearer"}
+    try:
+        user_id, refresh_token, session_id = await rotate_refresh_token(db, body.refresh_token)
+
+        user = await db.get(User, user_id)
+        if user is None:
+            raise invalid_exception
+        role = user.role
+
+        await db.commit()
+
+    except InvalidRefreshToken:
+        raise invalid_exception
+    except SQLAlchemyError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erro ao renovar sessão. Tente novamente.",
+        )
+
+    return _token_response(user_id, role, session_id, refresh_token)
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    body: RefreshTokenRequest,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Encerra a sessão: invalida o refresh token e os access tokens emitidos por ela"""
+    session_id = await find_session_id(db, body.refresh_token)
+    if session_id is not None:
+        await revoke_session(db, session_id)
+        await db.commit()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
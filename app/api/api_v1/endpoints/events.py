@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.schemas.event_schema import ChangeFeedPage
+from app.services.auth_service import Principal, get_current_admin
+from app.services.db_service import get_async_db
+from app.services.outbox_service import assign_positions, change_to_dict, fetch_changes
+
+router = APIRouter()
+
+
+@router.get("/changes", response_model=ChangeFeedPage)
+async def list_changes(
+    since: int = Query(0, ge=0, description="next_cursor da leitura anterior (0 = desde o início)"),
+    limit: int = Query(100, ge=1, le=settings.OUTBOX_FEED_PAGE_SIZE_MAX),
+    db: AsyncSession = Depends(get_async_db),
+    admin: Principal = Depends(get_current_admin),
+):
+    """
+    🔐 ADMIN ONLY — Feed de mudanças de pedidos (criação e status), em ordem.
+
+    Para sistemas externos que sincronizam por polling: guarde o
+    `next_cursor` e envie como `since` na próxima chamada. Lista vazia =
+    em dia. A ordem é a de commit (`position`), então nenhum evento fica
+    para trás do cursor.
+    """
+    # Não depende do dispatcher: eventos recém-commitados já aparecem
+    await assign_positions(db)
+    rows = await fetch_changes(db, since, limit)
+    return {
+        "items": [change_to_dict(row) for row in rows],
+        "next_cursor": rows[-1].position if rows else since,
+    }
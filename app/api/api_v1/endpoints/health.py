@@ -1,7 +1,55 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+
+from app.database import get_pool_status
+from app.services.auth_service import Principal, get_auth_cache_stats, get_current_admin
+from app.services.viacep_service import get_cep_cache_stats
+from app.services.geocoding_service import get_geocoding_stats, get_geocode_cache_stats
+from app.services.outbox_service import get_outbox_stats
+from app.services.tracking_hub import get_tracking_hub_stats
+from app.utils.security import password_hasher
 
 router = APIRouter()
 
 @router.get("/health")
 def health_check():
     return {"status": "ok"}
+
+
+@router.get("/caches")
+def cache_stats():
+    """Métricas dos caches de integrações externas e de autenticação (hits/misses)"""
+    return {
+        "cep": get_cep_cache_stats(),
+        "geocode": get_geocode_cache_stats(),
+        "auth": get_auth_cache_stats(),
+    }
+
+
+@router.get("/geocoding")
+def geocoding_stats():
+    """Métricas da fila de geocoding (Nominatim)"""
+    return get_geocoding_stats()
+
+
+@router.get("/db-pool")
+def db_pool_status():
+    """Conexões em uso/ociosas e tempo de espera dos pools do banco"""
+    return get_pool_status()
+
+
+@router.get("/password-hashing")
+def password_hashing_stats():
+    """Pool do bcrypt: operações na fila e tempo de espera"""
+    return password_hasher.stats()
+
+
+@router.get("/tracking-stream")
+def tracking_stream_stats():
+    """Assinantes do rastreio ao vivo e mensagens entregues/descartadas"""
+    return get_tracking_hub_stats()
+
+
+@router.get("/outbox")
+def outbox_stats(admin: Principal = Depends(get_current_admin)):
+    """🔐 ADMIN ONLY — Entrega do outbox: eventos entregues e falhas por webhook"""
+    return get_outbox_stats()
@@ -1,28 +1,68 @@
+import asyncio
 import uuid
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy.exc import SQLAlchemyError
+from collections import defaultdict
+from functools import partial
+from datetime import date, datetime, timedelta, timezone
+from enum import Enum
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import bindparam, insert, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, joinedload
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
-from app.models.user import User
 from app.models.address import Address
-from app.models.order import Order, OrderStatus
+from app.models.order import FINAL_STATUSES, Order, OrderStatus
 from app.models.order_event import OrderEvent, STATUS_LABELS
+from app.models.geocoding_job import GeocodingJob
+from app.models.scan_idempotency_key import ScanIdempotencyKey
+from app.models.outbox_event import OutboxEvent
 from app.schemas.order_schema import (
+    OrderBulkCreate,
+    OrderBulkItemResult,
+    OrderBulkResponse,
     OrderCreate,
     OrderResponse,
     OrderListResponse,
+    OrderPage,
+    OrderScan,
+    OrderScanBatch,
+    OrderScanBatchResponse,
+    OrderScanResult,
+    OrderStats,
     OrderStatusUpdate,
 )
 from app.schemas.address_schema import AddressCreateByCEP
-from app.services.db_service import get_db
-from app.services.auth_service import get_current_user, get_current_admin
+from app.services.db_service import get_async_db
+from app.services.auth_service import CurrentUser, Principal, get_current_user, get_current_admin
 from app.models.user import UserRole
+from app.core.config import settings
+from app.database import run_after_commit
 from app.services.viacep_service import fetch_address_by_cep, AddressFromCEP
-from app.services.geocoding_service import geocode_address, geocode_by_cep, Coordinates
+from app.services.geocoding_service import (
+    geocode_address,
+    geocode_by_cep,
+    nominatim_scheduler,
+    Coordinates,
+)
+from app.services.geocoding_worker import geocoding_worker
+from app.services.analytics_service import load_order_stats, record_order_event
+from app.services.outbox_service import add_outbox_event, notify_outbox_on_commit, outbox_row
+from app.services.tracking_cache import invalidate_tracking_on_commit
+from app.services.tracking_hub import (
+    publish_tracking_event_on_commit,
+    publish_tracking_update,
+    tracking_event_payload,
+)
+from app.services.export_service import build_export_query, stream_csv, stream_ndjson
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.rate_limiter import PRIORITY_SPECULATIVE
 
 router = APIRouter()
 
-# --- NOVO ENDPOINT ADICIONADO ---
+OriginAddress = aliased(Address)
+DestinationAddress = aliased(Address)
+
 @router.get("/cep/{cep}", response_model=AddressFromCEP)
 async def get_address_preview(cep: str):
     """
@@ -36,7 +76,6 @@ async def get_address_preview(cep: str):
             detail="CEP não encontrado"
         )
     return address
-# --------------------------------
 
 def generate_tracking_code() -> str:
     """Gera um código de rastreio único"""
@@ -44,57 +83,143 @@ def generate_tracking_code() -> str:
 
 
 def create_order_event(
-    db: Session,
-    order_id: int,
+    db: AsyncSession,
+    order: Order,
     new_status: str,
     description: str | None = None,
+    new_order: bool = False,
 ) -> OrderEvent:
-    """Cria um evento de tracking para o pedido"""
+    """
+    Cria um evento de tracking para o pedido e, na mesma transação, sua
+    entrada no outbox, o resumo da timeline em `orders` e os rollups
+    diários do painel. Os endereços do pedido já devem estar carregados
+    (a UF entra nos rollups). Quando a transação for commitada, o rastreio
+    público cacheado é invalidado e o evento é enviado a quem acompanha o
+    código ao vivo.
+
+    Em pedido existente o contador é incrementado no próprio UPDATE (sem
+    perder eventos concorrentes) e `order.event_count` fica expirado: quem
+    precisar ler faz `await db.refresh(order, ["event_count"])`. Com
+    `new_order` (evento inicial) o resumo já foi gravado no INSERT do
+    pedido: o evento usa o mesmo `last_event_at` e `orders` não recebe
+    UPDATE.
+    """
     event = OrderEvent(
-        order_id=order_id,
+        order_id=order.id,
         status=new_status,
         status_label=STATUS_LABELS.get(new_status, new_status),
         description=description,
+        created_at=order.last_event_at if new_order else datetime.utcnow(),
     )
     db.add(event)
+    if not new_order:
+        order.last_event_label = event.status_label
+        order.last_event_at = event.created_at
+        order.event_count = Order.event_count + 1
+    add_outbox_event(db, order, event)
+    record_order_event(
+        db,
+        new_status,
+        event.created_at,
+        order.origin_address.state,
+        order.destination_address.state,
+        delivery_seconds=(event.created_at - order.created_at).total_seconds(),
+    )
+    invalidate_tracking_on_commit(db, order.tracking_code)
+    publish_tracking_event_on_commit(db, order.tracking_code, event)
     return event
 
 
+# Resultado de _within_deadline quando o deadline estoura (≠ None = não encontrado)
+TIMED_OUT = object()
+
+
+async def _within_deadline(aw, deadline: float, default=None):
+    """Aguarda `aw` até o deadline (tempo do event loop); retorna `default` se estourar"""
+    remaining = deadline - asyncio.get_running_loop().time()
+    try:
+        return await asyncio.wait_for(aw, timeout=max(remaining, 0))
+    except asyncio.TimeoutError:
+        return default
+
+
 async def fetch_address_data(
     address_data: AddressCreateByCEP,
+    deadline: float,
+    geocode: bool = True,
 ) -> tuple[AddressFromCEP, Coordinates | None]:
     """
     Busca dados do endereço via APIs externas (ViaCEP + Nominatim).
     Faz isso ANTES de qualquer operação no banco para evitar dados órfãos.
+
+    O geocoding só pelo CEP (fallback) é disparado em paralelo com o ViaCEP,
+    já que só depende do CEP, mas só se a fila do Nominatim tiver folga: com
+    o limite público (1 request/s) ele roubaria o token da busca completa.
+    Vai com prioridade menor e, se o geocoding completo acertar, é cancelado
+    (sai da fila sem gastar token se ainda não tiver começado).
+    Coordenadas são opcionais: se o deadline estourar, seguem como None.
+    Com `geocode=False` só consulta o ViaCEP (geocoding fica para o worker).
     """
-    # Busca dados do CEP
-    cep_data = await fetch_address_by_cep(address_data.cep)
-    
-    if not cep_data:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"CEP '{address_data.cep}' não encontrado ou inválido.",
+    cep_task = asyncio.create_task(fetch_address_by_cep(address_data.cep))
+    fallback_task = None
+    if (
+        geocode
+        and settings.GEOCODE_SPECULATIVE_CEP_FALLBACK
+        # Um token para o fallback e outro para a busca completa
+        and nominatim_scheduler.spare_tokens() >= 2
+    ):
+        fallback_task = asyncio.create_task(
+            geocode_by_cep(address_data.cep, priority=PRIORITY_SPECULATIVE)
         )
-    
-    street = cep_data.street or "Endereço não informado"
-    
-    # Tenta buscar coordenadas (não bloqueia se falhar)
-    coords = await geocode_address(
-        street=street,
-        number=address_data.number,
-        city=cep_data.city,
-        state=cep_data.state,
-    )
-    
-    # Fallback: tenta geocoding só pelo CEP
-    if not coords:
-        coords = await geocode_by_cep(address_data.cep)
-    
-    return cep_data, coords
+
+    try:
+        # Busca dados do CEP (obrigatório)
+        remaining = deadline - asyncio.get_running_loop().time()
+        try:
+            cep_data = await asyncio.wait_for(cep_task, timeout=max(remaining, 0))
+        except asyncio.TimeoutError:
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail=f"Tempo esgotado ao consultar o CEP '{address_data.cep}'.",
+            )
+
+        if not cep_data:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"CEP '{address_data.cep}' não encontrado ou inválido.",
+            )
+
+        if not geocode:
+            return cep_data, None
+
+        street = cep_data.street or "Endereço não informado"
+
+        # Tenta buscar coordenadas (não bloqueia se falhar)
+        coords = await _within_deadline(
+            geocode_address(
+                street=street,
+                number=address_data.number,
+                city=cep_data.city,
+                state=cep_data.state,
+                cep=cep_data.cep,
+            ),
+            deadline,
+        )
+
+        # Fallback: geocoding só pelo CEP. Se o especulativo ainda estiver na
+        # fila, esta chamada é agrupada com ele e o promove a interativo
+        if not coords:
+            coords = await _within_deadline(geocode_by_cep(address_data.cep), deadline)
+
+        return cep_data, coords
+    finally:
+        cep_task.cancel()
+        if fallback_task is not None:
+            fallback_task.cancel()
 
 
 def create_address_from_data(
-    db: Session,
+    db: AsyncSession,
     address_input: AddressCreateByCEP,
     cep_data: AddressFromCEP,
     coords: Coordinates | None,
@@ -117,8 +242,8 @@ def create_address_from_data(
 @router.post("/", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
 async def create_order(
     order_data: OrderCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     """
     Cria um novo pedido com endereços de origem e destino.
@@ -128,9 +253,26 @@ async def create_order(
     """
     
     # 1️⃣ Busca dados externos ANTES de tocar no banco
-    # Se falhar aqui, não há nada para rollback
-    origin_cep_data, origin_coords = await fetch_address_data(order_data.origin_address)
-    dest_cep_data, dest_coords = await fetch_address_data(order_data.destination_address)
+    # Se falhar aqui, não há nada para rollback.
+    # Origem e destino são resolvidos em paralelo, com um deadline comum.
+    # Com GEOCODE_IN_BACKGROUND, as coordenadas são preenchidas depois pelo worker.
+    geocode_now = not settings.GEOCODE_IN_BACKGROUND
+    deadline = asyncio.get_running_loop().time() + settings.ADDRESS_RESOLUTION_TIMEOUT_SECONDS
+    origin_task = asyncio.create_task(
+        fetch_address_data(order_data.origin_address, deadline, geocode=geocode_now)
+    )
+    dest_task = asyncio.create_task(
+        fetch_address_data(order_data.destination_address, deadline, geocode=geocode_now)
+    )
+    try:
+        (origin_cep_data, origin_coords), (dest_cep_data, dest_coords) = (
+            await asyncio.gather(origin_task, dest_task)
+        )
+    except BaseException:
+        # Se um lado falhar, não faz sentido esperar o outro
+        origin_task.cancel()
+        dest_task.cancel()
+        raise
     
     # 2️⃣ Transação atômica: tudo ou nada
     try:
@@ -142,83 +284,484 @@ async def create_order(
             db, order_data.destination_address, dest_cep_data, dest_coords
         )
         
-        db.flush()  # Obtém IDs dos endereços
+        await db.flush()  # Obtém IDs dos endereços
+
+        # Agenda o geocoding na mesma transação (sobrevive a restarts)
+        geocoding_jobs = [
+            GeocodingJob(address_id=address.id)
+            for address, coords in ((origin, origin_coords), (destination, dest_coords))
+            if coords is None and not geocode_now
+        ]
+        db.add_all(geocoding_jobs)
         
         # Cria o pedido
         order = Order(
             tracking_code=generate_tracking_code(),
             status=OrderStatus.CREATED.value,
             owner_id=current_user.id,
-            origin_address_id=origin.id,
-            destination_address_id=destination.id,
+            origin_address=origin,
+            destination_address=destination,
+            # Resumo da timeline já com o evento inicial (vai no próprio INSERT)
+            last_event_label=STATUS_LABELS[OrderStatus.CREATED.value],
+            last_event_at=datetime.utcnow(),
+            event_count=1,
         )
         db.add(order)
-        db.flush()  # Obtém ID do pedido
+        await db.flush()  # Obtém ID do pedido
         
         # Cria evento inicial de tracking
         create_order_event(
             db=db,
-            order_id=order.id,
+            order=order,
             new_status=OrderStatus.CREATED.value,
             description="Pedido registrado no sistema",
+            new_order=True,
         )
         
-        db.commit()
-        db.refresh(order)
+        geocoding_job_ids = [job.id for job in geocoding_jobs]
+
+        await db.commit()
+
+        geocoding_worker.enqueue(geocoding_job_ids)
         
         return order
         
     except SQLAlchemyError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Erro ao criar pedido. Tente novamente.",
         )
 
 
-@router.get("/", response_model=list[OrderListResponse])
-def list_my_orders(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+def _cep_digits(cep: str) -> str:
+    return "".join(filter(str.isdigit, cep))
+
+
+async def resolve_bulk_ceps(
+    orders: list[OrderCreate],
+    deadline: float,
+) -> tuple[dict[str, AddressFromCEP | None], set[str]]:
+    """
+    Consulta no ViaCEP cada CEP do lote uma única vez, com concorrência limitada.
+
+    Returns:
+        (dados por CEP, None = não encontrado; CEPs cujo deadline estourou)
+    """
+    semaphore = asyncio.Semaphore(settings.ORDERS_BULK_CONCURRENCY)
+
+    async def limited(factory):
+        # A corrotina só é criada com a vaga garantida (nada fica sem await no timeout)
+        async with semaphore:
+            return await factory()
+
+    ceps = list({
+        _cep_digits(a.cep)
+        for o in orders
+        for a in (o.origin_address, o.destination_address)
+    })
+    results = await asyncio.gather(*(
+        _within_deadline(limited(partial(fetch_address_by_cep, cep)), deadline, default=TIMED_OUT)
+        for cep in ceps
+    ))
+
+    cep_data = {}
+    timed_out = set()
+    for cep, result in zip(ceps, results):
+        if result is TIMED_OUT:
+            timed_out.add(cep)
+        else:
+            cep_data[cep] = result
+    return cep_data, timed_out
+
+
+@router.post("/bulk", response_model=OrderBulkResponse)
+async def create_orders_bulk(
+    payload: OrderBulkCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
-    """Lista todos os pedidos do usuário logado"""
-    orders = (
-        db.query(Order)
-        .filter(Order.owner_id == current_user.id)
-        .order_by(Order.created_at.desc())
-        .all()
+    """
+    Cria vários pedidos de uma vez (integrações de parceiros).
+
+    Cada CEP do lote é consultado uma única vez e os registros são inseridos
+    com INSERTs de várias linhas em uma única transação. Itens com CEP
+    inválido são reportados em `results` sem impedir a criação dos demais;
+    CEPs que não responderam a tempo vêm com `retryable=true`.
+
+    As coordenadas ficam sempre para o worker de geocoding (prioridade de
+    segundo plano), para que um lote grande não atrase o geocoding dos
+    pedidos criados um a um.
+    """
+    deadline = asyncio.get_running_loop().time() + settings.ADDRESS_RESOLUTION_TIMEOUT_SECONDS
+    cep_data, timed_out = await resolve_bulk_ceps(payload.orders, deadline)
+
+    results: list[OrderBulkItemResult] = []
+    valid: list[tuple[int, OrderCreate]] = []
+    for index, order_data in enumerate(payload.orders):
+        error = None
+        retryable = False
+        for address_input in (order_data.origin_address, order_data.destination_address):
+            cep = _cep_digits(address_input.cep)
+            if cep in timed_out:
+                error = f"Tempo esgotado ao consultar o CEP '{address_input.cep}'. Tente novamente."
+                retryable = True
+                break
+            if not cep_data.get(cep):
+                error = f"CEP '{address_input.cep}' não encontrado ou inválido."
+                break
+
+        if error:
+            results.append(OrderBulkItemResult(
+                index=index,
+                success=False,
+                error=error,
+                retryable=retryable,
+            ))
+        else:
+            valid.append((index, order_data))
+
+    if valid:
+        # Endereços na ordem [origem, destino, origem, destino, ...]
+        address_rows = []
+        for _, order_data in valid:
+            for address_input in (order_data.origin_address, order_data.destination_address):
+                data = cep_data[_cep_digits(address_input.cep)]
+                address_rows.append({
+                    "cep": data.cep,
+                    "street": data.street or "Endereço não informado",
+                    "number": address_input.number,
+                    "complement": address_input.complement,
+                    "city": data.city,
+                    "state": data.state,
+                })
+
+        try:
+            address_ids = (
+                await db.scalars(
+                    insert(Address).returning(Address.id, sort_by_parameter_order=True),
+                    address_rows,
+                )
+            ).all()
+
+            now = datetime.utcnow()
+            order_rows = [
+                {
+                    "tracking_code": generate_tracking_code(),
+                    "status": OrderStatus.CREATED.value,
+                    "owner_id": current_user.id,
+                    "origin_address_id": address_ids[2 * i],
+                    "destination_address_id": address_ids[2 * i + 1],
+                    # Resumo da timeline já com o evento inicial
+                    "last_event_label": STATUS_LABELS[OrderStatus.CREATED.value],
+                    "last_event_at": now,
+                    "event_count": 1,
+                }
+                for i in range(len(valid))
+            ]
+            order_ids = (
+                await db.scalars(
+                    insert(Order).returning(Order.id, sort_by_parameter_order=True),
+                    order_rows,
+                )
+            ).all()
+
+            event_rows = [
+                {
+                    "order_id": order_id,
+                    "status": OrderStatus.CREATED.value,
+                    "status_label": STATUS_LABELS[OrderStatus.CREATED.value],
+                    "description": "Pedido registrado no sistema",
+                    "created_at": now,
+                }
+                for order_id in order_ids
+            ]
+            await db.execute(insert(OrderEvent), event_rows)
+            await db.execute(
+                insert(OutboxEvent),
+                [
+                    outbox_row(
+                        event["order_id"],
+                        order["tracking_code"],
+                        current_user.id,
+                        event["status"],
+                        event["status_label"],
+                        event["description"],
+                        now,
+                    )
+                    for event, order in zip(event_rows, order_rows)
+                ],
+            )
+            notify_outbox_on_commit(db)
+            for i in range(len(order_rows)):
+                record_order_event(
+                    db,
+                    OrderStatus.CREATED.value,
+                    now,
+                    address_rows[2 * i]["state"],
+                    address_rows[2 * i + 1]["state"],
+                )
+
+            # Todos os endereços vão para o worker de geocoding
+            geocoding_job_ids = (
+                await db.scalars(
+                    insert(GeocodingJob).returning(GeocodingJob.id),
+                    [{"address_id": address_id} for address_id in address_ids],
+                )
+            ).all()
+
+            await db.commit()
+
+        except SQLAlchemyError:
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Erro ao criar pedidos em lote. Tente novamente.",
+            )
+
+        geocoding_worker.enqueue(list(geocoding_job_ids))
+
+        for (index, _), order_id, row in zip(valid, order_ids, order_rows):
+            results.append(OrderBulkItemResult(
+                index=index,
+                success=True,
+                id=order_id,
+                tracking_code=row["tracking_code"],
+            ))
+
+    results.sort(key=lambda result: result.index)
+    return OrderBulkResponse(
+        created=len(valid),
+        failed=len(payload.orders) - len(valid),
+        results=results,
     )
-    return orders
 
 
-@router.get("/all", response_model=list[OrderListResponse])
-def list_all_orders(
-    status_filter: str | None = None,
-    db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin),
+class OrderFilterParams:
+    """Filtros comuns às listagens e à exportação de pedidos"""
+
+    def __init__(
+        self,
+        status_filter: OrderStatus | None = None,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+        cursor: str | None = None,
+    ):
+        self.status_filter = status_filter
+        self.created_from = created_from
+        self.created_to = created_to
+        self.cursor = cursor
+
+
+class OrderListParams(OrderFilterParams):
+    """Filtros + tamanho da página"""
+
+    def __init__(
+        self,
+        status_filter: OrderStatus | None = None,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+        cursor: str | None = None,
+        limit: int = Query(
+            settings.ORDERS_PAGE_SIZE_DEFAULT, ge=1, le=settings.ORDERS_PAGE_SIZE_MAX
+        ),
+        include_last_event: bool = False,
+    ):
+        super().__init__(status_filter, created_from, created_to, cursor)
+        self.limit = limit
+        self.include_last_event = include_last_event
+
+
+def order_list_item(order: Order, include_last_event: bool) -> OrderListResponse:
+    """
+    Item da listagem. O resumo da última atualização vem das colunas de
+    `orders` (nada de order_events); sem include_last_event os campos nem
+    aparecem na resposta (rotas com response_model_exclude_unset).
+    """
+    item = OrderListResponse(
+        id=order.id,
+        tracking_code=order.tracking_code,
+        status=order.status,
+        created_at=order.created_at,
+    )
+    if include_last_event:
+        item.last_event_label = order.last_event_label
+        item.last_event_at = order.last_event_at
+        item.event_count = order.event_count
+    return item
+
+
+def apply_order_filters(query, params: OrderFilterParams):
+    """
+    Aplica os filtros e a condição keyset em (created_at, id); quem chama
+    ordena por created_at DESC, id DESC.
+    """
+    if params.status_filter:
+        query = query.where(Order.status == params.status_filter.value)
+    if params.created_from:
+        query = query.where(Order.created_at >= params.created_from)
+    if params.created_to:
+        query = query.where(Order.created_at < params.created_to)
+
+    if params.cursor:
+        try:
+            cursor_created_at, cursor_id = decode_cursor(params.cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cursor de paginação inválido.",
+            )
+        query = query.where(
+            tuple_(Order.created_at, Order.id) < tuple_(cursor_created_at, cursor_id)
+        )
+
+    return query
+
+
+async def paginate_orders(db: AsyncSession, query, params: OrderListParams) -> dict:
+    """
+    Aplica filtros e paginação keyset em (created_at, id), do mais recente
+    para o mais antigo. O custo por página não depende do tamanho da tabela.
+    """
+    query = apply_order_filters(query, params)
+
+    # Busca 1 a mais para saber se existe próxima página
+    orders = (
+        await db.scalars(
+            query.order_by(Order.created_at.desc(), Order.id.desc()).limit(params.limit + 1)
+        )
+    ).all()
+
+    next_cursor = None
+    if len(orders) > params.limit:
+        orders = orders[: params.limit]
+        next_cursor = encode_cursor(orders[-1].created_at, orders[-1].id)
+
+    return {
+        "items": [order_list_item(order, params.include_last_event) for order in orders],
+        "next_cursor": next_cursor,
+    }
+
+
+@router.get("/", response_model=OrderPage, response_model_exclude_unset=True)
+async def list_my_orders(
+    params: OrderListParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     """
-    🔐 ADMIN ONLY — Lista TODOS os pedidos do sistema.
+    Lista os pedidos do usuário logado, paginados por cursor.
+
+    Para a próxima página, envie `cursor=<next_cursor>` da resposta anterior.
+    Com `include_last_event=true`, cada item traz a última atualização
+    (`last_event_label`, `last_event_at`) e o total de eventos.
+    """
+    query = select(Order).where(Order.owner_id == current_user.id)
+    return await paginate_orders(db, query, params)
+
+
+@router.get("/all", response_model=OrderPage, response_model_exclude_unset=True)
+async def list_all_orders(
+    params: OrderListParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+    admin: Principal = Depends(get_current_admin),
+):
+    """
+    🔐 ADMIN ONLY — Lista TODOS os pedidos do sistema, paginados por cursor.
     
     Filtros opcionais:
     - status_filter: created, in_transit, delivered, canceled
+    - created_from / created_to: intervalo de criação (ISO 8601)
+    - limit: tamanho da página
+    - include_last_event: inclui última atualização e total de eventos
     """
-    query = db.query(Order)
-    
-    if status_filter:
-        query = query.filter(Order.status == status_filter)
-    
-    return query.order_by(Order.created_at.desc()).all()
+    return await paginate_orders(db, select(Order), params)
+
+
+@router.get("/stats", response_model=OrderStats)
+async def order_stats(
+    date_from: date | None = None,
+    date_to: date | None = None,
+    db: AsyncSession = Depends(get_async_db),
+    admin: Principal = Depends(get_current_admin),
+):
+    """
+    🔐 ADMIN ONLY — Painel de pedidos por dia (UTC): criados, transições de
+    status, mediana do tempo até a entrega e quebra por UF de origem/destino.
+
+    Lido dos rollups diários mantidos a cada evento, então a resposta não
+    depende do tamanho da tabela de pedidos. Padrão: últimos 30 dias.
+    """
+    date_to = date_to or datetime.utcnow().date()
+    date_from = date_from or date_to - timedelta(days=settings.ORDERS_STATS_DEFAULT_DAYS - 1)
+
+    if date_from > date_to:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="date_from deve ser anterior ou igual a date_to.",
+        )
+    if (date_to - date_from).days + 1 > settings.ORDERS_STATS_MAX_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Período máximo: {settings.ORDERS_STATS_MAX_DAYS} dias.",
+        )
+
+    return await load_order_stats(db, date_from, date_to)
+
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+@router.get("/export")
+async def export_orders(
+    format: ExportFormat = ExportFormat.NDJSON,
+    include_addresses: bool = False,
+    include_events: bool = False,
+    params: OrderFilterParams = Depends(),
+    admin: Principal = Depends(get_current_admin),
+):
+    """
+    🔐 ADMIN ONLY — Exporta pedidos em streaming (NDJSON ou CSV).
+
+    Os pedidos são lidos em lotes com cursor do lado do servidor, então a
+    memória do worker não cresce com o tamanho da tabela. Cada linha traz um
+    `cursor`: para retomar uma exportação interrompida, envie `cursor=<último cursor>`.
+
+    Aceita os mesmos filtros da listagem (status_filter, created_from, created_to).
+    """
+    query = apply_order_filters(build_export_query(include_addresses), params)
+
+    if format == ExportFormat.CSV:
+        return StreamingResponse(
+            stream_csv(query, include_addresses, include_events),
+            media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": 'attachment; filename="orders.csv"'},
+        )
+    return StreamingResponse(
+        stream_ndjson(query, include_addresses, include_events),
+        media_type="application/x-ndjson",
+    )
+
+
+async def get_order_with_addresses(db: AsyncSession, order_id: int) -> Order | None:
+    """Carrega o pedido já com origem e destino (sessão async não faz lazy load)"""
+    return await db.scalar(
+        select(Order)
+        .options(joinedload(Order.origin_address), joinedload(Order.destination_address))
+        .where(Order.id == order_id)
+    )
 
 
 @router.get("/{order_id}", response_model=OrderResponse)
-def get_order(
+async def get_order(
     order_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     """Retorna detalhes de um pedido específico (dono ou admin)"""
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order = await get_order_with_addresses(db, order_id)
     
     if not order:
         raise HTTPException(
@@ -248,14 +791,14 @@ STATUS_DESCRIPTIONS = {
 
 
 @router.patch("/{order_id}/status", response_model=OrderResponse)
-def update_order_status(
+async def update_order_status(
     order_id: int,
     status_update: OrderStatusUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     """Atualiza o status de um pedido e registra evento na timeline (dono ou admin)"""
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order = await get_order_with_addresses(db, order_id)
     
     if not order:
         raise HTTPException(
@@ -278,7 +821,7 @@ def update_order_status(
     new_status = status_update.status.value
     
     # Não permite alterar pedido já entregue ou cancelado
-    if current_status in [OrderStatus.DELIVERED.value, OrderStatus.CANCELED.value]:
+    if current_status in FINAL_STATUSES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Não é possível alterar um pedido com status '{current_status}'.",
@@ -290,19 +833,240 @@ def update_order_status(
         
         create_order_event(
             db=db,
-            order_id=order.id,
+            order=order,
             new_status=new_status,
             description=STATUS_DESCRIPTIONS.get(new_status),
         )
         
-        db.commit()
-        db.refresh(order)
+        await db.commit()
         
         return order
         
     except SQLAlchemyError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Erro ao atualizar status. Tente novamente.",
-        )
\ No newline at end of file
+        )
+
+
+def _naive_utc(value: datetime) -> datetime:
+    """Timestamps do banco são UTC sem fuso"""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _scan_key(scan: OrderScan, timestamp: datetime) -> str:
+    if scan.idempotency_key:
+        return scan.idempotency_key
+    return f"{scan.tracking_code}:{scan.status.value}:{timestamp.isoformat()}"
+
+
+@router.post("/status/bulk", response_model=OrderScanBatchResponse)
+async def apply_status_scans(
+    batch: OrderScanBatch,
+    db: AsyncSession = Depends(get_async_db),
+    admin: Principal = Depends(get_current_admin),
+):
+    """
+    Aplica leituras de scanner da transportadora em lote (apenas admin).
+
+    A regra de transição é a mesma do PATCH /{id}/status (pedido entregue ou
+    cancelado não muda mais), avaliada em memória na ordem dos timestamps.
+    As escritas são set-based: um UPDATE por status final e INSERTs de várias
+    linhas em order_events e scan_idempotency_keys. Leituras já aplicadas
+    (lote reenviado) voltam como `duplicate` sem gerar novo evento, e
+    leituras anteriores ao último evento do pedido (scanner que ficou
+    offline) voltam como `stale`, sem voltar o status para trás.
+    """
+    scans = [
+        (index, scan, _naive_utc(scan.timestamp))
+        for index, scan in enumerate(batch.scans)
+    ]
+    keys = {index: _scan_key(scan, timestamp) for index, scan, timestamp in scans}
+
+    seen = set(
+        await db.scalars(
+            select(ScanIdempotencyKey.key)
+            .where(ScanIdempotencyKey.key.in_(set(keys.values())))
+        )
+    )
+
+    # Trava os pedidos do lote (em ordem de id) até o commit
+    rows = await db.execute(
+        select(
+            Order.id,
+            Order.tracking_code,
+            Order.status,
+            Order.owner_id,
+            Order.created_at,
+            Order.last_event_at,
+            OriginAddress.state.label("origin_state"),
+            DestinationAddress.state.label("destination_state"),
+        )
+        .join(OriginAddress, Order.origin_address_id == OriginAddress.id)
+        .join(DestinationAddress, Order.destination_address_id == DestinationAddress.id)
+        .where(Order.tracking_code.in_({scan.tracking_code for _, scan, _ in scans}))
+        .order_by(Order.id)
+        .with_for_update(of=Order)
+    )
+    orders = {row.tracking_code: row for row in rows}
+    current_status = {code: row.status for code, row in orders.items()}
+    last_event_at = {code: row.last_event_at for code, row in orders.items()}
+
+    results: dict[int, OrderScanResult] = {}
+    event_rows = []
+    key_rows = []
+    touched = set()
+
+    for index, scan, timestamp in sorted(scans, key=lambda item: item[2]):
+        code = scan.tracking_code
+        key = keys[index]
+
+        if key in seen:
+            results[index] = OrderScanResult(
+                index=index, tracking_code=code, applied=False, duplicate=True
+            )
+            continue
+
+        order = orders.get(code)
+        error = None
+        if order is None:
+            error = "Pedido não encontrado."
+        elif current_status[code] in FINAL_STATUSES:
+            error = f"Não é possível alterar um pedido com status '{current_status[code]}'."
+
+        if error:
+            results[index] = OrderScanResult(
+                index=index, tracking_code=code, applied=False, error=error
+            )
+            continue
+
+        if last_event_at[code] is not None and timestamp < last_event_at[code]:
+            results[index] = OrderScanResult(
+                index=index, tracking_code=code, applied=False, stale=True
+            )
+            continue
+
+        new_status = scan.status.value
+        seen.add(key)
+        touched.add(code)
+        current_status[code] = new_status
+        last_event_at[code] = timestamp
+        event_rows.append({
+            "order_id": order.id,
+            "status": new_status,
+            "status_label": STATUS_LABELS.get(new_status, new_status),
+            "description": STATUS_DESCRIPTIONS.get(new_status),
+            "created_at": timestamp,
+        })
+        key_rows.append({"key": key, "order_id": order.id})
+        results[index] = OrderScanResult(index=index, tracking_code=code, applied=True)
+
+    if event_rows:
+        # Estado final de cada pedido: último evento aplicado + eventos do lote
+        summaries = {}
+        event_counts = defaultdict(int)
+        for row in event_rows:
+            summaries[row["order_id"]] = row
+            event_counts[row["order_id"]] += 1
+
+        orders_table = Order.__table__
+        summary_update = (
+            update(orders_table)
+            .where(orders_table.c.id == bindparam("b_id"))
+            .values(
+                status=bindparam("b_status"),
+                last_event_label=bindparam("b_label"),
+                last_event_at=bindparam("b_at"),
+                event_count=orders_table.c.event_count + bindparam("b_events"),
+                updated_at=bindparam("b_now"),
+            )
+        )
+
+        try:
+            now = datetime.utcnow()
+            # Um único UPDATE executado em lote (executemany), um pedido por linha
+            await db.execute(summary_update, [
+                {
+                    "b_id": order_id,
+                    "b_status": row["status"],
+                    "b_label": row["status_label"],
+                    "b_at": row["created_at"],
+                    "b_events": event_counts[order_id],
+                    "b_now": now,
+                }
+                for order_id, row in summaries.items()
+            ])
+
+            # Outbox na ordem dos timestamps (mesma ordem dos ids gerados)
+            code_by_order_id = {orders[code].id: code for code in touched}
+            await db.execute(insert(OrderEvent), event_rows)
+            await db.execute(
+                insert(OutboxEvent),
+                [
+                    outbox_row(
+                        row["order_id"],
+                        code_by_order_id[row["order_id"]],
+                        orders[code_by_order_id[row["order_id"]]].owner_id,
+                        row["status"],
+                        row["status_label"],
+                        row["description"],
+                        row["created_at"],
+                    )
+                    for row in event_rows
+                ],
+            )
+            await db.execute(insert(ScanIdempotencyKey), key_rows)
+            notify_outbox_on_commit(db)
+
+            for row in event_rows:
+                order = orders[code_by_order_id[row["order_id"]]]
+                record_order_event(
+                    db,
+                    row["status"],
+                    row["created_at"],
+                    order.origin_state,
+                    order.destination_state,
+                    delivery_seconds=(row["created_at"] - order.created_at).total_seconds(),
+                )
+
+            for code in touched:
+                invalidate_tracking_on_commit(db, code)
+
+            # Rastreio ao vivo: eventos publicados na ordem dos timestamps
+            for row in event_rows:
+                code = code_by_order_id[row["order_id"]]
+                payload = tracking_event_payload(
+                    code, row["status"], row["status_label"], row["description"], row["created_at"]
+                )
+                run_after_commit(db, partial(publish_tracking_update, code, payload))
+
+            await db.commit()
+
+        except IntegrityError:
+            # Outro envio do mesmo lote chegou primeiro
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Leituras deste lote estão sendo processadas em outra requisição. Reenvie o lote.",
+            )
+        except SQLAlchemyError:
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Erro ao aplicar leituras. Tente novamente.",
+            )
+
+    ordered = [results[index] for index in range(len(scans))]
+    applied = sum(result.applied for result in ordered)
+    duplicates = sum(result.duplicate for result in ordered)
+    stale = sum(result.stale for result in ordered)
+    return OrderScanBatchResponse(
+        applied=applied,
+        duplicates=duplicates,
+        stale=stale,
+        rejected=len(ordered) - applied - duplicates - stale,
+        results=ordered,
+    )
@@ -1,38 +1,247 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from sqlalchemy.orm import Session
+import asyncio
 
+from fastapi import APIRouter, HTTPException, status, Depends, Header, Response, WebSocket
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.models.address import Address
 from app.models.order import Order
-from app.models.order_event import STATUS_LABELS
+from app.models.order_event import OrderEvent, STATUS_LABELS
 from app.schemas.tracking_schema import TrackingResponse, TrackingAddressPublic, TrackingEvent
-from app.services.db_service import get_db
+from app.core.config import settings
+from app.database import AsyncSessionLocal
+from app.services.archive_service import load_archived_tracking
+from app.services.db_service import get_async_db
+from app.services.tracking_cache import get_cached_tracking, store_tracking, tracking_generation
+from app.services.tracking_hub import HubFull, Subscription, tracking_hub
 
 router = APIRouter()
 
+OriginAddress = aliased(Address)
+DestinationAddress = aliased(Address)
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
 
-@router.get("/{tracking_code}", response_model=TrackingResponse)
-def track_order(
+
+@router.get(
+    "/{tracking_code}",
+    response_model=TrackingResponse,
+    responses={304: {"description": "Timeline não mudou desde o ETag informado"}},
+)
+async def track_order(
     tracking_code: str,
-    db: Session = Depends(get_db),
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     🔓 Rota PÚBLICA - Não requer autenticação
     
     Consulta o status de um pedido pelo código de rastreio.
     Retorna timeline completa de eventos + informações públicas.
+
+    A resposta é cacheada até o próximo evento do pedido e vem com ETag:
+    envie `If-None-Match` para receber 304 se nada mudou.
+    """
+    etag, body = await get_tracking_body(db, tracking_code.upper())
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.get(
+    "/{tracking_code}/stream",
+    responses={200: {"content": {"text/event-stream": {}}}},
+)
+async def stream_tracking(
+    tracking_code: str,
+    db: AsyncSession = Depends(get_async_db),
+):
     """
-    order = (
-        db.query(Order)
-        .filter(Order.tracking_code == tracking_code.upper())
-        .first()
+    🔓 Rota PÚBLICA - Rastreio ao vivo via Server-Sent Events.
+
+    Envia `snapshot` (mesmo corpo do GET /track/{code}) e depois um `event`
+    a cada mudança de status, sem precisar fazer polling. Se o cliente não
+    der conta de consumir, recebe `resync` e a conexão é encerrada: basta
+    reconectar. Eventos podem se repetir entre o snapshot e o primeiro
+    `event` (use created_at para deduplicar).
+    """
+    code = tracking_code.upper()
+    subscription = _subscribe(code)
+    try:
+        _, snapshot = await get_tracking_body(db, code)
+    except HTTPException:
+        tracking_hub.unsubscribe(subscription)
+        raise
+    # O stream pode durar horas: devolve a conexão ao pool já
+    await db.close()
+
+    return StreamingResponse(
+        _sse_stream(subscription, snapshot),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
+
+
+@router.websocket("/{tracking_code}/ws")
+async def websocket_tracking(websocket: WebSocket, tracking_code: str):
+    """
+    🔓 Rastreio ao vivo via WebSocket: mesmas mensagens do SSE, em JSON
+    ({"type": "snapshot" | "event" | "resync", ...}).
+    """
+    code = tracking_code.upper()
+    try:
+        subscription = tracking_hub.subscribe(code)
+    except HubFull:
+        await websocket.close(code=1013)  # Try Again Later
+        return
+
+    try:
+        async with AsyncSessionLocal() as db:
+            try:
+                _, snapshot = await get_tracking_body(db, code)
+            except HTTPException:
+                await websocket.close(code=4404)
+                return
+
+        await websocket.accept()
+        await websocket.send_text('{"type":"snapshot","tracking":' + snapshot.decode() + "}")
+
+        disconnected = asyncio.create_task(_wait_disconnect(websocket))
+        try:
+            while True:
+                getter = asyncio.create_task(subscription.queue.get())
+                done, _ = await asyncio.wait(
+                    {getter, disconnected}, return_when=asyncio.FIRST_COMPLETED
+                )
+                if disconnected in done:
+                    getter.cancel()
+                    return
+
+                message = getter.result()
+                if message is None:
+                    if subscription.overflowed:
+                        await websocket.send_text('{"type":"resync"}')
+                    await websocket.close()
+                    return
+                await websocket.send_text(message.decode())
+        finally:
+            disconnected.cancel()
+    finally:
+        tracking_hub.unsubscribe(subscription)
+
+
+def _subscribe(tracking_code: str) -> Subscription:
+    try:
+        return tracking_hub.subscribe(tracking_code)
+    except HubFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Muitas conexões de rastreio ao vivo. Tente novamente em instantes.",
+        )
+
+
+def _sse(event: str, data: bytes) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + data + b"\n\n"
+
+
+async def _sse_stream(subscription: Subscription, snapshot: bytes):
+    try:
+        yield _sse("snapshot", snapshot)
+        while True:
+            try:
+                message = await subscription.next(settings.TRACKING_STREAM_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                # Comentário SSE: mantém a conexão viva em proxies
+                yield b": ping\n\n"
+                continue
+
+            if message is None:
+                if subscription.overflowed:
+                    yield _sse("resync", b"{}")
+                return
+            yield _sse("event", message)
+    finally:
+        tracking_hub.unsubscribe(subscription)
+
+
+async def _wait_disconnect(websocket: WebSocket) -> None:
+    """Consome (e ignora) mensagens do cliente até ele desconectar"""
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+
+
+async def get_tracking_body(db: AsyncSession, tracking_code: str) -> tuple[str, bytes]:
+    """(ETag, corpo JSON) do rastreio: do cache ou montado a partir do banco"""
+    cached = await get_cached_tracking(tracking_code)
+    if cached is not None:
+        return cached
+
+    # Lida antes do banco: um evento commitado durante a leitura impede a gravação
+    generation = tracking_generation(tracking_code)
+    tracking = await load_tracking(db, tracking_code)
+    body = tracking.model_dump_json().encode()
+    etag = await store_tracking(tracking_code, body, generation)
+    return etag, body
+
+
+async def load_tracking(db: AsyncSession, tracking_code: str) -> TrackingResponse:
+    """
+    Monta o rastreio público direto do banco.
+
+    Faz sempre 2 queries, selecionando só as colunas públicas:
+    pedido + cidade/UF de origem e destino, e a timeline de eventos.
+    Código fora de `orders` é procurado nos pedidos arquivados.
+    """
+    result = await db.execute(
+        select(
+            Order.id,
+            Order.tracking_code,
+            Order.status,
+            Order.created_at,
+            Order.updated_at,
+            OriginAddress.city.label("origin_city"),
+            OriginAddress.state.label("origin_state"),
+            DestinationAddress.city.label("destination_city"),
+            DestinationAddress.state.label("destination_state"),
+        )
+        .join(OriginAddress, Order.origin_address_id == OriginAddress.id)
+        .join(DestinationAddress, Order.destination_address_id == DestinationAddress.id)
+        .where(Order.tracking_code == tracking_code)
+    )
+    order = result.first()
     
     if not order:
+        # Pedido finalizado há muito tempo: pode estar no arquivo
+        archived = await load_archived_tracking(db, tracking_code)
+        if archived is not None:
+            return archived
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Código de rastreio não encontrado.",
         )
     
-    # Monta lista de eventos
+    # Monta lista de eventos (mais recente primeiro)
+    event_rows = await db.execute(
+        select(
+            OrderEvent.status,
+            OrderEvent.status_label,
+            OrderEvent.description,
+            OrderEvent.created_at,
+        )
+        .where(OrderEvent.order_id == order.id)
+        .order_by(OrderEvent.created_at.desc())
+    )
     events = [
         TrackingEvent(
             status=event.status,
@@ -40,7 +249,7 @@ def track_order(
             description=event.description,
             created_at=event.created_at,
         )
-        for event in order.events
+        for event in event_rows
     ]
     
     return TrackingResponse(
@@ -48,12 +257,12 @@ def track_order(
         status=order.status,
         status_label=STATUS_LABELS.get(order.status, order.status),
         origin=TrackingAddressPublic(
-            city=order.origin_address.city,
-            state=order.origin_address.state,
+            city=order.origin_city,
+            state=order.origin_state,
         ),
         destination=TrackingAddressPublic(
-            city=order.destination_address.city,
-            state=order.destination_address.state,
+            city=order.destination_city,
+            state=order.destination_state,
         ),
         events=events,
         created_at=order.created_at,
@@ -1,19 +1,27 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.schemas.user_schema import UserCreate, UserResponse, UserRoleUpdate
 from app.models.user import User
-from app.services.db_service import get_db
-from app.utils.security import get_password_hash
-from app.services.auth_service import get_current_user, get_current_admin
+from app.services.db_service import get_db, get_async_db
+from app.utils.security import password_hasher
+from app.services.auth_service import (
+    CurrentUser,
+    Principal,
+    get_current_user,
+    get_current_admin,
+    invalidate_user,
+)
 
 router = APIRouter()
 
 
 @router.post("/", response_model=UserResponse)
-def create_user(user: UserCreate, db: Session = Depends(get_db)):
+async def create_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     # opcional: checar se email já existe
-    existing = db.query(User).filter(User.email == user.email).first()
+    existing = await db.scalar(select(User).where(User.email == user.email))
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -22,26 +30,26 @@ def create_user(user: UserCreate, db: Session = Depends(get_db)):
 
     new_user = User(
         email=user.email,
-        hashed_password=get_password_hash(user.password),  # 👈 agora com hash
+        hashed_password=await password_hasher.hash(user.password),  # 👈 bcrypt no pool dedicado
         full_name=user.full_name,
     )
 
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     return new_user
 
 
 @router.get("/", response_model=list[UserResponse])
 def list_users(
     db: Session = Depends(get_db),
-    _: User = Depends(get_current_admin),  # Somente admin pode listar usuários
+    _: Principal = Depends(get_current_admin),  # Somente admin pode listar usuários
 ):
     return db.query(User).all()
 
 
 @router.get("/me", response_model=UserResponse)
-def get_me(current_user: User = Depends(get_current_user)):
+def get_me(current_user: CurrentUser = Depends(get_current_user)):
     return current_user
 
 
@@ -50,7 +58,7 @@ def update_user_role(
     user_id: int,
     role_update: UserRoleUpdate,
     db: Session = Depends(get_db),
-    current_admin: User = Depends(get_current_admin),
+    current_admin: Principal = Depends(get_current_admin),
 ):
     """
     Atualiza o role de um usuário (somente admin).
@@ -75,4 +83,7 @@ def update_user_role(
     user.role = role_update.role.value
     db.commit()
     db.refresh(user)
+
+    # Próximas requests desse usuário já enxergam o novo role
+    invalidate_user(user.id)
     return user
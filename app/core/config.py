@@ -13,11 +13,112 @@ class Settings(BaseSettings):
 
     # 🗄️ Banco de dados
     DATABASE_URL: str
+    # Opcional: por padrão é derivada da DATABASE_URL (psycopg2 -> asyncpg)
+    ASYNC_DATABASE_URL: str | None = None
+    # Pool de conexões (vale para cada engine, por worker do uvicorn)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0  # espera máxima por conexão livre
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # recicla conexões com mais de 30 min
+    DB_POOL_PRE_PING: bool = True  # testa a conexão antes de usar
+
+    # 📈 Métricas (/metrics no formato Prometheus + header Server-Timing)
+    METRICS_ENABLED: bool = True
+    SERVER_TIMING_ENABLED: bool = True
+    # GET /metrics fica desligado por padrão (expõe rotas e volumes internos)
+    METRICS_ENDPOINT_ENABLED: bool = False
+    METRICS_TOKEN: str | None = None  # se definido, exige "Authorization: Bearer <token>"
 
     # 🔐 Configs de segurança
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60  # 1h
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    SESSION_REVOCATION_SYNC_SECONDS: int = 30  # atraso máximo de um logout entre workers
+
+    # 🪪 Cache de autenticação (tokens decodificados e usuários)
+    AUTH_CACHE_MAX_SIZE: int = 10_000
+    AUTH_TOKEN_CACHE_TTL_SECONDS: int = 300  # JWT já validado (nunca além do exp)
+    AUTH_PRINCIPAL_CACHE_TTL_SECONDS: int = 60  # defasagem máxima de role entre workers
+    AUTH_TRUST_ROLE_CLAIM: bool = False  # get_current_admin confia no role do token (sem banco)
+
+    # 🔑 Hash de senhas (bcrypt)
+    PASSWORD_HASH_ROUNDS: int = 12  # custo; hashes com outro custo são refeitos no login
+    PASSWORD_HASH_WORKERS: int = 4  # threads dedicadas ao bcrypt
+
+    # 📮 Cache de CEP (ViaCEP)
+    CEP_CACHE_MAX_SIZE: int = 10_000  # entradas no LRU em memória
+    CEP_CACHE_TTL_SECONDS: int = 60 * 60 * 24 * 30  # 30 dias
+    CEP_CACHE_NEGATIVE_TTL_SECONDS: int = 60 * 60 * 24  # CEP inexistente: 1 dia
+
+    # 🌐 Cliente HTTP compartilhado (ViaCEP, Nominatim)
+    HTTP_MAX_CONNECTIONS: int = 50
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    HTTP_TIMEOUT_SECONDS: float = 10.0
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    HTTP_POOL_TIMEOUT_SECONDS: float = 5.0  # espera por conexão livre no pool
+    HTTP2_ENABLED: bool = True  # só tem efeito com o pacote `h2` instalado
+
+    # 🗺️ Nominatim (limite de uso: 1 request/segundo)
+    NOMINATIM_RATE_PER_SECOND: float = 1.0
+    NOMINATIM_BURST: int = 1
+    GEOCODE_CACHE_MAX_SIZE: int = 10_000  # entradas no LRU em memória
+    GEOCODE_CACHE_TTL_SECONDS: int = 60 * 60 * 24 * 90  # 90 dias
+    GEOCODE_CACHE_NEGATIVE_TTL_SECONDS: int = 60 * 60 * 24  # não encontrado: 1 dia
+
+    # 📍 Resolução de endereços na criação de pedidos
+    ADDRESS_RESOLUTION_TIMEOUT_SECONDS: float = 8.0  # orçamento total por request
+    GEOCODE_SPECULATIVE_CEP_FALLBACK: bool = True  # fallback por CEP em paralelo (se a fila tiver folga)
+
+    # 📄 Paginação das listagens de pedidos
+    ORDERS_PAGE_SIZE_DEFAULT: int = 50
+    ORDERS_PAGE_SIZE_MAX: int = 200
+    ORDERS_EXPORT_BATCH_SIZE: int = 1000  # linhas lidas por lote na exportação
+
+    # 📥 Criação de pedidos em lote (POST /orders/bulk)
+    ORDERS_BULK_MAX_ITEMS: int = 500
+    ORDERS_BULK_CONCURRENCY: int = 20  # consultas externas simultâneas por lote
+
+    # 📡 Leituras de scanner em lote (POST /orders/status/bulk)
+    ORDERS_SCAN_BATCH_MAX_ITEMS: int = 5000
+
+    # 📊 Painel do admin (GET /orders/stats, rollups diários)
+    ORDERS_STATS_DEFAULT_DAYS: int = 30
+    ORDERS_STATS_MAX_DAYS: int = 366
+
+    # 📦 Cache do rastreio público (/track/{tracking_code})
+    TRACKING_CACHE_MAX_SIZE: int = 50_000
+    TRACKING_CACHE_TTL_SECONDS: int = 60  # limite de defasagem entre workers
+    TRACKING_GENERATION_TTL_SECONDS: int = 300  # > leitura mais longa do banco (mínimo: o TTL acima)
+
+    # 📡 Rastreio ao vivo (SSE / WebSocket)
+    TRACKING_STREAM_QUEUE_SIZE: int = 16  # mensagens pendentes por cliente antes de desconectar
+    TRACKING_STREAM_MAX_SUBSCRIBERS: int = 50_000  # por worker
+    TRACKING_STREAM_HEARTBEAT_SECONDS: float = 15.0
+
+    # 🛰️ Geocoding em segundo plano (pedido é salvo sem esperar o Nominatim)
+    GEOCODE_IN_BACKGROUND: bool = False
+    GEOCODING_JOB_MAX_ATTEMPTS: int = 5
+    GEOCODING_JOB_RETRY_BASE_SECONDS: float = 30.0  # dobra a cada tentativa
+    GEOCODING_JOB_LEASE_SECONDS: int = 120  # reserva do job (volta à fila se o processo cair)
+    GEOCODING_WORKER_CONCURRENCY: int = 4  # consumidores por processo (o limite é a fila do Nominatim)
+
+    # 📤 Outbox: feed de mudanças (/events/changes) e webhooks
+    OUTBOX_FEED_PAGE_SIZE_MAX: int = 1000
+    OUTBOX_DISPATCHER_ENABLED: bool = True  # deixe ligado em um só worker
+    OUTBOX_WEBHOOK_URLS: list[str] = []  # JSON: ["https://..."]
+    OUTBOX_WEBHOOK_SECRET: str | None = None  # assina o corpo (X-Outbox-Signature)
+    OUTBOX_BATCH_SIZE: int = 200
+    OUTBOX_POLL_SECONDS: float = 5.0
+    OUTBOX_RETRY_BASE_SECONDS: float = 2.0  # dobra a cada falha seguida
+    OUTBOX_RETRY_MAX_SECONDS: float = 300.0
+
+    # 🧊 Arquivamento de pedidos finalizados (archive_orders.py, via cron)
+    ARCHIVE_AFTER_DAYS: int = 90  # entregue/cancelado há mais tempo que isso sai das tabelas quentes
+    ARCHIVE_BATCH_SIZE: int = 500  # pedidos por transação
+    ARCHIVE_COMPRESSION_LEVEL: int = 6  # zlib (1 = rápido, 9 = menor)
+    ORDER_EVENTS_PARTITION_MONTHS_AHEAD: int = 3  # Postgres: partições mensais criadas com antecedência
 
 
 settings = Settings()
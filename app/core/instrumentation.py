@@ -0,0 +1,202 @@
+import contextvars
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator
+
+import httpx
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils.metrics import MetricsRegistry
+
+registry = MetricsRegistry()
+
+REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds",
+    "Latência das requests HTTP por rota",
+    ("method", "route", "status"),
+)
+REQUEST_DB_QUERIES = registry.counter(
+    "http_request_db_queries_total",
+    "Queries SQL executadas pelas requests, por rota",
+    ("method", "route"),
+)
+REQUEST_DB_SECONDS = registry.counter(
+    "http_request_db_seconds_total",
+    "Tempo gasto em queries SQL pelas requests, por rota",
+    ("method", "route"),
+)
+REQUEST_EXTERNAL_SECONDS = registry.counter(
+    "http_request_external_seconds_total",
+    "Tempo nas chamadas HTTP às integrações externas (sem a fila), por rota",
+    ("method", "route", "integration"),
+)
+DB_QUERY_DURATION = registry.histogram(
+    "db_query_duration_seconds",
+    "Duração das queries SQL (requests e tarefas em segundo plano)",
+)
+EXTERNAL_REQUEST_DURATION = registry.histogram(
+    "external_http_request_duration_seconds",
+    "Duração das chamadas HTTP às integrações externas",
+    ("integration", "status"),
+)
+
+
+@dataclass
+class RequestTimings:
+    """Tempos acumulados durante uma request"""
+    db_queries: int = 0
+    db_seconds: float = 0.0
+    external: dict[str, float] = field(default_factory=dict)
+
+    def server_timing(self, total_seconds: float) -> str:
+        """Header Server-Timing (durações em ms, visíveis no DevTools)"""
+        parts = [f"app;dur={total_seconds * 1000:.1f}"]
+        parts.append(f'db;dur={self.db_seconds * 1000:.1f};desc="{self.db_queries} queries"')
+        for integration, seconds in sorted(self.external.items()):
+            parts.append(f"{integration};dur={seconds * 1000:.1f}")
+        return ", ".join(parts)
+
+
+# Tempos da request em andamento (None fora de requests, ex: workers)
+_current_timings: contextvars.ContextVar[RequestTimings | None] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+@contextmanager
+def measure_external(integration: str) -> Iterator[None]:
+    """Soma a duração do bloco na integração `integration` da request atual"""
+    timings = _current_timings.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            elapsed = time.perf_counter() - start
+            timings.external[integration] = timings.external.get(integration, 0.0) + elapsed
+
+
+# --- SQLAlchemy: vale para todas as engines (sync e async) ---
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_times"].pop()
+    DB_QUERY_DURATION.observe(elapsed)
+
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.db_queries += 1
+        timings.db_seconds += elapsed
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    # Query com erro não passa pelo after_cursor_execute
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start_times"):
+        conn.info["query_start_times"].pop()
+
+
+# --- httpx: chamadas reais ao ViaCEP / Nominatim ---
+
+def httpx_event_hooks(integration: str) -> dict:
+    """Hooks que medem cada chamada HTTP da integração (até receber os headers)"""
+
+    async def on_request(request: httpx.Request) -> None:
+        request.extensions["metrics_start"] = time.perf_counter()
+
+    async def on_response(response: httpx.Response) -> None:
+        start = response.request.extensions.get("metrics_start")
+        if start is not None:
+            EXTERNAL_REQUEST_DURATION.observe(
+                time.perf_counter() - start, integration, str(response.status_code)
+            )
+
+    return {"request": [on_request], "response": [on_response]}
+
+
+# --- ASGI ---
+
+def _route_template(scope: Scope) -> str:
+    """
+    Path completo da rota ("/api/v1/orders/{order_id}"), para não explodir
+    labels com ids. `route.path` é relativo ao router incluído, então o
+    prefixo vem dos primeiros segmentos do path real.
+    """
+    template = getattr(scope.get("route"), "path", None)
+    if template is None:
+        return "unmatched"
+
+    depth = len(template.strip("/").split("/")) if template.strip("/") else 0
+    segments = scope["path"].rstrip("/").split("/")
+    prefix = "/".join(segments[: len(segments) - depth])
+    return prefix + template
+
+
+class MetricsMiddleware:
+    """
+    Mede cada request: latência por rota, queries SQL e tempo nas
+    integrações externas. Com `server_timing`, envia o detalhamento no
+    header Server-Timing da resposta.
+
+    Middleware ASGI puro (sem BaseHTTPMiddleware) para não atrapalhar
+    respostas em streaming. Conexões de streaming (SSE e WebSocket) ficam
+    abertas por minutos e não entram no histograma de latência.
+    """
+
+    # Respostas que são conexões longas, não requests
+    streaming_media_types = (b"text/event-stream",)
+
+    def __init__(self, app: ASGIApp, server_timing: bool = True):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current_timings.set(timings)
+        start = time.perf_counter()
+        status_code = 500
+        streaming = False
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status_code, streaming
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                content_type = dict(message.get("headers", [])).get(b"content-type", b"")
+                streaming = content_type.startswith(self.streaming_media_types)
+                if self.server_timing:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", timings.server_timing(time.perf_counter() - start))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_timings.reset(token)
+            elapsed = time.perf_counter() - start
+            method = scope["method"]
+            route = _route_template(scope)
+
+            if not streaming:
+                REQUEST_DURATION.observe(elapsed, method, route, str(status_code))
+            REQUEST_DB_QUERIES.inc(method, route, amount=timings.db_queries)
+            REQUEST_DB_SECONDS.inc(method, route, amount=timings.db_seconds)
+            for integration, seconds in timings.external.items():
+                REQUEST_EXTERNAL_SECONDS.inc(method, route, integration, amount=seconds)
+
+
+def render_metrics() -> str:
+    return registry.render()
@@ -1,12 +1,174 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import logging
+import time
+from typing import Callable
+
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
+
+class PoolStats:
+    """Métricas de espera por conexão de um pool (por processo)"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def record(self, waited: float) -> None:
+        self.checkouts += 1
+        self.wait_time_total += waited
+        self.wait_time_max = max(self.wait_time_max, waited)
+
+    def as_dict(self) -> dict:
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_seconds_avg": (
+                round(self.wait_time_total / self.checkouts, 6) if self.checkouts else 0.0
+            ),
+            "wait_seconds_max": round(self.wait_time_max, 6),
+        }
+
+
+def _instrumented_pool(pool_class: type[QueuePool], stats: PoolStats) -> type[QueuePool]:
+    """Subclasse do pool que mede o tempo para obter cada conexão"""
+
+    class InstrumentedPool(pool_class):
+        def connect(self):
+            start = time.perf_counter()
+            try:
+                connection = super().connect()
+            except exc.TimeoutError:
+                stats.timeouts += 1
+                raise
+            stats.record(time.perf_counter() - start)
+            return connection
+
+    InstrumentedPool.__name__ = f"Instrumented{pool_class.__name__}"
+    return InstrumentedPool
+
+
+def _engine_options(url: str, pool_class: type[QueuePool], stats: PoolStats) -> dict:
+    """Configuração do pool (SQLite de testes/benchmarks usa o pool padrão)"""
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "poolclass": _instrumented_pool(pool_class, stats),
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
 # Engine de conexão com o Postgres
-engine = create_engine(settings.DATABASE_URL, future=True)
+sync_pool_stats = PoolStats()
+engine = create_engine(
+    settings.DATABASE_URL,
+    future=True,
+    **_engine_options(settings.DATABASE_URL, QueuePool, sync_pool_stats),
+)
 
 # Sessão para usar nas rotas/serviços
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+# Drivers async equivalentes aos drivers sync (asyncpg no Postgres,
+# aiosqlite no SQLite usado em testes/benchmarks)
+_ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def _build_async_url(url: str) -> str:
+    """Deriva a URL async a partir da DATABASE_URL (ex: psycopg2 -> asyncpg)"""
+    parsed = make_url(url)
+    driver = _ASYNC_DRIVERS.get(parsed.get_backend_name(), parsed.drivername)
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+# Engine async para as rotas de alto volume (pedidos e rastreio)
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or _build_async_url(settings.DATABASE_URL)
+async_pool_stats = PoolStats()
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    **_engine_options(ASYNC_DATABASE_URL, AsyncAdaptedQueuePool, async_pool_stats),
+)
+
+# expire_on_commit=False: em sessões async não existe lazy load implícito,
+# então os objetos continuam legíveis depois do commit
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+
+def get_pool_status() -> dict:
+    """Estado atual dos pools sync e async (conexões em uso, ociosas, espera)"""
+    status = {}
+    for name, pool, stats in (
+        ("sync", engine.pool, sync_pool_stats),
+        ("async", async_engine.sync_engine.pool, async_pool_stats),
+    ):
+        info = {"pool_class": type(pool).__name__, **stats.as_dict()}
+        if isinstance(pool, QueuePool):
+            info.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                idle=pool.checkedin(),
+                overflow=pool.overflow(),
+            )
+        status[name] = info
+    return status
+
+
+# INSERT com ON CONFLICT (upsert) de cada banco suportado
+_DIALECT_INSERTS = {
+    "postgresql": pg_insert,
+    "sqlite": sqlite_insert,
+}
+
+
+def dialect_insert(dialect_name: str, table):
+    """INSERT do dialeto em uso, com on_conflict_do_update/do_nothing"""
+    return _DIALECT_INSERTS[dialect_name](table)
+
+
+def run_after_commit(db, callback: Callable[[], None]) -> None:
+    """
+    Agenda `callback()` para rodar depois que a transação da sessão for
+    commitada (ex: invalidar caches). Se houver rollback, é descartado.
+    Aceita Session ou AsyncSession.
+    """
+    session = getattr(db, "sync_session", db)
+    session.info.setdefault("after_commit", []).append(callback)
+
+
+@event.listens_for(Session, "after_commit")
+def _run_after_commit_callbacks(session: Session) -> None:
+    for callback in session.info.pop("after_commit", []):
+        try:
+            callback()
+        except Exception:
+            logger.exception("Erro em callback pós-commit")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_commit_callbacks(session: Session) -> None:
+    session.info.pop("after_commit", None)
+
+
 # Base para declarar os models
 Base = declarative_base()
@@ -1,9 +1,46 @@
-from fastapi import FastAPI
+import secrets
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Header, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.core.config import settings
+from app.core.instrumentation import MetricsMiddleware, render_metrics
 from app.api.api_v1.api import api_router
+from app.database import async_engine
+from app.services.http_client import open_http_clients, close_http_clients
+from app.services.geocoding_service import nominatim_scheduler
+from app.services.geocoding_worker import geocoding_worker
+from app.services.outbox_service import outbox_dispatcher
+from app.services.session_service import session_revocation_sync
+from app.services.tracking_hub import start_tracking_hub, stop_tracking_hub
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Clientes HTTP compartilhados (pool keep-alive) para ViaCEP/Nominatim
+    await open_http_clients()
+    # Worker de geocoding em segundo plano (retoma jobs pendentes no banco)
+    await geocoding_worker.start()
+    # Sessões revogadas (logout) em memória, sincronizadas entre workers
+    await session_revocation_sync.start()
+    # Rastreio ao vivo (SSE/WebSocket): hub local + broker entre workers
+    await start_tracking_hub()
+    # Entrega do outbox (mudanças de pedidos) aos webhooks registrados
+    await outbox_dispatcher.start()
+    try:
+        yield
+    finally:
+        await outbox_dispatcher.stop()
+        await stop_tracking_hub()
+        await session_revocation_sync.stop()
+        await geocoding_worker.stop()
+        await nominatim_scheduler.close()
+        await close_http_clients()
+        await async_engine.dispose()
 
-app = FastAPI(title=settings.PROJECT_NAME)
+
+app = FastAPI(title=settings.PROJECT_NAME, lifespan=lifespan)
 
 # CORS - Permite frontend se comunicar com o backend
 app.add_middleware(
@@ -19,4 +56,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Métricas por request (latência, queries, integrações externas)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, server_timing=settings.SERVER_TIMING_ENABLED)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics(authorization: str | None = Header(default=None)):
+        """Métricas do processo no formato texto do Prometheus (opt-in)"""
+        if not settings.METRICS_ENDPOINT_ENABLED:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+        if settings.METRICS_TOKEN and not secrets.compare_digest(
+            authorization or "", f"Bearer {settings.METRICS_TOKEN}"
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token de métricas inválido",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
@@ -0,0 +1,79 @@
+"""
+Migrações versionadas do schema.
+
+Cada módulo em app/migrations/versions define:
+    VERSION: int         -> número sequencial único
+    DESCRIPTION: str     -> resumo da mudança
+    upgrade(conn)        -> aplica a mudança (roda dentro de uma transação)
+
+As versões aplicadas ficam registradas na tabela schema_migrations.
+Tabelas novas continuam sendo criadas pelo create_all (create_tables.py);
+as migrações cuidam de alterações em tabelas que já existem em produção.
+"""
+import importlib
+import pkgutil
+from datetime import datetime
+from types import ModuleType
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select
+from sqlalchemy.engine import Engine
+
+from app.migrations import versions
+
+_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String(255), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def load_migrations() -> list[ModuleType]:
+    """Carrega os módulos de versions/ ordenados por VERSION"""
+    modules = [
+        importlib.import_module(f"{versions.__name__}.{info.name}")
+        for info in pkgutil.iter_modules(versions.__path__)
+    ]
+    modules.sort(key=lambda module: module.VERSION)
+
+    numbers = [module.VERSION for module in modules]
+    if len(numbers) != len(set(numbers)):
+        raise RuntimeError(f"Versões de migração duplicadas: {numbers}")
+    return modules
+
+
+def applied_versions(engine: Engine) -> set[int]:
+    _metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        return set(conn.scalars(select(schema_migrations.c.version)))
+
+
+def run_migrations(engine: Engine) -> list[int]:
+    """
+    Aplica as migrações pendentes, cada uma na sua transação.
+
+    Returns:
+        Versões aplicadas nesta execução.
+    """
+    done = applied_versions(engine)
+    applied = []
+
+    for migration in load_migrations():
+        if migration.VERSION in done:
+            continue
+
+        with engine.begin() as conn:
+            migration.upgrade(conn)
+            conn.execute(
+                schema_migrations.insert().values(
+                    version=migration.VERSION,
+                    description=migration.DESCRIPTION,
+                    applied_at=datetime.utcnow(),
+                )
+            )
+        applied.append(migration.VERSION)
+
+    return applied
@@ -0,0 +1,24 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+VERSION = 1
+DESCRIPTION = "Índices compostos para listagens, filtros e timeline"
+
+# Mesmos índices declarados nos models (bancos novos já nascem com eles)
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_orders_owner_id_created_at "
+    "ON orders (owner_id, created_at DESC, id DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_orders_status_created_at "
+    "ON orders (status, created_at DESC, id DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_orders_created_at "
+    "ON orders (created_at DESC, id DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_order_events_order_id_created_at "
+    "ON order_events (order_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_addresses_cep_number "
+    "ON addresses (cep, number)",
+]
+
+
+def upgrade(conn: Connection) -> None:
+    for statement in INDEXES:
+        conn.execute(text(statement))
@@ -0,0 +1,37 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+VERSION = 2
+DESCRIPTION = "Resumo da timeline em orders (último evento e total de eventos)"
+
+# Mesmas colunas declaradas no model (bancos novos já nascem com elas)
+COLUMNS = {
+    "last_event_label": "ALTER TABLE orders ADD COLUMN last_event_label VARCHAR(100)",
+    "last_event_at": "ALTER TABLE orders ADD COLUMN last_event_at TIMESTAMP",
+    "event_count": "ALTER TABLE orders ADD COLUMN event_count INTEGER NOT NULL DEFAULT 0",
+}
+
+# Preenche a partir dos eventos já gravados (usa ix_order_events_order_id_created_at)
+BACKFILL = """
+UPDATE orders SET
+    event_count = (
+        SELECT COUNT(*) FROM order_events e WHERE e.order_id = orders.id
+    ),
+    last_event_at = (
+        SELECT MAX(e.created_at) FROM order_events e WHERE e.order_id = orders.id
+    ),
+    last_event_label = (
+        SELECT e.status_label FROM order_events e
+        WHERE e.order_id = orders.id
+        ORDER BY e.created_at DESC, e.id DESC
+        LIMIT 1
+    )
+"""
+
+
+def upgrade(conn: Connection) -> None:
+    existing = {column["name"] for column in inspect(conn).get_columns("orders")}
+    for name, statement in COLUMNS.items():
+        if name not in existing:
+            conn.execute(text(statement))
+    conn.execute(text(BACKFILL))
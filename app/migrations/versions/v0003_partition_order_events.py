@@ -0,0 +1,71 @@
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.core.config import settings
+from app.utils.partitions import (
+    add_months,
+    create_default_partition,
+    ensure_monthly_partitions,
+    is_partitioned,
+)
+
+VERSION = 3
+DESCRIPTION = "order_events particionada por mês (só Postgres)"
+
+# A tabela antiga é renomeada, os dados copiados e a antiga removida.
+# PK inclui created_at: o Postgres exige a chave de partição nas constraints únicas.
+STATEMENTS = [
+    "ALTER TABLE order_events RENAME TO order_events_unpartitioned",
+    "ALTER TABLE order_events_unpartitioned RENAME CONSTRAINT order_events_pkey "
+    "TO order_events_unpartitioned_pkey",
+    "ALTER INDEX IF EXISTS ix_order_events_id RENAME TO ix_order_events_unpartitioned_id",
+    "ALTER INDEX IF EXISTS ix_order_events_order_id_created_at "
+    "RENAME TO ix_order_events_unpartitioned_order_id_created_at",
+    """
+    CREATE TABLE order_events (
+        id INTEGER NOT NULL DEFAULT nextval('order_events_id_seq'),
+        order_id INTEGER NOT NULL REFERENCES orders (id),
+        status VARCHAR(20) NOT NULL,
+        status_label VARCHAR(100) NOT NULL,
+        description TEXT,
+        created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+        PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at)
+    """,
+    "CREATE INDEX ix_order_events_id ON order_events (id)",
+    "CREATE INDEX ix_order_events_order_id_created_at ON order_events (order_id, created_at)",
+]
+
+COPY = [
+    "INSERT INTO order_events (id, order_id, status, status_label, description, created_at) "
+    "SELECT id, order_id, status, status_label, description, created_at "
+    "FROM order_events_unpartitioned",
+    "ALTER SEQUENCE order_events_id_seq OWNED BY order_events.id",
+    "DROP TABLE order_events_unpartitioned",
+]
+
+
+def upgrade(conn: Connection) -> None:
+    # SQLite (testes/benchmarks) não tem particionamento
+    if conn.dialect.name != "postgresql" or is_partitioned(conn, "order_events"):
+        return
+
+    oldest = conn.scalar(text("SELECT MIN(created_at) FROM order_events"))
+
+    for statement in STATEMENTS:
+        conn.execute(text(statement))
+
+    today = date.today()
+    start = oldest.date() if oldest else today
+    ensure_monthly_partitions(
+        conn,
+        "order_events",
+        start,
+        add_months(today, settings.ORDER_EVENTS_PARTITION_MONTHS_AHEAD),
+    )
+    create_default_partition(conn, "order_events")
+
+    for statement in COPY:
+        conn.execute(text(statement))
@@ -0,0 +1,59 @@
+from collections import defaultdict
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import aliased
+
+from app.models.address import Address
+from app.models.order import Order, OrderStatus
+from app.models.order_event import OrderEvent
+from app.models.order_rollup import OrderDailyRollup, DeliveryTimeRollup
+from app.services.analytics_service import upsert_counts, delivery_bucket
+
+VERSION = 4
+DESCRIPTION = "Rollups diários do painel (/orders/stats) a partir dos eventos existentes"
+
+_CHUNK = 1000
+
+
+def _write(conn: Connection, table, keys: tuple[str, ...], counts: dict[tuple, int]) -> None:
+    items = sorted(counts.items())
+    for start in range(0, len(items), _CHUNK):
+        upsert_counts(conn, table, keys, dict(items[start:start + _CHUNK]))
+
+
+def upgrade(conn: Connection) -> None:
+    for table in (OrderDailyRollup.__table__, DeliveryTimeRollup.__table__):
+        table.create(conn, checkfirst=True)
+
+    # Já preenchidos pela aplicação: não conta de novo
+    if conn.scalar(select(func.count()).select_from(OrderDailyRollup.__table__)):
+        return
+
+    origin = aliased(Address)
+    destination = aliased(Address)
+    rows = conn.execution_options(stream_results=True, yield_per=_CHUNK).execute(
+        select(
+            OrderEvent.status,
+            OrderEvent.created_at,
+            Order.created_at.label("order_created_at"),
+            origin.state.label("origin_state"),
+            destination.state.label("destination_state"),
+        )
+        .join(Order, OrderEvent.order_id == Order.id)
+        .join(origin, Order.origin_address_id == origin.id)
+        .join(destination, Order.destination_address_id == destination.id)
+    )
+
+    # Pedidos já arquivados não têm mais eventos: ficam fora do histórico
+    orders = defaultdict(int)
+    delivery = defaultdict(int)
+    for row in rows:
+        day = row.created_at.date()
+        orders[(day, row.status, row.origin_state, row.destination_state)] += 1
+        if row.status == OrderStatus.DELIVERED.value:
+            seconds = (row.created_at - row.order_created_at).total_seconds()
+            delivery[(day, row.destination_state, delivery_bucket(max(seconds, 0)))] += 1
+
+    _write(conn, OrderDailyRollup.__table__, ("day", "status", "origin_state", "destination_state"), orders)
+    _write(conn, DeliveryTimeRollup.__table__, ("day", "destination_state", "bucket"), delivery)
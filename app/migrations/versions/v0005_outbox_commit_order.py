@@ -0,0 +1,32 @@
+from sqlalchemy import func, inspect, select, text
+from sqlalchemy.engine import Connection
+
+from app.models.outbox_event import OutboxSequence
+
+VERSION = 5
+DESCRIPTION = "Outbox numerado em ordem de commit (outbox_events.position)"
+
+# Mesma coluna/índice declarados no model (bancos novos já nascem com eles)
+ADD_COLUMN = "ALTER TABLE outbox_events ADD COLUMN position BIGINT"
+CREATE_INDEX = (
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_outbox_events_position "
+    "ON outbox_events (position)"
+)
+
+# Eventos já gravados estão todos commitados: a posição é o próprio id, e
+# os cursores salvos (que guardavam ids) continuam valendo
+BACKFILL = "UPDATE outbox_events SET position = id WHERE position IS NULL"
+
+
+def upgrade(conn: Connection) -> None:
+    existing = {column["name"] for column in inspect(conn).get_columns("outbox_events")}
+    if "position" not in existing:
+        conn.execute(text(ADD_COLUMN))
+    conn.execute(text(CREATE_INDEX))
+    conn.execute(text(BACKFILL))
+
+    table = OutboxSequence.__table__
+    table.create(conn, checkfirst=True)
+    if conn.scalar(select(func.count()).select_from(table)) == 0:
+        last = conn.scalar(text("SELECT COALESCE(MAX(position), 0) FROM outbox_events"))
+        conn.execute(table.insert().values(id=1, last_position=last))
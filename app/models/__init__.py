@@ -2,3 +2,11 @@ from app.models.user import User, UserRole  # noqa
 from app.models.address import Address  # noqa
 from app.models.order import Order, OrderStatus  # noqa
 from app.models.order_event import OrderEvent, STATUS_LABELS  # noqa
+from app.models.cep_cache import CepCacheEntry  # noqa
+from app.models.geocoding_job import GeocodingJob  # noqa
+from app.models.geocode_cache import GeocodeCacheEntry  # noqa
+from app.models.scan_idempotency_key import ScanIdempotencyKey  # noqa
+from app.models.refresh_token import RefreshToken  # noqa
+from app.models.outbox_event import OutboxEvent, OutboxCursor, OutboxSequence  # noqa
+from app.models.archived_order import ArchivedOrder  # noqa
+from app.models.order_rollup import OrderDailyRollup, DeliveryTimeRollup  # noqa
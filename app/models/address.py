@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float
+from sqlalchemy import Column, Integer, String, Float, Index
 from app.database import Base
 
 
@@ -19,3 +19,6 @@ class Address(Base):
     latitude = Column(Float, nullable=True)
     longitude = Column(Float, nullable=True)
 
+
+# Reaproveitamento de coordenadas por CEP + número (geocoding)
+Index("ix_addresses_cep_number", Address.cep, Address.number)
@@ -0,0 +1,26 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary
+from app.database import Base
+
+
+class ArchivedOrder(Base):
+    """
+    Pedido finalizado (entregue/cancelado) movido para o armazenamento frio.
+
+    Pedido, endereços e timeline completos ficam em `document` (JSON
+    comprimido com zlib); só as colunas de busca ficam abertas. O `id` é
+    o mesmo que o pedido tinha em `orders`.
+    """
+    __tablename__ = "archived_orders"
+
+    id = Column(Integer, primary_key=True)
+    # Sem unique: um código reaproveitado por um pedido novo não impede o arquivamento
+    tracking_code = Column(String(50), index=True, nullable=False)
+    owner_id = Column(Integer, index=True, nullable=False)
+    status = Column(String(20), nullable=False)
+
+    created_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime, nullable=False)  # updated_at do pedido
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    document = Column(LargeBinary, nullable=False)
@@ -0,0 +1,19 @@
+from datetime import datetime
+from sqlalchemy import Column, String, Boolean, DateTime
+from app.database import Base
+
+
+class CepCacheEntry(Base):
+    """Cache persistente de consultas ao ViaCEP (inclusive CEPs inexistentes)"""
+    __tablename__ = "cep_cache"
+
+    cep = Column(String(8), primary_key=True)  # somente dígitos
+    found = Column(Boolean, nullable=False)  # False = ViaCEP retornou {"erro": true}
+
+    # Dados do endereço (vazios quando found=False)
+    street = Column(String(255), nullable=True)
+    neighborhood = Column(String(255), nullable=True)
+    city = Column(String(100), nullable=True)
+    state = Column(String(2), nullable=True)
+
+    fetched_at = Column(DateTime, default=datetime.utcnow, nullable=False)
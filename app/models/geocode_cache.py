@@ -0,0 +1,16 @@
+from datetime import datetime
+from sqlalchemy import Column, String, Boolean, Float, DateTime
+from app.database import Base
+
+
+class GeocodeCacheEntry(Base):
+    """Cache persistente do Nominatim, chaveado pelo endereço normalizado"""
+    __tablename__ = "geocode_cache"
+
+    key = Column(String(512), primary_key=True)  # ex: "q:av paulista,1000,sao paulo,sp,brazil"
+    found = Column(Boolean, nullable=False)  # False = Nominatim não encontrou
+
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+
+    fetched_at = Column(DateTime, default=datetime.utcnow, nullable=False)
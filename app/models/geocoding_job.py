@@ -0,0 +1,21 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Text
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+
+class GeocodingJob(Base):
+    """Endereço aguardando geocoding em segundo plano (fila durável)"""
+    __tablename__ = "geocoding_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    address_id = Column(Integer, ForeignKey("addresses.id"), unique=True, nullable=False)
+    address = relationship("Address")
+
+    # Controle de tentativas (backoff exponencial)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
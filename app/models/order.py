@@ -1,6 +1,6 @@
 from enum import Enum
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -12,6 +12,10 @@ class OrderStatus(str, Enum):
     CANCELED = "canceled"
 
 
+# Pedido nesses status não muda mais (e pode ser arquivado)
+FINAL_STATUSES = {OrderStatus.DELIVERED.value, OrderStatus.CANCELED.value}
+
+
 class Order(Base):
     __tablename__ = "orders"
 
@@ -32,8 +36,19 @@ class Order(Base):
     
     # Relacionamento com eventos de tracking (timeline)
     events = relationship("OrderEvent", back_populates="order", order_by="OrderEvent.created_at.desc()")
+
+    # Resumo da timeline (mantido pelo create_order_event e pelos lotes):
+    # listagens mostram a última atualização sem ler order_events
+    last_event_label = Column(String(100), nullable=True)
+    last_event_at = Column(DateTime, nullable=True)
+    event_count = Column(Integer, default=0, nullable=False)
     
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
+
+# Índices das listagens paginadas (keyset em created_at, id)
+Index("ix_orders_owner_id_created_at", Order.owner_id, Order.created_at.desc(), Order.id.desc())
+Index("ix_orders_status_created_at", Order.status, Order.created_at.desc(), Order.id.desc())
+Index("ix_orders_created_at", Order.created_at.desc(), Order.id.desc())
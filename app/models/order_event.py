@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -31,3 +31,6 @@ class OrderEvent(Base):
     # Timestamp do evento
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
+
+# Timeline de um pedido (rastreio)
+Index("ix_order_events_order_id_created_at", OrderEvent.order_id, OrderEvent.created_at)
@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, String, Date, BigInteger
+from app.database import Base
+
+
+class OrderDailyRollup(Base):
+    """
+    Contagem diária de eventos por status e rota (UF de origem -> destino).
+    status = created conta os pedidos criados no dia; os demais, as
+    transições. Mantida incrementalmente a cada evento (analytics_service).
+    """
+    __tablename__ = "order_daily_rollups"
+
+    day = Column(Date, primary_key=True)
+    status = Column(String(20), primary_key=True)
+    origin_state = Column(String(2), primary_key=True)
+    destination_state = Column(String(2), primary_key=True)
+
+    count = Column(BigInteger, default=0, nullable=False)
+
+
+class DeliveryTimeRollup(Base):
+    """
+    Histograma diário do tempo criação -> entrega, por UF de destino.
+    Os buckets crescem em √2 (ver analytics_service.delivery_bucket), o
+    que permite estimar a mediana sem guardar cada entrega.
+    """
+    __tablename__ = "delivery_time_rollups"
+
+    day = Column(Date, primary_key=True)
+    destination_state = Column(String(2), primary_key=True)
+    bucket = Column(Integer, primary_key=True)
+
+    count = Column(BigInteger, default=0, nullable=False)
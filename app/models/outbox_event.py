@@ -0,0 +1,51 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Text
+from app.database import Base
+
+
+class OutboxEvent(Base):
+    """
+    Mudança de pedido para sistemas externos (outbox transacional).
+
+    Gravada na mesma transação do OrderEvent: se o pedido foi salvo, o
+    evento existe. A `position` é numerada logo depois do commit, em ordem
+    de commit (ver outbox_service.assign_positions): é o cursor do feed /events/changes e dos webhooks.
+    O `id` segue a ordem dos INSERTs, que pode diferir da ordem dos commits.
+    """
+    __tablename__ = "outbox_events"
+
+    # SQLite só gera autoincremento para INTEGER PRIMARY KEY
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+
+    event_type = Column(String(50), nullable=False)  # order.created, order.status_changed
+    order_id = Column(Integer, nullable=False)
+    tracking_code = Column(String(50), nullable=False)
+    payload = Column(Text, nullable=False)  # JSON
+
+    # NULL até o evento commitado ser numerado (dispatcher ou feed)
+    position = Column(BigInteger, nullable=True, unique=True, index=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class OutboxSequence(Base):
+    """
+    Última `position` distribuída (linha única, id=1). Travada só pela
+    transação curta que numera eventos já commitados, o que serializa as
+    numerações (não as escritas de pedidos) e garante que as posições
+    aparecem em ordem.
+    """
+    __tablename__ = "outbox_sequence"
+
+    id = Column(Integer, primary_key=True)
+    last_position = Column(BigInteger, default=0, nullable=False)
+
+
+class OutboxCursor(Base):
+    """Último evento entregue a cada consumidor do dispatcher (webhook)"""
+    __tablename__ = "outbox_cursors"
+
+    consumer = Column(String(200), primary_key=True)
+    last_id = Column(BigInteger, default=0, nullable=False)  # última OutboxEvent.position entregue
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
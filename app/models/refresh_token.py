@@ -0,0 +1,28 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index
+from app.database import Base
+
+
+class RefreshToken(Base):
+    """
+    Refresh token (guardamos só o SHA-256). Cada login abre uma sessão
+    (`session_id`, claim `sid` do access token); a cada renovação o token
+    é trocado por um novo da mesma sessão.
+    """
+    __tablename__ = "refresh_tokens"
+
+    token_hash = Column(String(64), primary_key=True)
+    session_id = Column(String(32), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+
+    expires_at = Column(DateTime, nullable=False)
+    # Preenchido quando o token é trocado na renovação (reuso = roubo)
+    replaced_at = Column(DateTime, nullable=True)
+    # Preenchido em todos os tokens da sessão no logout / reuso detectado
+    revoked_at = Column(DateTime, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+# Sincronização das revogações entre workers (revoked_at recentes)
+Index("ix_refresh_tokens_revoked_at", RefreshToken.revoked_at)
@@ -0,0 +1,16 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from app.database import Base
+
+
+class ScanIdempotencyKey(Base):
+    """
+    Leituras de scanner já aplicadas, para que lotes reenviados não
+    dupliquem eventos na timeline.
+    """
+    __tablename__ = "scan_idempotency_keys"
+
+    key = Column(String(200), primary_key=True)  # enviada pelo scanner ou "código:status:timestamp"
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
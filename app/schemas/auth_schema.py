@@ -4,7 +4,14 @@ from pydantic import BaseModel
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: str | None = None
+
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
 
 
 class TokenData(BaseModel):
     sub: str | None = None  # normalmente o id do usuário
+    role: str | None = None  # role no momento da emissão do token
+    sid: str | None = None  # sessão (refresh token) que emitiu o token
@@ -0,0 +1,20 @@
+from datetime import datetime
+from pydantic import BaseModel
+
+
+class ChangeEvent(BaseModel):
+    """Mudança de pedido no feed (outbox)"""
+    id: int
+    position: int  # ordem de commit (cursor do feed)
+    event_type: str  # order.created, order.status_changed
+    order_id: int
+    tracking_code: str
+    payload: dict
+    created_at: datetime
+
+
+class ChangeFeedPage(BaseModel):
+    """Página do feed de mudanças"""
+    items: list[ChangeEvent]
+    # Sempre preenchido: envie como `since` na próxima leitura
+    next_cursor: int
@@ -1,7 +1,8 @@
-from datetime import datetime
+from datetime import date, datetime
 from enum import Enum
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
+from app.core.config import settings
 from app.schemas.address_schema import AddressCreateByCEP, AddressResponse
 
 
@@ -43,6 +44,108 @@ class OrderListResponse(BaseModel):
     status: OrderStatus
     created_at: datetime
 
+    # Última atualização (só com include_last_event=true)
+    last_event_label: str | None = None
+    last_event_at: datetime | None = None
+    event_count: int | None = None
+
     class Config:
         from_attributes = True
 
+
+
+class OrderPage(BaseModel):
+    """Página de pedidos (paginação por cursor)"""
+    items: list[OrderListResponse]
+    next_cursor: str | None = None  # None = última página
+
+
+class OrderBulkCreate(BaseModel):
+    """Lote de pedidos para criação em massa (integrações)"""
+    orders: list[OrderCreate] = Field(
+        ..., min_length=1, max_length=settings.ORDERS_BULK_MAX_ITEMS
+    )
+
+
+class OrderBulkItemResult(BaseModel):
+    """Resultado de um item do lote (mesma posição do envio)"""
+    index: int
+    success: bool
+    id: int | None = None
+    tracking_code: str | None = None
+    error: str | None = None
+    retryable: bool = False  # falha temporária (ex: timeout do ViaCEP): pode reenviar o item
+
+
+class OrderBulkResponse(BaseModel):
+    created: int
+    failed: int
+    results: list[OrderBulkItemResult]
+
+
+class OrderScan(BaseModel):
+    """Leitura de scanner da transportadora"""
+    tracking_code: str
+    status: OrderStatus
+    timestamp: datetime
+    # Opcional: sem ela, a chave é "código:status:timestamp"
+    idempotency_key: str | None = Field(None, max_length=200)
+
+
+class OrderScanBatch(BaseModel):
+    scans: list[OrderScan] = Field(
+        ..., min_length=1, max_length=settings.ORDERS_SCAN_BATCH_MAX_ITEMS
+    )
+
+
+class OrderScanResult(BaseModel):
+    """Resultado de uma leitura (mesma posição do envio)"""
+    index: int
+    tracking_code: str
+    applied: bool
+    duplicate: bool = False
+    stale: bool = False  # mais antiga que o último evento do pedido
+    error: str | None = None
+
+
+class OrderScanBatchResponse(BaseModel):
+    applied: int
+    duplicates: int
+    stale: int
+    rejected: int
+    results: list[OrderScanResult]
+
+
+class OrderStatusCounts(BaseModel):
+    """Pedidos criados e transições de status no período"""
+    created: int = 0
+    in_transit: int = 0
+    delivered: int = 0
+    canceled: int = 0
+
+
+class OrderStatsTotals(OrderStatusCounts):
+    # Tempo criação -> entrega (aproximado pelo histograma dos rollups)
+    median_delivery_hours: float | None = None
+
+
+class OrderDailyStats(OrderStatsTotals):
+    day: date
+
+
+class OrderOriginStateStats(OrderStatusCounts):
+    state: str
+
+
+class OrderDestinationStateStats(OrderStatsTotals):
+    state: str
+
+
+class OrderStats(BaseModel):
+    """Painel do admin (GET /orders/stats), montado a partir dos rollups diários"""
+    date_from: date
+    date_to: date
+    totals: OrderStatsTotals
+    days: list[OrderDailyStats]
+    by_origin_state: list[OrderOriginStateStats]
+    by_destination_state: list[OrderDestinationStateStats]
@@ -0,0 +1,203 @@
+import math
+from collections import defaultdict
+from datetime import date, datetime
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.database import dialect_insert
+from app.models.order import OrderStatus
+from app.models.order_rollup import OrderDailyRollup, DeliveryTimeRollup
+
+# Buckets do histograma de entrega: crescem em √2 a partir de 1 minuto
+# (o último acumula tudo acima de ~2^31 minutos)
+DELIVERY_BUCKETS = 64
+
+STATUSES = [status.value for status in OrderStatus]
+
+
+def delivery_bucket(seconds: float) -> int:
+    """Bucket do tempo criação -> entrega (0 = menos de 1 minuto)"""
+    minutes = seconds / 60
+    if minutes < 1:
+        return 0
+    return min(int(2 * math.log2(minutes)) + 1, DELIVERY_BUCKETS - 1)
+
+
+def bucket_bounds(bucket: int) -> tuple[float, float]:
+    """Intervalo [início, fim) do bucket, em segundos"""
+    if bucket == 0:
+        return 0.0, 60.0
+    return 60 * 2 ** ((bucket - 1) / 2), 60 * 2 ** (bucket / 2)
+
+
+def approximate_median(histogram: dict[int, int]) -> float | None:
+    """Mediana (segundos) interpolada dentro do bucket; erro < 41% no pior caso"""
+    total = sum(histogram.values())
+    if not total:
+        return None
+
+    half = total / 2
+    seen = 0
+    for bucket in sorted(histogram):
+        count = histogram[bucket]
+        if seen + count >= half:
+            low, high = bucket_bounds(bucket)
+            return low + (high - low) * (half - seen) / count
+        seen += count
+    return None
+
+
+def record_order_event(
+    db,
+    status: str,
+    occurred_at: datetime,
+    origin_state: str,
+    destination_state: str,
+    delivery_seconds: float | None = None,
+) -> None:
+    """
+    Soma o evento nos rollups diários. Os incrementos ficam na sessão e
+    viram um upsert por chave no commit (ver _write_rollups); rollback
+    descarta tudo. Aceita Session ou AsyncSession.
+    """
+    session = getattr(db, "sync_session", db)
+    deltas = session.info.setdefault("rollup_deltas", {
+        "orders": defaultdict(int),
+        "delivery": defaultdict(int),
+    })
+
+    day = occurred_at.date()
+    deltas["orders"][(day, status, origin_state, destination_state)] += 1
+    if status == OrderStatus.DELIVERED.value and delivery_seconds is not None:
+        bucket = delivery_bucket(max(delivery_seconds, 0))
+        deltas["delivery"][(day, destination_state, bucket)] += 1
+
+
+def upsert_counts(conn, table, keys: tuple[str, ...], deltas: dict[tuple, int]) -> None:
+    """Soma `deltas` nas contagens de `table` (um INSERT ... ON CONFLICT por chave)"""
+    if not deltas:
+        return
+
+    stmt = dialect_insert(conn.dialect.name, table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={"count": table.c["count"] + stmt.excluded["count"]},
+    )
+    # Chaves sempre na mesma ordem: transações concorrentes não se travam em ciclo
+    conn.execute(stmt, [
+        {**dict(zip(keys, key)), "count": count}
+        for key, count in sorted(deltas.items())
+    ])
+
+
+@event.listens_for(Session, "before_commit")
+def _write_rollups(session: Session) -> None:
+    """
+    Grava os incrementos acumulados na transação. Roda no fim, logo antes
+    do COMMIT, para que as linhas do dia (disputadas por todos os pedidos)
+    fiquem travadas o mínimo possível.
+    """
+    deltas = session.info.get("rollup_deltas")
+    if not deltas:
+        return
+
+    session.flush()
+    session.info.pop("rollup_deltas", None)
+    conn = session.connection()
+    upsert_counts(
+        conn,
+        OrderDailyRollup.__table__,
+        ("day", "status", "origin_state", "destination_state"),
+        deltas["orders"],
+    )
+    upsert_counts(
+        conn,
+        DeliveryTimeRollup.__table__,
+        ("day", "destination_state", "bucket"),
+        deltas["delivery"],
+    )
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rollups(session: Session) -> None:
+    session.info.pop("rollup_deltas", None)
+
+
+def _median_hours(histogram: dict[int, int]) -> float | None:
+    median = approximate_median(histogram)
+    return round(median / 3600, 2) if median is not None else None
+
+
+async def load_order_stats(db: AsyncSession, date_from: date, date_to: date) -> dict:
+    """
+    Estatísticas do período a partir dos rollups: o custo depende do
+    número de dias e de UFs, não da quantidade de pedidos.
+    """
+    counts = await db.execute(
+        select(
+            OrderDailyRollup.day,
+            OrderDailyRollup.status,
+            OrderDailyRollup.origin_state,
+            OrderDailyRollup.destination_state,
+            OrderDailyRollup.count,
+        )
+        .where(OrderDailyRollup.day >= date_from, OrderDailyRollup.day <= date_to)
+    )
+    histograms = await db.execute(
+        select(
+            DeliveryTimeRollup.day,
+            DeliveryTimeRollup.destination_state,
+            DeliveryTimeRollup.bucket,
+            DeliveryTimeRollup.count,
+        )
+        .where(DeliveryTimeRollup.day >= date_from, DeliveryTimeRollup.day <= date_to)
+    )
+
+    def empty() -> dict[str, int]:
+        return dict.fromkeys(STATUSES, 0)
+
+    totals = empty()
+    by_day = defaultdict(empty)
+    by_origin = defaultdict(empty)
+    by_destination = defaultdict(empty)
+    # Desempacota as linhas como tuplas: cada `row.atributo` do Row custa
+    # ~1 µs, e o laço passa por todas as linhas do período (dias x rotas)
+    for day, status, origin_state, destination_state, count in counts:
+        if status not in totals:
+            continue
+        totals[status] += count
+        by_day[day][status] += count
+        by_origin[origin_state][status] += count
+        by_destination[destination_state][status] += count
+
+    delivery_total = defaultdict(int)
+    delivery_by_day = defaultdict(lambda: defaultdict(int))
+    delivery_by_destination = defaultdict(lambda: defaultdict(int))
+    for day, destination_state, bucket, count in histograms:
+        delivery_total[bucket] += count
+        delivery_by_day[day][bucket] += count
+        delivery_by_destination[destination_state][bucket] += count
+
+    return {
+        "date_from": date_from,
+        "date_to": date_to,
+        "totals": {**totals, "median_delivery_hours": _median_hours(delivery_total)},
+        "days": [
+            {"day": day, **by_day[day], "median_delivery_hours": _median_hours(delivery_by_day[day])}
+            for day in sorted(set(by_day) | set(delivery_by_day))
+        ],
+        "by_origin_state": [
+            {"state": state, **values}
+            for state, values in sorted(by_origin.items())
+        ],
+        "by_destination_state": [
+            {
+                "state": state,
+                **by_destination[state],
+                "median_delivery_hours": _median_hours(delivery_by_destination[state]),
+            }
+            for state in sorted(set(by_destination) | set(delivery_by_destination))
+        ],
+    }
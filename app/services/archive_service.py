@@ -0,0 +1,202 @@
+import json
+import logging
+import zlib
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app.models.address import Address
+from app.models.archived_order import ArchivedOrder
+from app.models.geocoding_job import GeocodingJob
+from app.models.order import FINAL_STATUSES, Order
+from app.models.order_event import OrderEvent, STATUS_LABELS
+from app.models.scan_idempotency_key import ScanIdempotencyKey
+from app.schemas.tracking_schema import TrackingAddressPublic, TrackingEvent, TrackingResponse
+from app.utils.partitions import add_months, drop_empty_partitions, ensure_monthly_partitions, month_start
+
+logger = logging.getLogger(__name__)
+
+_ADDRESS_FIELDS = ("cep", "street", "number", "complement", "city", "state", "latitude", "longitude")
+
+
+def _address_document(address: Address) -> dict:
+    return {field: getattr(address, field) for field in _ADDRESS_FIELDS}
+
+
+def build_archive_document(order: Order) -> dict:
+    """Pedido completo (endereços e timeline, mais recente primeiro) para o arquivo"""
+    return {
+        "id": order.id,
+        "tracking_code": order.tracking_code,
+        "status": order.status,
+        "owner_id": order.owner_id,
+        "origin_address": _address_document(order.origin_address),
+        "destination_address": _address_document(order.destination_address),
+        "events": [
+            {
+                "status": event.status,
+                "status_label": event.status_label,
+                "description": event.description,
+                "created_at": event.created_at.isoformat(),
+            }
+            for event in order.events
+        ],
+        "created_at": order.created_at.isoformat(),
+        "updated_at": order.updated_at.isoformat(),
+    }
+
+
+def compress_document(document: dict) -> bytes:
+    raw = json.dumps(document, ensure_ascii=False, separators=(",", ":")).encode()
+    return zlib.compress(raw, settings.ARCHIVE_COMPRESSION_LEVEL)
+
+
+def decompress_document(blob: bytes) -> dict:
+    return json.loads(zlib.decompress(blob))
+
+
+def _archive_batch(db: Session, cutoff: datetime, batch_size: int) -> int:
+    """Arquiva um lote numa transação só: copia para archived_orders e apaga das tabelas quentes"""
+    query = (
+        select(Order.id)
+        .where(Order.status.in_(FINAL_STATUSES), Order.updated_at < cutoff)
+        .order_by(Order.id)
+        .limit(batch_size)
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        # Outra execução do job em paralelo pega os lotes seguintes
+        query = query.with_for_update(skip_locked=True)
+
+    order_ids = db.scalars(query).all()
+    if not order_ids:
+        return 0
+
+    orders = db.scalars(
+        select(Order)
+        .options(
+            joinedload(Order.origin_address),
+            joinedload(Order.destination_address),
+            selectinload(Order.events),
+        )
+        .where(Order.id.in_(order_ids))
+    ).unique().all()
+
+    db.execute(insert(ArchivedOrder), [
+        {
+            "id": order.id,
+            "tracking_code": order.tracking_code,
+            "owner_id": order.owner_id,
+            "status": order.status,
+            "created_at": order.created_at,
+            "finished_at": order.updated_at,
+            "document": compress_document(build_archive_document(order)),
+        }
+        for order in orders
+    ])
+
+    address_ids = [
+        address_id
+        for order in orders
+        for address_id in (order.origin_address_id, order.destination_address_id)
+    ]
+    db.expunge_all()
+
+    for statement in (
+        delete(OrderEvent).where(OrderEvent.order_id.in_(order_ids)),
+        delete(ScanIdempotencyKey).where(ScanIdempotencyKey.order_id.in_(order_ids)),
+        delete(Order).where(Order.id.in_(order_ids)),
+        delete(GeocodingJob).where(GeocodingJob.address_id.in_(address_ids)),
+        delete(Address).where(Address.id.in_(address_ids)),
+    ):
+        db.execute(statement.execution_options(synchronize_session=False))
+
+    db.commit()
+    return len(orders)
+
+
+def archive_finished_orders(
+    older_than_days: int | None = None,
+    batch_size: int | None = None,
+    max_batches: int | None = None,
+) -> int:
+    """
+    Move pedidos entregues/cancelados há mais de `older_than_days` dias
+    para archived_orders, em lotes (uma transação por lote).
+
+    O rastreio público continua funcionando (track_order lê o arquivo
+    quando o código não está mais em `orders`); as listagens e o detalhe
+    do pedido mostram só pedidos quentes.
+
+    Returns:
+        Quantidade de pedidos arquivados.
+    """
+    days = settings.ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    cutoff = datetime.utcnow() - timedelta(days=days)
+
+    total = 0
+    batches = 0
+    with SessionLocal() as db:
+        while max_batches is None or batches < max_batches:
+            archived = _archive_batch(db, cutoff, size)
+            total += archived
+            batches += 1
+            if archived < size:
+                break
+            logger.info("%d pedido(s) arquivados até agora", total)
+    return total
+
+
+def maintain_event_partitions() -> tuple[list[str], list[str]]:
+    """
+    Postgres com order_events particionada: cria as partições dos próximos
+    meses e remove as antigas que o arquivamento esvaziou. Noutros bancos
+    não faz nada.
+
+    Returns:
+        (partições criadas, partições removidas)
+    """
+    today = date.today()
+    with SessionLocal() as db:
+        conn = db.connection()
+        created = ensure_monthly_partitions(
+            conn,
+            "order_events",
+            today,
+            add_months(today, settings.ORDER_EVENTS_PARTITION_MONTHS_AHEAD),
+        )
+        # Só meses inteiros mais antigos que a janela de arquivamento
+        cutoff = (datetime.utcnow() - timedelta(days=settings.ARCHIVE_AFTER_DAYS)).date()
+        dropped = drop_empty_partitions(conn, "order_events", month_start(cutoff))
+        db.commit()
+    return created, dropped
+
+
+async def load_archived_tracking(db: AsyncSession, tracking_code: str) -> TrackingResponse | None:
+    """Rastreio público de um pedido arquivado (mesmo formato do pedido quente)"""
+    blob = await db.scalar(
+        select(ArchivedOrder.document)
+        .where(ArchivedOrder.tracking_code == tracking_code)
+        .order_by(ArchivedOrder.archived_at.desc())
+        .limit(1)
+    )
+    if blob is None:
+        return None
+
+    document = decompress_document(blob)
+    origin = document["origin_address"]
+    destination = document["destination_address"]
+    return TrackingResponse(
+        tracking_code=document["tracking_code"],
+        status=document["status"],
+        status_label=STATUS_LABELS.get(document["status"], document["status"]),
+        origin=TrackingAddressPublic(city=origin["city"], state=origin["state"]),
+        destination=TrackingAddressPublic(city=destination["city"], state=destination["state"]),
+        events=[TrackingEvent(**event) for event in document["events"]],
+        created_at=document["created_at"],
+        updated_at=document["updated_at"],
+    )
@@ -1,56 +1,169 @@
+import time
+from dataclasses import dataclass
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
 from app.models.user import User, UserRole
 from app.schemas.auth_schema import TokenData
-from app.services.db_service import get_db
+from app.services.db_service import get_async_db
+from app.services.session_service import is_session_revoked
+from app.utils.cache import TTLCache, MISSING
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
 
-def get_current_user(
-    db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme),
-) -> User:
-    credentials_exception = HTTPException(
+@dataclass(frozen=True)
+class Principal:
+    """Quem fez o request: o suficiente para as checagens de permissão"""
+    id: int
+    role: str
+
+
+@dataclass(frozen=True)
+class CurrentUser(Principal):
+    """Dados do usuário autenticado (desacoplado da sessão do banco)"""
+    email: str
+    full_name: str | None
+
+
+# Tokens já validados (assinatura + expiração) -> claims.
+# A entrada nunca vive além do `exp` do próprio token; a revogação
+# (logout) é conferida a cada request, fora deste cache.
+_token_cache = TTLCache(
+    max_size=settings.AUTH_CACHE_MAX_SIZE,
+    ttl_seconds=settings.AUTH_TOKEN_CACHE_TTL_SECONDS,
+)
+
+# id do usuário -> CurrentUser. Invalidado em update_user_role só no
+# processo que atendeu a mudança: nos demais workers, a defasagem máxima
+# é AUTH_PRINCIPAL_CACHE_TTL_SECONDS (mantenha curto).
+_principal_cache = TTLCache(
+    max_size=settings.AUTH_CACHE_MAX_SIZE,
+    ttl_seconds=settings.AUTH_PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Não foi possível validar as credenciais.",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+
+def decode_token(token: str) -> TokenData:
+    """
+    Valida o JWT e retorna as claims (com cache até o vencimento).
+    Tokens de sessões revogadas (logout) são recusados.
+    """
+    token_data = _token_cache.get(token)
+    if token_data is MISSING:
+        token_data = _decode_jwt(token)
+
+    if token_data.sid is not None and is_session_revoked(token_data.sid):
+        raise _credentials_exception()
+
+    return token_data
+
+
+def _decode_jwt(token: str) -> TokenData:
     try:
         payload = jwt.decode(
             token,
             settings.SECRET_KEY,
             algorithms=[settings.ALGORITHM],
         )
-        sub: str | None = payload.get("sub")
-        if sub is None:
-            raise credentials_exception
-        token_data = TokenData(sub=sub)
     except JWTError:
-        raise credentials_exception
+        raise _credentials_exception()
+
+    sub: str | None = payload.get("sub")
+    if sub is None or not sub.isdigit():
+        raise _credentials_exception()
+
+    token_data = TokenData(sub=sub, role=payload.get("role"), sid=payload.get("sid"))
+    remaining = payload.get("exp", 0) - time.time()
+    _token_cache.set(token, token_data, ttl_seconds=min(remaining, _token_cache.ttl_seconds))
+    return token_data
 
-    user = db.query(User).filter(User.id == int(token_data.sub)).first()
+
+def invalidate_user(user_id: int) -> None:
+    """
+    Descarta o usuário do cache (ex: role alterado).
+
+    Vale só para este processo: outros workers continuam com a cópia
+    antiga até ela expirar (AUTH_PRINCIPAL_CACHE_TTL_SECONDS).
+    """
+    _principal_cache.delete(user_id)
+
+
+async def _load_principal(db: AsyncSession, user_id: int) -> CurrentUser | None:
+    cached = _principal_cache.get(user_id)
+    if cached is not MISSING:
+        return cached
+
+    user = await db.get(User, user_id)
     if user is None:
-        raise credentials_exception
+        return None
 
-    return user
+    principal = CurrentUser(
+        id=user.id,
+        email=user.email,
+        full_name=user.full_name,
+        role=user.role,
+    )
+    _principal_cache.set(user_id, principal)
+    return principal
 
 
-def get_current_admin(
-    current_user: User = Depends(get_current_user),
-) -> User:
+async def get_current_user(
+    db: AsyncSession = Depends(get_async_db),
+    token: str = Depends(oauth2_scheme),
+) -> CurrentUser:
+    """
+    Usuário autenticado. Com o token e o usuário em cache, não consulta
+    o banco (a sessão só abre conexão se for usada).
+    """
+    token_data = decode_token(token)
+
+    principal = await _load_principal(db, int(token_data.sub))
+    if principal is None:
+        raise _credentials_exception()
+
+    return principal
+
+
+async def get_current_admin(
+    db: AsyncSession = Depends(get_async_db),
+    token: str = Depends(oauth2_scheme),
+) -> Principal:
     """
     Dependency que verifica se o usuário atual é um administrador.
     Use em rotas que devem ser acessíveis apenas por admins.
+
+    Com AUTH_TRUST_ROLE_CLAIM, o role gravado no token é suficiente e o
+    retorno é só um Principal (id + role, sem email/nome do banco).
     """
-    if current_user.role != UserRole.ADMIN.value:
+    token_data = decode_token(token)
+
+    principal: Principal
+    if settings.AUTH_TRUST_ROLE_CLAIM and token_data.role is not None:
+        principal = Principal(id=int(token_data.sub), role=token_data.role)
+    else:
+        principal = await _load_principal(db, int(token_data.sub))
+        if principal is None:
+            raise _credentials_exception()
+
+    if principal.role != UserRole.ADMIN.value:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Acesso restrito a administradores.",
         )
-    return current_user
+    return principal
+
+
+def get_auth_cache_stats() -> dict:
+    return {"tokens": _token_cache.stats(), "principals": _principal_cache.stats()}
@@ -0,0 +1,130 @@
+import csv
+import io
+import json
+from collections import defaultdict
+from typing import AsyncIterator
+
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+
+from app.core.config import settings
+from app.database import AsyncSessionLocal
+from app.models.address import Address
+from app.models.order import Order
+from app.models.order_event import OrderEvent
+from app.utils.pagination import encode_cursor
+
+OriginAddress = aliased(Address)
+DestinationAddress = aliased(Address)
+
+_ORDER_FIELDS = ["id", "tracking_code", "status", "owner_id", "created_at", "updated_at"]
+_ADDRESS_FIELDS = ["cep", "street", "number", "complement", "city", "state", "latitude", "longitude"]
+_EVENT_FIELDS = ["status", "status_label", "description", "created_at"]
+
+
+def build_export_query(include_addresses: bool):
+    """Select só com as colunas exportadas (sem carregar entidades ORM)"""
+    columns = [getattr(Order, field) for field in _ORDER_FIELDS]
+    query = select(*columns)
+
+    if include_addresses:
+        for prefix, alias in (("origin", OriginAddress), ("destination", DestinationAddress)):
+            columns = [getattr(alias, f).label(f"{prefix}_{f}") for f in _ADDRESS_FIELDS]
+            query = query.add_columns(*columns)
+        query = query.join(OriginAddress, Order.origin_address_id == OriginAddress.id).join(
+            DestinationAddress, Order.destination_address_id == DestinationAddress.id
+        )
+
+    return query
+
+
+def _serialize(value):
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+async def _load_events(order_ids: list[int]) -> dict[int, list[dict]]:
+    """Eventos de um lote de pedidos (1 query por lote)"""
+    events = defaultdict(list)
+    async with AsyncSessionLocal() as db:
+        rows = await db.execute(
+            select(OrderEvent.order_id, *[getattr(OrderEvent, f) for f in _EVENT_FIELDS])
+            .where(OrderEvent.order_id.in_(order_ids))
+            .order_by(OrderEvent.order_id, OrderEvent.created_at)
+        )
+        for row in rows:
+            events[row.order_id].append({f: _serialize(getattr(row, f)) for f in _EVENT_FIELDS})
+    return events
+
+
+async def _iter_records(
+    query,
+    include_addresses: bool,
+    include_events: bool,
+) -> AsyncIterator[list[dict]]:
+    """
+    Percorre os pedidos com cursor do lado do servidor (yield_per), em lotes
+    de ORDERS_EXPORT_BATCH_SIZE; a memória usada não depende do tamanho da tabela.
+    """
+    batch_size = settings.ORDERS_EXPORT_BATCH_SIZE
+    query = query.order_by(Order.created_at.desc(), Order.id.desc())
+
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=batch_size))
+
+        async for rows in result.partitions(batch_size):
+            events = {}
+            if include_events:
+                events = await _load_events([row.id for row in rows])
+
+            records = []
+            for row in rows:
+                record = {f: _serialize(getattr(row, f)) for f in _ORDER_FIELDS}
+                if include_addresses:
+                    for prefix in ("origin", "destination"):
+                        record[f"{prefix}_address"] = {
+                            f: getattr(row, f"{prefix}_{f}") for f in _ADDRESS_FIELDS
+                        }
+                if include_events:
+                    record["events"] = events.get(row.id, [])
+                # Para retomar a exportação a partir deste pedido
+                record["cursor"] = encode_cursor(row.created_at, row.id)
+                records.append(record)
+
+            yield records
+
+
+async def stream_ndjson(query, include_addresses: bool, include_events: bool) -> AsyncIterator[str]:
+    """Um pedido por linha, em JSON"""
+    async for records in _iter_records(query, include_addresses, include_events):
+        yield "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+
+
+async def stream_csv(query, include_addresses: bool, include_events: bool) -> AsyncIterator[str]:
+    """CSV com endereços achatados em colunas e eventos como JSON em uma coluna"""
+    header = list(_ORDER_FIELDS)
+    if include_addresses:
+        header += [f"{p}_{f}" for p in ("origin", "destination") for f in _ADDRESS_FIELDS]
+    if include_events:
+        header.append("events")
+    header.append("cursor")
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+
+    async for records in _iter_records(query, include_addresses, include_events):
+        for record in records:
+            for prefix in ("origin", "destination"):
+                for f, value in record.pop(f"{prefix}_address", {}).items():
+                    record[f"{prefix}_{f}"] = value
+            if include_events:
+                record["events"] = json.dumps(record["events"], ensure_ascii=False)
+            writer.writerow([record[column] for column in header])
+
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    # Tabela vazia: envia pelo menos o cabeçalho
+    if buffer.tell():
+        yield buffer.getvalue()
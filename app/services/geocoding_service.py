@@ -1,5 +1,23 @@
-import httpx
+import logging
+import re
+import unicodedata
+from datetime import datetime
+
 from pydantic import BaseModel
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core.config import settings
+from app.core.instrumentation import measure_external
+from app.database import AsyncSessionLocal, dialect_insert
+from app.models.address import Address
+from app.models.geocode_cache import GeocodeCacheEntry
+from app.services.http_client import get_http_client
+from app.utils.batching import BatchLoader
+from app.utils.cache import TTLCache, MISSING
+from app.utils.rate_limiter import TokenBucketScheduler, PRIORITY_INTERACTIVE
+
+logger = logging.getLogger(__name__)
 
 
 class Coordinates(BaseModel):
@@ -7,88 +25,304 @@ class Coordinates(BaseModel):
     longitude: float
 
 
+# Fila única do processo para o Nominatim (política de 1 request/segundo)
+nominatim_scheduler = TokenBucketScheduler(
+    rate=settings.NOMINATIM_RATE_PER_SECOND,
+    burst=settings.NOMINATIM_BURST,
+)
+
+# Camada 1: LRU em memória, chaveado pelo endereço normalizado.
+# Guarda também resultados negativos (None).
+_geocode_cache = TTLCache(
+    max_size=settings.GEOCODE_CACHE_MAX_SIZE,
+    ttl_seconds=settings.GEOCODE_CACHE_TTL_SECONDS,
+)
+
+# Contadores por camada (o LRU tem os próprios hits/misses)
+_geocode_stats = {"db_hits": 0, "address_hits": 0, "api_calls": 0, "api_errors": 0}
+
+
+def normalize_address_key(*parts: str) -> str:
+    """
+    Normaliza partes de um endereço para uso como chave de cache.
+
+    "Av. Paulista,  1000, São Paulo" -> "av paulista,1000,sao paulo"
+    """
+    text = ",".join(parts)
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = text.casefold()
+    text = re.sub(r"[^\w,]+", " ", text)
+    text = re.sub(r"\s*,\s*", ",", text)
+    return re.sub(r"\s+", " ", text).strip(" ,")
+
+
+def _ttl_for(found: bool) -> int:
+    if found:
+        return settings.GEOCODE_CACHE_TTL_SECONDS
+    return settings.GEOCODE_CACHE_NEGATIVE_TTL_SECONDS
+
+
+LookupKey = tuple[str, str | None, str | None]  # (chave, CEP, número)
+
+
+async def _load_persisted(
+    lookups: list[LookupKey],
+) -> dict[LookupKey, tuple[str, Coordinates | None, float]]:
+    """
+    Camada 2: tabela geocode_cache e, se houver CEP+número, coordenadas de
+    um Address já geocodificado (ex: o mesmo depósito de origem). Uma query
+    por tabela para o lote inteiro.
+
+    Returns:
+        {lookup: (camada, coordenadas ou None, segundos de validade restantes)}
+        só para o que foi encontrado válido.
+    """
+    found: dict[LookupKey, tuple[str, Coordinates | None, float]] = {}
+    async with AsyncSessionLocal() as db:
+        keys = {key for key, _, _ in lookups}
+        result = await db.execute(select(GeocodeCacheEntry).where(GeocodeCacheEntry.key.in_(keys)))
+        entries = {entry.key: entry for entry in result.scalars()}
+
+        now = datetime.utcnow()
+        for lookup in lookups:
+            entry = entries.get(lookup[0])
+            if entry is None:
+                continue
+            remaining = _ttl_for(entry.found) - (now - entry.fetched_at).total_seconds()
+            if remaining > 0:
+                coords = None
+                if entry.found:
+                    coords = Coordinates(latitude=entry.latitude, longitude=entry.longitude)
+                found[lookup] = ("db", coords, remaining)
+
+        pairs = {
+            (cep, number)
+            for (key, cep, number) in lookups
+            if cep and number and (key, cep, number) not in found
+        }
+        if pairs:
+            result = await db.execute(
+                select(Address.cep, Address.number, Address.latitude, Address.longitude)
+                .where(
+                    # cep IN (...) usa o índice (cep, number) também no SQLite,
+                    # que não usa índice para IN de tuplas
+                    Address.cep.in_({cep for cep, _ in pairs}),
+                    tuple_(Address.cep, Address.number).in_(pairs),
+                    Address.latitude.isnot(None),
+                    Address.longitude.isnot(None),
+                )
+            )
+            by_pair = {}
+            for row in result:
+                coords = Coordinates(latitude=row.latitude, longitude=row.longitude)
+                by_pair.setdefault((row.cep, row.number), coords)
+            for (key, cep, number) in lookups:
+                coords = by_pair.get((cep, number))
+                if coords is not None and (key, cep, number) not in found:
+                    found[(key, cep, number)] = ("address", coords, settings.GEOCODE_CACHE_TTL_SECONDS)
+
+    return found
+
+
+async def _load_persisted_many(
+    lookups: list[LookupKey],
+) -> dict[LookupKey, tuple[str, Coordinates | None, float]]:
+    try:
+        found = await _load_persisted(lookups)
+    except SQLAlchemyError:
+        # Cache é best-effort: se o banco falhar, segue para a API
+        keys = [key for key, _, _ in lookups]
+        logger.warning("Falha ao ler cache de geocoding de %s", keys, exc_info=True)
+        return {}
+
+    # Coordenadas vindas de um Address viram entrada própria no geocode_cache
+    from_addresses = {
+        key: coords for (key, _, _), (layer, coords, _) in found.items() if layer == "address"
+    }
+    if from_addresses:
+        await _persist(from_addresses)
+    return found
+
+
+# Consultas ao banco pedidas juntas (ex: origem e destino) viram uma query
+# por tabela em vez de duas por endereço
+_persisted_loader = BatchLoader(_load_persisted_many)
+
+
+async def _persist(results: dict[str, Coordinates | None]) -> None:
+    """Grava (ou atualiza) os resultados na tabela geocode_cache (um upsert para o lote)"""
+    fetched_at = datetime.utcnow()
+    rows = [
+        {
+            "key": key,
+            "found": coords is not None,
+            "latitude": coords.latitude if coords else None,
+            "longitude": coords.longitude if coords else None,
+            "fetched_at": fetched_at,
+        }
+        for key, coords in results.items()
+    ]
+    async with AsyncSessionLocal() as db:
+        try:
+            # Upsert: outra busca (ou outro worker) pode gravar a mesma chave ao mesmo tempo
+            stmt = dialect_insert(db.bind.dialect.name, GeocodeCacheEntry.__table__)
+            await db.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=["key"],
+                    set_={name: stmt.excluded[name] for name in rows[0] if name != "key"},
+                ),
+                rows,
+            )
+            await db.commit()
+        except SQLAlchemyError:
+            await db.rollback()
+            logger.warning("Falha ao persistir geocoding de %s no cache", sorted(results), exc_info=True)
+
+
+async def _request(params: dict) -> Coordinates | None:
+    """
+    Executa uma busca no Nominatim e retorna o primeiro resultado.
+
+    Returns:
+        Coordinates, ou None se o Nominatim não encontrou o endereço.
+
+    Raises:
+        httpx.HTTPError / ValueError em falhas de rede, 429 ou resposta
+        inválida (essas falhas NÃO são cacheadas).
+    """
+    client = get_http_client("nominatim")
+    response = await client.get(
+        "/search",
+        params={**params, "format": "json", "limit": 1},
+    )
+
+    if response.status_code == 429:
+        # Fomos limitados: segura a fila antes de tentar de novo
+        retry_after = response.headers.get("Retry-After", "")
+        nominatim_scheduler.pause(float(retry_after) if retry_after.isdigit() else 5.0)
+
+    response.raise_for_status()
+    data = response.json()
+
+    if not data:
+        return None
+
+    result = data[0]
+    return Coordinates(
+        latitude=float(result["lat"]),
+        longitude=float(result["lon"]),
+    )
+
+
+async def _search(
+    key: str,
+    params: dict,
+    priority: int,
+    cep: str | None = None,
+    number: str | None = None,
+    use_negative_cache: bool = True,
+) -> Coordinates | None:
+    """
+    Resolve coordenadas em camadas: LRU em memória -> banco -> Nominatim.
+
+    Chamadas ao Nominatim passam pela fila com limite de taxa, e buscas
+    idênticas em andamento são agrupadas (mesma `key`). Com
+    `use_negative_cache=False` um "não encontrado" cacheado é ignorado.
+    """
+    cached = _geocode_cache.get(key)
+    if cached is not MISSING and (cached is not None or use_negative_cache):
+        return cached
+
+    persisted = await _persisted_loader.load((key, cep, number))
+    if persisted is not None and (persisted[1] is not None or use_negative_cache):
+        layer, coords, remaining = persisted
+        _geocode_stats[f"{layer}_hits"] += 1
+        _geocode_cache.set(key, coords, ttl_seconds=remaining)
+        return coords
+
+    _geocode_stats["api_calls"] += 1
+    try:
+        return await nominatim_scheduler.submit(key, lambda: _fetch(key, params), priority)
+    except Exception:
+        _geocode_stats["api_errors"] += 1
+        return None
+
+
+async def _fetch(key: str, params: dict) -> Coordinates | None:
+    """Chamada ao Nominatim feita pela fila: grava o resultado uma vez só, para todos os agrupados"""
+    # Só a chamada HTTP (sem a espera na fila), uma vez por chamada real
+    with measure_external("nominatim"):
+        coords = await _request(params)
+    _geocode_cache.set(key, coords, ttl_seconds=_ttl_for(coords is not None))
+    await _persist({key: coords})
+    return coords
+
+
 async def geocode_address(
     street: str,
     number: str,
     city: str,
     state: str,
     country: str = "Brazil",
+    priority: int = PRIORITY_INTERACTIVE,
+    cep: str | None = None,
+    use_negative_cache: bool = True,
 ) -> Coordinates | None:
     """
     Converte endereço em coordenadas usando Nominatim (OpenStreetMap).
-    
-    API gratuita com limite de 1 request/segundo.
+
+    API gratuita com limite de 1 request/segundo, respeitado pela
+    fila `nominatim_scheduler`. Se `cep` for informado, reaproveita as
+    coordenadas de um Address já salvo com o mesmo CEP e número.
+    `use_negative_cache=False` refaz a busca mesmo se ela já deu "não
+    encontrado" antes (ex: nova tentativa do worker).
     https://nominatim.org/release-docs/develop/api/Search/
-    
+
     Returns:
         Coordinates se encontrado, None se não encontrar
     """
     # Monta query de busca
     query = f"{street}, {number}, {city}, {state}, {country}"
-    
-    url = "https://nominatim.openstreetmap.org/search"
-    params = {
-        "q": query,
-        "format": "json",
-        "limit": 1,
-    }
-    headers = {
-        # Nominatim exige User-Agent identificando a aplicação
-        "User-Agent": "DeliveryTracker/1.0 (delivery-tracker-backend)"
-    }
-    
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(url, params=params, headers=headers)
-            response.raise_for_status()
-            data = response.json()
-            
-            if not data:
-                return None
-            
-            result = data[0]
-            return Coordinates(
-                latitude=float(result["lat"]),
-                longitude=float(result["lon"]),
-            )
-    except Exception:
-        return None
+    key = "q:" + normalize_address_key(street, number, city, state, country)
+    cep_clean = "".join(filter(str.isdigit, cep)) if cep else None
+    return await _search(
+        key,
+        {"q": query},
+        priority,
+        cep=cep_clean,
+        number=number.strip(),
+        use_negative_cache=use_negative_cache,
+    )
 
 
 async def geocode_by_cep(
     cep: str,
     country: str = "Brazil",
+    priority: int = PRIORITY_INTERACTIVE,
+    use_negative_cache: bool = True,
 ) -> Coordinates | None:
     """
     Busca coordenadas usando apenas o CEP (fallback simples).
     """
     cep_clean = "".join(filter(str.isdigit, cep))
-    
-    url = "https://nominatim.openstreetmap.org/search"
-    params = {
-        "postalcode": cep_clean,
-        "country": country,
-        "format": "json",
-        "limit": 1,
-    }
-    headers = {
-        "User-Agent": "DeliveryTracker/1.0 (delivery-tracker-backend)"
-    }
-    
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(url, params=params, headers=headers)
-            response.raise_for_status()
-            data = response.json()
-            
-            if not data:
-                return None
-            
-            result = data[0]
-            return Coordinates(
-                latitude=float(result["lat"]),
-                longitude=float(result["lon"]),
-            )
-    except Exception:
-        return None
+    key = "cep:" + normalize_address_key(cep_clean, country)
+    params = {"postalcode": cep_clean, "country": country}
+    return await _search(key, params, priority, use_negative_cache=use_negative_cache)
 
+
+def get_geocoding_stats() -> dict:
+    """Métricas da fila do Nominatim (tempo de espera, agrupamentos, 429s)"""
+    return nominatim_scheduler.stats()
+
+
+def get_geocode_cache_stats() -> dict:
+    """Métricas do cache de geocoding, com a taxa de acerto geral"""
+    memory = _geocode_cache.stats()
+    hits = memory["hits"] + _geocode_stats["db_hits"] + _geocode_stats["address_hits"]
+    lookups = hits + _geocode_stats["api_calls"]
+    return {
+        "memory": memory,
+        **_geocode_stats,
+        "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+    }
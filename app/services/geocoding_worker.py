@@ -0,0 +1,218 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update, delete
+
+from app.core.config import settings
+from app.database import AsyncSessionLocal
+from app.models.address import Address
+from app.models.geocoding_job import GeocodingJob
+from app.services.geocoding_service import geocode_address, geocode_by_cep, Coordinates
+from app.utils.rate_limiter import PRIORITY_BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+
+async def _load_pending_jobs() -> list[tuple[int, datetime]]:
+    """Jobs ainda com tentativas disponíveis: (id, próxima tentativa)"""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(GeocodingJob.id, GeocodingJob.next_attempt_at)
+            .where(GeocodingJob.attempts < settings.GEOCODING_JOB_MAX_ATTEMPTS)
+        )
+        return [(row.id, row.next_attempt_at) for row in result]
+
+
+async def _claim_job(job_id: int) -> tuple[Address, int] | datetime | None:
+    """
+    Reserva o job para este processo: empurra `next_attempt_at` para o fim
+    do lease num UPDATE ... RETURNING condicionado a ele já estar vencido.
+    Com vários workers da API só um UPDATE acerta a linha; se o processo
+    morrer no meio, o job volta a ficar disponível quando o lease expirar.
+
+    Returns:
+        (endereço, tentativas já feitas) se o job foi reservado; a data em
+        que ele vence se ainda não venceu (retry futuro ou lease de outro
+        processo); None se o job não existe mais ou esgotou as tentativas.
+    """
+    now = datetime.utcnow()
+    lease_until = now + timedelta(seconds=settings.GEOCODING_JOB_LEASE_SECONDS)
+    async with AsyncSessionLocal() as db:
+        claimed = (await db.execute(
+            update(GeocodingJob)
+            .where(
+                GeocodingJob.id == job_id,
+                GeocodingJob.next_attempt_at <= now,
+                GeocodingJob.attempts < settings.GEOCODING_JOB_MAX_ATTEMPTS,
+            )
+            .values(next_attempt_at=lease_until)
+            .returning(GeocodingJob.address_id, GeocodingJob.attempts)
+        )).first()
+        await db.commit()
+
+        if claimed is None:
+            return await db.scalar(
+                select(GeocodingJob.next_attempt_at)
+                .where(
+                    GeocodingJob.id == job_id,
+                    GeocodingJob.attempts < settings.GEOCODING_JOB_MAX_ATTEMPTS,
+                )
+            )
+
+        address = await db.get(Address, claimed.address_id)
+        return address, claimed.attempts
+
+
+async def _complete_job(job_id: int, address_id: int, coords: Coordinates) -> None:
+    """Preenche as coordenadas do endereço e remove o job (mesma transação)"""
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(Address)
+            .where(Address.id == address_id)
+            .values(latitude=coords.latitude, longitude=coords.longitude)
+        )
+        await db.execute(delete(GeocodingJob).where(GeocodingJob.id == job_id))
+        await db.commit()
+
+
+async def _fail_job(job_id: int, error: str) -> float | None:
+    """
+    Registra a falha e agenda nova tentativa com backoff exponencial.
+
+    Returns:
+        Segundos até a próxima tentativa, ou None se esgotou as tentativas.
+    """
+    async with AsyncSessionLocal() as db:
+        job = await db.get(GeocodingJob, job_id)
+        if job is None:
+            return None
+
+        job.attempts += 1
+        job.last_error = error
+        delay = settings.GEOCODING_JOB_RETRY_BASE_SECONDS * 2 ** (job.attempts - 1)
+        job.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+        await db.commit()
+
+        if job.attempts >= settings.GEOCODING_JOB_MAX_ATTEMPTS:
+            return None
+        return delay
+
+
+class GeocodingWorker:
+    """
+    Worker em processo que preenche latitude/longitude dos endereços.
+
+    A tabela geocoding_jobs é a fonte da verdade: o create_order grava o job
+    na mesma transação do pedido, e no startup o worker recarrega tudo que
+    ficou pendente. A fila asyncio só evita ficar consultando o banco.
+
+    Cada job é reservado no banco antes de rodar (`_claim_job`), então
+    vários processos podem ter o mesmo job na fila sem geocodificar duas vezes.
+    """
+
+    def __init__(self):
+        self._queue: asyncio.Queue[int] | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._timers: set[asyncio.TimerHandle] = set()
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._tasks = [
+            asyncio.create_task(self._run())
+            for _ in range(settings.GEOCODING_WORKER_CONCURRENCY)
+        ]
+
+        pending = await _load_pending_jobs()
+        now = datetime.utcnow()
+        for job_id, next_attempt_at in pending:
+            self._schedule(job_id, (next_attempt_at - now).total_seconds())
+        if pending:
+            logger.info("Retomando %d job(s) de geocoding pendentes", len(pending))
+
+    async def stop(self) -> None:
+        for timer in self._timers:
+            timer.cancel()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._timers.clear()
+        self._tasks.clear()
+        self._queue = None
+
+    def enqueue(self, job_ids: list[int]) -> None:
+        """Coloca jobs recém-commitados na fila (sem worker, ficam para o startup)"""
+        if self._queue is None:
+            return
+        for job_id in job_ids:
+            self._queue.put_nowait(job_id)
+
+    def _schedule(self, job_id: int, delay: float) -> None:
+        if self._queue is None:
+            return
+        if delay <= 0:
+            self._queue.put_nowait(job_id)
+            return
+
+        def fire() -> None:
+            self._timers.discard(handle)
+            if self._queue is not None:
+                self._queue.put_nowait(job_id)
+
+        handle = asyncio.get_running_loop().call_later(delay, fire)
+        self._timers.add(handle)
+
+    async def _run(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._process(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Erro inesperado no job de geocoding %s", job_id)
+
+    async def _process(self, job_id: int) -> None:
+        claimed = await _claim_job(job_id)
+        if claimed is None:
+            return
+        if isinstance(claimed, datetime):
+            # Ainda não venceu (ou outro processo está com ele): volta na hora certa
+            self._schedule(job_id, (claimed - datetime.utcnow()).total_seconds())
+            return
+
+        address, attempts = claimed
+        if address is None:
+            return
+
+        # Numa nova tentativa o "não encontrado" cacheado é justamente o
+        # resultado que queremos conferir de novo
+        use_negative_cache = attempts == 0
+        coords = await geocode_address(
+            street=address.street,
+            number=address.number,
+            city=address.city,
+            state=address.state,
+            priority=PRIORITY_BACKGROUND,
+            cep=address.cep,
+            use_negative_cache=use_negative_cache,
+        )
+        if not coords:
+            coords = await geocode_by_cep(
+                address.cep,
+                priority=PRIORITY_BACKGROUND,
+                use_negative_cache=use_negative_cache,
+            )
+
+        if coords:
+            await _complete_job(job_id, address.id, coords)
+            return
+
+        delay = await _fail_job(job_id, "Endereço não encontrado no Nominatim")
+        if delay is None:
+            logger.warning("Geocoding do endereço %s desistiu após várias tentativas", address.id)
+        else:
+            self._schedule(job_id, delay)
+
+
+geocoding_worker = GeocodingWorker()
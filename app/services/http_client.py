@@ -0,0 +1,80 @@
+import httpx
+
+from app.core.config import settings
+from app.core.instrumentation import httpx_event_hooks
+
+# HTTP/2 depende do pacote opcional `h2` (httpx[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+# Configuração específica de cada integração externa
+_CLIENT_OPTIONS: dict[str, dict] = {
+    "viacep": {
+        "base_url": "https://viacep.com.br",
+    },
+    "nominatim": {
+        "base_url": "https://nominatim.openstreetmap.org",
+        # Nominatim exige User-Agent identificando a aplicação
+        "headers": {"User-Agent": "DeliveryTracker/1.0 (delivery-tracker-backend)"},
+    },
+    # Webhooks do outbox (URLs absolutas, configuradas em OUTBOX_WEBHOOK_URLS)
+    "webhooks": {
+        "headers": {"User-Agent": "DeliveryTracker/1.0 (delivery-tracker-backend)"},
+    },
+}
+
+# Registro de clientes abertos (um por integração, vida útil da aplicação)
+_clients: dict[str, httpx.AsyncClient] = {}
+
+
+def _build_client(name: str) -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    )
+    timeout = httpx.Timeout(
+        settings.HTTP_TIMEOUT_SECONDS,
+        connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS,
+        pool=settings.HTTP_POOL_TIMEOUT_SECONDS,
+    )
+    return httpx.AsyncClient(
+        limits=limits,
+        timeout=timeout,
+        http2=settings.HTTP2_ENABLED and HTTP2_AVAILABLE,
+        event_hooks=httpx_event_hooks(name),
+        **_CLIENT_OPTIONS.get(name, {}),
+    )
+
+
+def get_http_client(name: str) -> httpx.AsyncClient:
+    """
+    Retorna o cliente HTTP compartilhado da integração `name`.
+
+    O cliente mantém conexões keep-alive no pool, então chamadas seguintes
+    reaproveitam a conexão TCP/TLS já aberta. Se a aplicação ainda não
+    abriu os clientes (ex: scripts fora do FastAPI), cria sob demanda.
+    """
+    client = _clients.get(name)
+    if client is None or client.is_closed:
+        client = _build_client(name)
+        _clients[name] = client
+    return client
+
+
+async def open_http_clients() -> None:
+    """Abre os clientes de todas as integrações (startup da aplicação)"""
+    for name in _CLIENT_OPTIONS:
+        get_http_client(name)
+
+
+async def close_http_clients() -> None:
+    """Fecha todos os clientes e suas conexões (shutdown da aplicação)"""
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
@@ -0,0 +1,349 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import re
+import time
+from datetime import datetime
+from typing import Awaitable, Callable
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.database import AsyncSessionLocal, dialect_insert, run_after_commit
+from app.models.outbox_event import OutboxEvent, OutboxCursor, OutboxSequence
+from app.services.http_client import get_http_client
+
+logger = logging.getLogger(__name__)
+
+ORDER_CREATED = "order.created"
+ORDER_STATUS_CHANGED = "order.status_changed"
+
+# URLs de webhook podem carregar tokens (query string, user:senha)
+_URL_PATTERN = re.compile(r"\w+://[^\s'\"<>]+")
+
+# Recebe um lote de mudanças (em ordem de position); exceção = lote não entregue
+OutboxHandler = Callable[[list[dict]], Awaitable[None]]
+
+
+def outbox_row(
+    order_id: int,
+    tracking_code: str,
+    owner_id: int,
+    status: str,
+    status_label: str,
+    description: str | None,
+    occurred_at: datetime,
+) -> dict:
+    """Linha de outbox_events para um OrderEvent (INSERT em lote ou ORM)"""
+    payload = {
+        "order_id": order_id,
+        "tracking_code": tracking_code,
+        "owner_id": owner_id,
+        "status": status,
+        "status_label": status_label,
+        "description": description,
+        "occurred_at": occurred_at.isoformat(),
+    }
+    return {
+        "event_type": ORDER_CREATED if status == "created" else ORDER_STATUS_CHANGED,
+        "order_id": order_id,
+        "tracking_code": tracking_code,
+        "payload": json.dumps(payload, ensure_ascii=False),
+    }
+
+
+def add_outbox_event(db, order, event) -> None:
+    """Registra o OrderEvent no outbox, na mesma transação (chamar com order.id já gerado)"""
+    db.add(OutboxEvent(**outbox_row(
+        order.id,
+        order.tracking_code,
+        order.owner_id,
+        event.status,
+        event.status_label,
+        event.description,
+        event.created_at,
+    )))
+    notify_outbox_on_commit(db)
+
+
+def notify_outbox_on_commit(db) -> None:
+    """
+    Acorda o dispatcher depois do commit (ele numera e entrega os eventos,
+    ver assign_positions). Chamar após qualquer INSERT em outbox_events.
+    """
+    run_after_commit(db, outbox_dispatcher.wake)
+
+
+async def assign_positions(db: AsyncSession) -> int:
+    """
+    Numera os eventos já commitados que ainda estão sem `position` e
+    commita `db`. Retorna quantos foram numerados.
+
+    O `id` sai na ordem dos INSERTs, mas transações concorrentes commitam
+    em qualquer ordem: um id menor pode ficar visível depois que o cursor
+    já passou dele. Por isso a posição só é dada depois do commit, aqui:
+    eventos de transações em andamento não são visíveis e ficam para a
+    próxima rodada. As rodadas são serializadas pela linha única de
+    outbox_sequence, travada só durante esta transação curta (as escritas
+    de pedidos não passam por ela). Assim, quando uma posição está
+    visível, todas as anteriores também estão, e o cursor nunca pula
+    eventos.
+    """
+    events = OutboxEvent.__table__
+    # Checagem sem trava: o caso comum (nada novo) não disputa a sequência
+    unnumbered = select(events.c.id).where(events.c.position.is_(None)).limit(1)
+    if (await db.execute(unnumbered)).first() is None:
+        return 0
+
+    sequence = OutboxSequence.__table__
+    conn = await db.connection()
+    stmt = dialect_insert(conn.dialect.name, sequence).values(id=1, last_position=0)
+    last = await db.scalar(
+        stmt.on_conflict_do_update(
+            index_elements=["id"],
+            set_={"last_position": sequence.c.last_position},
+        ).returning(sequence.c.last_position)
+    )
+
+    # Lido depois de obter a trava: vê tudo que foi commitado até aqui
+    ranked = (
+        select(events.c.id, func.row_number().over(order_by=events.c.id).label("rank"))
+        .where(events.c.position.is_(None))
+        .subquery()
+    )
+    numbered = (await db.execute(
+        update(events)
+        .where(events.c.id == ranked.c.id)
+        .values(position=ranked.c.rank + last)
+    )).rowcount
+    await db.execute(
+        update(sequence).where(sequence.c.id == 1).values(last_position=last + numbered)
+    )
+    await db.commit()
+    return numbered
+
+
+def change_to_dict(row: OutboxEvent) -> dict:
+    """Formato público de uma mudança (feed e webhooks)"""
+    return {
+        "id": row.id,
+        "position": row.position,
+        "event_type": row.event_type,
+        "order_id": row.order_id,
+        "tracking_code": row.tracking_code,
+        "payload": json.loads(row.payload),
+        "created_at": row.created_at.isoformat(),
+    }
+
+
+async def fetch_changes(db, since: int, limit: int) -> list[OutboxEvent]:
+    """
+    Mudanças com position > `since`, em ordem de commit.
+
+    As posições ficam visíveis em ordem (ver assign_positions), então o
+    lote pode ir até o evento mais recente sem risco de um evento ainda não
+    commitado aparecer depois atrás do cursor.
+    """
+    return (
+        await db.scalars(
+            select(OutboxEvent)
+            .where(OutboxEvent.position > since)
+            .order_by(OutboxEvent.position)
+            .limit(limit)
+        )
+    ).all()
+
+
+def webhook_handler(url: str, secret: str | None = None) -> OutboxHandler:
+    """
+    Entrega os lotes via POST JSON `{"events": [...]}` em `url`. Com
+    `secret`, o corpo é assinado no header X-Outbox-Signature (HMAC-SHA256).
+    Qualquer resposta fora de 2xx conta como falha (o lote é reenviado).
+    """
+
+    async def deliver(changes: list[dict]) -> None:
+        body = json.dumps({"events": changes}, ensure_ascii=False).encode()
+        headers = {"Content-Type": "application/json"}
+        if secret:
+            signature = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+            headers["X-Outbox-Signature"] = f"sha256={signature}"
+
+        response = await get_http_client("webhooks").post(url, content=body, headers=headers)
+        response.raise_for_status()
+
+    return deliver
+
+
+async def _load_cursor(consumer: str) -> int:
+    async with AsyncSessionLocal() as db:
+        cursor = await db.get(OutboxCursor, consumer)
+        return cursor.last_id if cursor else 0
+
+
+async def _save_cursor(consumer: str, position: int) -> None:
+    async with AsyncSessionLocal() as db:
+        await db.merge(OutboxCursor(consumer=consumer, last_id=position))
+        await db.commit()
+
+
+class _Consumer:
+    __slots__ = ("handler", "label", "failures", "retry_at", "delivered", "last_error")
+
+    def __init__(self, handler: OutboxHandler, label: str):
+        self.handler = handler
+        self.label = label  # nome exibido em logs e no /health (sem URL)
+        self.failures = 0
+        self.retry_at = 0.0  # time.monotonic()
+        self.delivered = 0
+        self.last_error: str | None = None
+
+
+class OutboxDispatcher:
+    """
+    Worker em processo que entrega o outbox aos handlers registrados.
+
+    Cada handler tem seu cursor persistido (outbox_cursors) e recebe os
+    eventos em lotes de até OUTBOX_BATCH_SIZE, em ordem. Entrega é
+    at-least-once: o cursor só avança depois que o handler aceita o lote,
+    e um lote com falha é reenviado com backoff exponencial (os demais
+    handlers seguem normalmente). O commit de um evento acorda o worker;
+    o polling periódico cobre eventos de outros processos.
+
+    Com vários workers da API, rode o dispatcher em um só
+    (OUTBOX_DISPATCHER_ENABLED=false nos demais).
+    """
+
+    def __init__(self):
+        self._consumers: dict[str, _Consumer] = {}
+        self._wake: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    def register(self, name: str, handler: OutboxHandler, label: str | None = None) -> None:
+        """
+        Registra um handler; `name` identifica o cursor no banco (não mude).
+        `label` substitui o nome em logs e métricas (ex: quando contém URL).
+        """
+        self._consumers[name] = _Consumer(handler, label or name)
+
+    async def start(self) -> None:
+        if not settings.OUTBOX_DISPATCHER_ENABLED:
+            return
+        for index, url in enumerate(settings.OUTBOX_WEBHOOK_URLS):
+            name = f"webhook:{url}"
+            if name not in self._consumers:
+                self.register(
+                    name, webhook_handler(url, settings.OUTBOX_WEBHOOK_SECRET), label=f"webhook#{index}"
+                )
+        if not self._consumers:
+            return
+
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self._wake = None
+
+    def wake(self) -> None:
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _run(self) -> None:
+        while True:
+            self._wake.clear()
+            try:
+                async with AsyncSessionLocal() as db:
+                    await assign_positions(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Falha ao numerar eventos do outbox")
+            backlog = False
+            for name, consumer in self._consumers.items():
+                if time.monotonic() < consumer.retry_at:
+                    continue
+                try:
+                    delivered = await self._dispatch(name, consumer)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as exc:
+                    self._fail(consumer, exc)
+                    continue
+                consumer.failures = 0
+                consumer.last_error = None
+                backlog = backlog or delivered == settings.OUTBOX_BATCH_SIZE
+
+            if backlog:
+                continue
+            await self._sleep()
+
+    async def _sleep(self) -> None:
+        """Até o próximo commit, retry agendado ou polling (o que vier antes)"""
+        timeout = settings.OUTBOX_POLL_SECONDS
+        now = time.monotonic()
+        for consumer in self._consumers.values():
+            if consumer.retry_at > now:
+                timeout = min(timeout, consumer.retry_at - now)
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _dispatch(self, name: str, consumer: _Consumer) -> int:
+        since = await _load_cursor(name)
+        async with AsyncSessionLocal() as db:
+            rows = await fetch_changes(db, since, settings.OUTBOX_BATCH_SIZE)
+            changes = [change_to_dict(row) for row in rows]
+        if not changes:
+            return 0
+
+        await consumer.handler(changes)
+        await _save_cursor(name, changes[-1]["position"])
+        consumer.delivered += len(changes)
+        return len(changes)
+
+    def _fail(self, consumer: _Consumer, exc: Exception) -> None:
+        consumer.failures += 1
+        consumer.last_error = _URL_PATTERN.sub("<url>", str(exc)) or exc.__class__.__name__
+        delay = min(
+            settings.OUTBOX_RETRY_BASE_SECONDS * 2 ** (consumer.failures - 1),
+            settings.OUTBOX_RETRY_MAX_SECONDS,
+        )
+        consumer.retry_at = time.monotonic() + delay
+        logger.warning(
+            "Falha ao entregar outbox para %s (tentativa %d, nova em %.1fs): %s",
+            consumer.label, consumer.failures, delay, consumer.last_error,
+        )
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "running": self._task is not None,
+            "consumers": {
+                consumer.label: {
+                    "delivered": consumer.delivered,
+                    "failures": consumer.failures,
+                    "retry_in_seconds": round(max(consumer.retry_at - now, 0), 1),
+                    "last_error": consumer.last_error,
+                }
+                for consumer in self._consumers.values()
+            },
+        }
+
+
+outbox_dispatcher = OutboxDispatcher()
+
+
+def register_outbox_handler(name: str, handler: OutboxHandler) -> None:
+    """Registra um handler de entrega (chamar antes do startup)"""
+    outbox_dispatcher.register(name, handler)
+
+
+def get_outbox_stats() -> dict:
+    return outbox_dispatcher.stats()
@@ -0,0 +1,204 @@
+import asyncio
+import hashlib
+import logging
+import secrets
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.database import AsyncSessionLocal, run_after_commit
+from app.models.refresh_token import RefreshToken
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidRefreshToken(Exception):
+    """Refresh token inexistente, expirado, revogado ou reutilizado"""
+
+
+# Sessões revogadas cujos access tokens ainda podem estar válidos:
+# sid -> momento (UTC) em que o último access token da sessão expira.
+# Consulta O(1) a cada request autenticada, sem ir ao banco. É um dict
+# em memória POR PROCESSO: cada worker tem o seu, alimentado pelos
+# próprios logouts e pela sincronização periódica com o banco.
+_revoked_sessions: dict[str, datetime] = {}
+
+# Primeira espera antes de tentar de novo quando a sincronização inicial
+# falha (dobra a cada falha, até SESSION_REVOCATION_SYNC_SECONDS)
+_STARTUP_RETRY_SECONDS = 1.0
+
+
+def hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def is_session_revoked(session_id: str) -> bool:
+    return session_id in _revoked_sessions
+
+
+def _access_token_lifetime() -> timedelta:
+    return timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+
+
+def _mark_revoked(session_id: str, revoked_at: datetime) -> None:
+    _revoked_sessions[session_id] = revoked_at + _access_token_lifetime()
+
+
+def _issue(db: AsyncSession, user_id: int, session_id: str) -> str:
+    token = secrets.token_urlsafe(32)
+    db.add(
+        RefreshToken(
+            token_hash=hash_refresh_token(token),
+            session_id=session_id,
+            user_id=user_id,
+            expires_at=datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+        )
+    )
+    return token
+
+
+def create_session(db: AsyncSession, user_id: int) -> tuple[str, str]:
+    """
+    Abre uma sessão para o usuário (gravada no próximo commit).
+
+    Returns:
+        (refresh token, id da sessão para a claim `sid`)
+    """
+    session_id = uuid.uuid4().hex
+    return _issue(db, user_id, session_id), session_id
+
+
+async def revoke_session(db: AsyncSession, session_id: str) -> None:
+    """Revoga todos os refresh tokens da sessão e bloqueia seus access tokens"""
+    now = datetime.utcnow()
+    await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.session_id == session_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=now)
+    )
+    run_after_commit(db, lambda: _mark_revoked(session_id, now))
+
+
+async def rotate_refresh_token(db: AsyncSession, token: str) -> tuple[int, str, str]:
+    """
+    Troca um refresh token válido por um novo da mesma sessão.
+
+    Apresentar um token que já foi trocado indica vazamento: a sessão
+    inteira é revogada.
+
+    Returns:
+        (id do usuário, novo refresh token, id da sessão)
+
+    Raises:
+        InvalidRefreshToken
+    """
+    token_hash = hash_refresh_token(token)
+    entry = await db.get(RefreshToken, token_hash)
+    now = datetime.utcnow()
+
+    if entry is None or entry.revoked_at is not None or entry.expires_at <= now:
+        raise InvalidRefreshToken()
+
+    # Troca condicional: entre renovações simultâneas só uma vence
+    result = await db.execute(
+        update(RefreshToken)
+        .where(
+            RefreshToken.token_hash == token_hash,
+            RefreshToken.replaced_at.is_(None),
+            RefreshToken.revoked_at.is_(None),
+        )
+        .values(replaced_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        await revoke_session(db, entry.session_id)
+        await db.commit()
+        logger.warning("Reuso de refresh token na sessão %s; sessão revogada", entry.session_id)
+        raise InvalidRefreshToken()
+
+    return entry.user_id, _issue(db, entry.user_id, entry.session_id), entry.session_id
+
+
+async def find_session_id(db: AsyncSession, token: str) -> str | None:
+    return await db.scalar(
+        select(RefreshToken.session_id)
+        .where(RefreshToken.token_hash == hash_refresh_token(token))
+    )
+
+
+async def _load_revoked_sessions() -> dict[str, datetime]:
+    """Sessões revogadas há menos que a vida de um access token"""
+    lifetime = _access_token_lifetime()
+    async with AsyncSessionLocal() as db:
+        rows = await db.execute(
+            select(RefreshToken.session_id, func.max(RefreshToken.revoked_at))
+            .where(RefreshToken.revoked_at >= datetime.utcnow() - lifetime)
+            .group_by(RefreshToken.session_id)
+        )
+        return {session_id: revoked_at + lifetime for session_id, revoked_at in rows}
+
+
+class SessionRevocationSync:
+    """
+    Mantém o conjunto de sessões revogadas em memória.
+
+    O logout atualiza o conjunto do próprio worker na hora; os demais
+    workers recarregam do banco a cada SESSION_REVOCATION_SYNC_SECONDS.
+    Sessões cujos access tokens já expiraram saem do conjunto.
+
+    Se o banco estiver fora do ar no startup, a API sobe mesmo assim e a
+    carga inicial é refeita em segundo plano; até lá, só os logouts feitos
+    neste worker são conhecidos.
+    """
+
+    def __init__(self):
+        self._task: asyncio.Task | None = None
+        self.last_synced_at: datetime | None = None
+
+    async def start(self) -> None:
+        try:
+            await self.sync()
+        except Exception:
+            logger.warning(
+                "Sessões revogadas não carregadas no startup; tentando em segundo plano",
+                exc_info=True,
+            )
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def sync(self) -> None:
+        loaded = await _load_revoked_sessions()
+        now = datetime.utcnow()
+        # Mantém revogações locais ainda não visíveis na consulta
+        for session_id, forget_at in list(_revoked_sessions.items()):
+            if forget_at > now:
+                loaded.setdefault(session_id, forget_at)
+        _revoked_sessions.clear()
+        _revoked_sessions.update(loaded)
+        self.last_synced_at = now
+
+    async def _run(self) -> None:
+        retry = _STARTUP_RETRY_SECONDS
+        while True:
+            if self.last_synced_at is None:
+                # Carga inicial ainda pendente: tenta de novo logo
+                delay = min(retry, settings.SESSION_REVOCATION_SYNC_SECONDS)
+                retry *= 2
+            else:
+                delay = settings.SESSION_REVOCATION_SYNC_SECONDS
+            await asyncio.sleep(delay)
+            try:
+                await self.sync()
+            except Exception:
+                logger.exception("Falha ao sincronizar sessões revogadas")
+
+
+session_revocation_sync = SessionRevocationSync()
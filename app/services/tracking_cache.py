@@ -0,0 +1,169 @@
+import asyncio
+import hashlib
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Protocol
+
+from app.core.config import settings
+from app.database import run_after_commit
+from app.utils.cache import TTLCache
+
+
+class TrackingCacheBackend(Protocol):
+    """
+    Armazenamento das respostas de rastreio já serializadas.
+
+    O padrão é um LRU local por processo; com vários workers, um backend
+    compartilhado (ex: Redis) pode ser plugado via set_tracking_cache_backend.
+    """
+
+    async def get(self, key: str) -> bytes | None: ...
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float) -> None: ...
+
+    async def delete(self, key: str) -> None: ...
+
+
+class LocalTrackingCacheBackend:
+    """Backend em memória (LRU com TTL), também usado em testes"""
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.cache = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+
+    async def get(self, key: str) -> bytes | None:
+        return self.cache.get(key, None)
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        self.cache.set(key, value, ttl_seconds=ttl_seconds)
+
+    async def delete(self, key: str) -> None:
+        self.cache.delete(key)
+
+
+_backend: TrackingCacheBackend = LocalTrackingCacheBackend(
+    max_size=settings.TRACKING_CACHE_MAX_SIZE,
+    ttl_seconds=settings.TRACKING_CACHE_TTL_SECONDS,
+)
+
+class _GenerationMap:
+    """
+    Geração de cada código invalidado recentemente.
+
+    Diferente do LRU das respostas, nunca descarta por tamanho: uma entrada
+    só sai depois de `ttl_seconds`, que precisa ser maior que a leitura mais
+    longa do banco e que o TTL das respostas que ela protege. Como todas têm
+    o mesmo TTL, as mais antigas ficam sempre no início.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._data: OrderedDict[str, tuple[float, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> int:
+        with self._lock:
+            item = self._data.get(key)
+            return item[1] if item is not None and item[0] > time.monotonic() else 0
+
+    def set(self, key: str, generation: int) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._data[key] = (now + self.ttl_seconds, generation)
+            self._data.move_to_end(key)
+            while self._data:
+                expires_at, _ = next(iter(self._data.values()))
+                if expires_at > now:
+                    break
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# Geração de cada código: muda a cada invalidação, para que um request que
+# leu o banco antes do commit não grave no cache a resposta já desatualizada.
+# Vale por processo (entre workers, o limite continua sendo o TTL).
+_generation_counter = itertools.count(1)
+_generations = _GenerationMap(
+    ttl_seconds=max(settings.TRACKING_GENERATION_TTL_SECONDS, settings.TRACKING_CACHE_TTL_SECONDS),
+)
+
+# Referências às invalidações em andamento (evita que o GC cancele as tasks)
+_pending_invalidations: set[asyncio.Future] = set()
+_loop: asyncio.AbstractEventLoop | None = None
+
+
+def set_tracking_cache_backend(backend: TrackingCacheBackend) -> None:
+    """Troca o backend do cache (ex: compartilhado entre workers)"""
+    global _backend
+    _backend = backend
+
+
+def get_tracking_cache_backend() -> TrackingCacheBackend:
+    return _backend
+
+
+def compute_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+async def get_cached_tracking(tracking_code: str) -> tuple[str, bytes] | None:
+    """Retorna (etag, corpo JSON) do rastreio cacheado, se houver"""
+    global _loop
+    _loop = asyncio.get_running_loop()
+
+    value = await _backend.get(tracking_code)
+    if value is None:
+        return None
+    etag, _, body = value.partition(b"\n")
+    return etag.decode(), body
+
+
+def tracking_generation(tracking_code: str) -> int:
+    """Geração atual do código: leia ANTES de montar a resposta a partir do banco"""
+    return _generations.get(tracking_code)
+
+
+async def store_tracking(tracking_code: str, body: bytes, generation: int) -> str:
+    """
+    Guarda o corpo JSON do rastreio e retorna o ETag correspondente.
+
+    Se o código foi invalidado depois de `generation` ser lido, o corpo
+    pode ser anterior ao commit: devolve o ETag mas não grava no cache.
+    """
+    etag = compute_etag(body)
+    if tracking_generation(tracking_code) != generation:
+        return etag
+    await _backend.set(
+        tracking_code,
+        etag.encode() + b"\n" + body,
+        ttl_seconds=settings.TRACKING_CACHE_TTL_SECONDS,
+    )
+    return etag
+
+
+def invalidate_tracking(tracking_code: str) -> None:
+    """Remove o rastreio do cache (pode ser chamado de contexto sync)"""
+    _generations.set(tracking_code, next(_generation_counter))
+    coro = _backend.delete(tracking_code)
+    try:
+        task = asyncio.get_running_loop().create_task(coro)
+    except RuntimeError:
+        # Fora do event loop (ex: rota sync no threadpool)
+        if _loop is None or _loop.is_closed():
+            coro.close()
+            return
+        task = asyncio.run_coroutine_threadsafe(coro, _loop)
+    _pending_invalidations.add(task)
+    task.add_done_callback(_pending_invalidations.discard)
+
+
+def invalidate_tracking_on_commit(db, tracking_code: str) -> None:
+    """Invalida o rastreio só quando a transação atual for commitada"""
+    run_after_commit(db, lambda: invalidate_tracking(tracking_code))
@@ -0,0 +1,230 @@
+import asyncio
+import json
+from datetime import datetime
+from typing import Awaitable, Callable, Protocol
+
+from app.core.config import settings
+from app.database import run_after_commit
+
+MessageHandler = Callable[[str, bytes], None]
+
+
+class TrackingBroker(Protocol):
+    """
+    Transporte das atualizações de rastreio entre workers.
+
+    O padrão entrega só no próprio processo; com vários workers, um broker
+    compartilhado (ex: Redis pub/sub) pode ser plugado via set_tracking_broker.
+    Todo worker assina o broker e repassa as mensagens ao seu TrackingHub.
+    """
+
+    async def start(self, on_message: MessageHandler) -> None: ...
+
+    async def publish(self, tracking_code: str, message: bytes) -> None: ...
+
+    async def stop(self) -> None: ...
+
+
+class LocalTrackingBroker:
+    """Broker em processo (um worker só), também usado em testes"""
+
+    def __init__(self):
+        self._on_message: MessageHandler | None = None
+
+    async def start(self, on_message: MessageHandler) -> None:
+        self._on_message = on_message
+
+    async def publish(self, tracking_code: str, message: bytes) -> None:
+        if self._on_message is not None:
+            self._on_message(tracking_code, message)
+
+    async def stop(self) -> None:
+        self._on_message = None
+
+
+class HubFull(Exception):
+    """Limite de assinantes simultâneos atingido"""
+
+
+class Subscription:
+    """Um cliente acompanhando um código (SSE ou WebSocket)"""
+
+    __slots__ = ("tracking_code", "queue", "overflowed")
+
+    def __init__(self, tracking_code: str, queue_size: int):
+        self.tracking_code = tracking_code
+        # bytes = mensagem JSON; None = fim do stream
+        self.queue: asyncio.Queue[bytes | None] = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    async def next(self, timeout: float) -> bytes | None:
+        """
+        Próxima mensagem. Levanta TimeoutError se nada chegar em `timeout`
+        (hora de mandar heartbeat).
+        """
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class TrackingHub:
+    """
+    Pub/sub em processo: código de rastreio -> assinantes.
+
+    Um assinante ocioso custa só uma fila vazia. Cada fila é limitada:
+    um cliente lento que deixa a fila encher é desconectado com um aviso
+    de `resync` (ele refaz o GET /track), em vez de acumular memória.
+    """
+
+    def __init__(self, queue_size: int, max_subscribers: int):
+        self.queue_size = max(queue_size, 1)
+        self.max_subscribers = max_subscribers
+        self._subscribers: dict[str, set[Subscription]] = {}
+        self._count = 0
+
+        # Métricas
+        self.published = 0
+        self.delivered = 0
+        self.overflowed = 0
+
+    def subscribe(self, tracking_code: str) -> Subscription:
+        if self._count >= self.max_subscribers:
+            raise HubFull()
+        subscription = Subscription(tracking_code, self.queue_size)
+        self._subscribers.setdefault(tracking_code, set()).add(subscription)
+        self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._subscribers.get(subscription.tracking_code)
+        if subscribers is None or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        self._count -= 1
+        if not subscribers:
+            del self._subscribers[subscription.tracking_code]
+
+    def deliver(self, tracking_code: str, message: bytes) -> None:
+        """Repassa a mensagem (já serializada) a todos os assinantes do código"""
+        self.published += 1
+        for subscription in list(self._subscribers.get(tracking_code, ())):
+            try:
+                subscription.queue.put_nowait(message)
+                self.delivered += 1
+            except asyncio.QueueFull:
+                self._drop(subscription)
+
+    def close(self) -> None:
+        """Encerra todos os streams (shutdown)"""
+        for subscribers in list(self._subscribers.values()):
+            for subscription in list(subscribers):
+                self._end(subscription)
+
+    def _drop(self, subscription: Subscription) -> None:
+        self.overflowed += 1
+        subscription.overflowed = True
+        self._end(subscription)
+
+    def _end(self, subscription: Subscription) -> None:
+        self.unsubscribe(subscription)
+        # Descarta o que ficou pendente para caber o marcador de fim
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(None)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": self._count,
+            "max_subscribers": self.max_subscribers,
+            "tracking_codes": len(self._subscribers),
+            "published": self.published,
+            "delivered": self.delivered,
+            "overflowed": self.overflowed,
+        }
+
+
+tracking_hub = TrackingHub(
+    queue_size=settings.TRACKING_STREAM_QUEUE_SIZE,
+    max_subscribers=settings.TRACKING_STREAM_MAX_SUBSCRIBERS,
+)
+
+_broker: TrackingBroker = LocalTrackingBroker()
+
+# Referências às publicações em andamento (evita que o GC cancele as tasks)
+_pending_publications: set[asyncio.Task] = set()
+
+
+def set_tracking_broker(broker: TrackingBroker) -> None:
+    """Troca o broker (ex: compartilhado entre workers); chamar antes do startup"""
+    global _broker
+    _broker = broker
+
+
+def get_tracking_broker() -> TrackingBroker:
+    return _broker
+
+
+async def start_tracking_hub() -> None:
+    await _broker.start(tracking_hub.deliver)
+
+
+async def stop_tracking_hub() -> None:
+    tracking_hub.close()
+    await _broker.stop()
+
+
+def _spawn(publication: Awaitable[None]) -> None:
+    try:
+        task = asyncio.get_running_loop().create_task(publication)
+    except RuntimeError:
+        # Fora do event loop (ex: script sync): não há assinantes neste processo
+        publication.close()
+        return
+    _pending_publications.add(task)
+    task.add_done_callback(_pending_publications.discard)
+
+
+def publish_tracking_update(tracking_code: str, payload: dict) -> None:
+    """Publica uma atualização para os assinantes do código (todos os workers)"""
+    message = json.dumps(payload, ensure_ascii=False, default=str).encode()
+    _spawn(_broker.publish(tracking_code, message))
+
+
+def tracking_event_payload(
+    tracking_code: str,
+    status: str,
+    status_label: str,
+    description: str | None,
+    created_at: datetime,
+) -> dict:
+    """Mensagem de novo evento (mesmos campos do TrackingEvent do /track)"""
+    return {
+        "type": "event",
+        "tracking_code": tracking_code,
+        "status": status,
+        "event": {
+            "status": status,
+            "status_label": status_label,
+            "description": description,
+            "created_at": created_at.isoformat(),
+        },
+    }
+
+
+def publish_tracking_event_on_commit(db, tracking_code: str, event) -> None:
+    """
+    Publica o OrderEvent quando a transação for commitada (rollback = nada
+    é enviado). Os campos são lidos no commit, já com created_at preenchido.
+    """
+    run_after_commit(db, lambda: publish_tracking_update(
+        tracking_code,
+        tracking_event_payload(
+            tracking_code,
+            event.status,
+            event.status_label,
+            event.description,
+            event.created_at,
+        ),
+    ))
+
+
+def get_tracking_hub_stats() -> dict:
+    return tracking_hub.stats()
@@ -1,5 +1,20 @@
-import httpx
+import asyncio
+import logging
+from datetime import datetime
+
 from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core.config import settings
+from app.core.instrumentation import measure_external
+from app.database import AsyncSessionLocal, dialect_insert
+from app.models.cep_cache import CepCacheEntry
+from app.services.http_client import get_http_client
+from app.utils.batching import BatchLoader
+from app.utils.cache import TTLCache, MISSING
+
+logger = logging.getLogger(__name__)
 
 
 class ViaCEPResponse(BaseModel):
@@ -21,41 +36,197 @@ class AddressFromCEP(BaseModel):
     state: str
 
 
+# Camada 1: LRU em memória (por processo). Guarda também resultados
+# negativos (None) para CEPs que o ViaCEP informou como inexistentes.
+_cep_cache = TTLCache(
+    max_size=settings.CEP_CACHE_MAX_SIZE,
+    ttl_seconds=settings.CEP_CACHE_TTL_SECONDS,
+)
+
+# Contadores por camada (o LRU tem os próprios hits/misses)
+_cep_stats = {"db_hits": 0, "db_misses": 0, "api_calls": 0, "api_errors": 0}
+
+def _ttl_for(found: bool) -> int:
+    if found:
+        return settings.CEP_CACHE_TTL_SECONDS
+    return settings.CEP_CACHE_NEGATIVE_TTL_SECONDS
+
+
+def _entry_to_address(entry: CepCacheEntry) -> AddressFromCEP | None:
+    if not entry.found:
+        return None
+    return AddressFromCEP(
+        cep=entry.cep,
+        street=entry.street or "",
+        neighborhood=entry.neighborhood or "",
+        city=entry.city or "",
+        state=entry.state or "",
+    )
+
+
+async def _load_persisted(ceps: list[str]) -> dict[str, tuple[AddressFromCEP | None, float]]:
+    """
+    Camada 2: busca os CEPs na tabela cep_cache (uma query para o lote).
+
+    Returns:
+        {cep: (endereço ou None, segundos de validade restantes)} só para as
+        entradas válidas; CEPs sem entrada ou expirados ficam de fora.
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(CepCacheEntry).where(CepCacheEntry.cep.in_(ceps)))
+        entries = result.scalars().all()
+
+    now = datetime.utcnow()
+    found = {}
+    for entry in entries:
+        remaining = _ttl_for(entry.found) - (now - entry.fetched_at).total_seconds()
+        if remaining > 0:
+            found[entry.cep] = (_entry_to_address(entry), remaining)
+    return found
+
+
+async def _persist(results: dict[str, AddressFromCEP | None]) -> None:
+    """Grava (ou atualiza) os resultados das consultas na tabela cep_cache (um upsert para o lote)"""
+    fetched_at = datetime.utcnow()
+    rows = [
+        {
+            "cep": cep_clean,
+            "found": address is not None,
+            "street": address.street if address else None,
+            "neighborhood": address.neighborhood if address else None,
+            "city": address.city if address else None,
+            "state": address.state if address else None,
+            "fetched_at": fetched_at,
+        }
+        for cep_clean, address in results.items()
+    ]
+    async with AsyncSessionLocal() as db:
+        try:
+            # Upsert: outro worker pode ter gravado o mesmo CEP ao mesmo tempo
+            stmt = dialect_insert(db.bind.dialect.name, CepCacheEntry.__table__)
+            await db.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=["cep"],
+                    set_={name: stmt.excluded[name] for name in rows[0] if name != "cep"},
+                ),
+                rows,
+            )
+            await db.commit()
+        except SQLAlchemyError:
+            await db.rollback()
+            logger.warning("Falha ao persistir CEPs %s no cache", sorted(results), exc_info=True)
+
+
+async def _lookup_persisted(ceps: list[str]) -> dict[str, tuple[AddressFromCEP | None, float]]:
+    try:
+        return await _load_persisted(ceps)
+    except SQLAlchemyError:
+        # Cache é best-effort: se o banco falhar, segue para a API
+        logger.warning("Falha ao ler cache de CEPs %s", ceps, exc_info=True)
+        return {}
+
+
+async def _request_viacep(cep_clean: str) -> AddressFromCEP | None:
+    """
+    Consulta o ViaCEP.
+
+    Returns:
+        AddressFromCEP se encontrado, None se o ViaCEP informar CEP inexistente.
+
+    Raises:
+        httpx.HTTPError / ValueError em falhas de rede ou resposta inválida
+        (essas falhas NÃO são cacheadas).
+    """
+    client = get_http_client("viacep")
+    response = await client.get(f"/ws/{cep_clean}/json/")
+    response.raise_for_status()
+    data = response.json()
+
+    # ViaCEP retorna {"erro": true} para CEPs não encontrados
+    if data.get("erro"):
+        return None
+
+    return AddressFromCEP(
+        cep=data.get("cep", "").replace("-", ""),
+        street=data.get("logradouro", ""),
+        neighborhood=data.get("bairro", ""),
+        city=data.get("localidade", ""),
+        state=data.get("uf", ""),
+    )
+
+
 async def fetch_address_by_cep(cep: str) -> AddressFromCEP | None:
     """
     Busca endereço pelo CEP usando a API ViaCEP (gratuita).
-    
+
+    Usa cache em camadas: LRU em memória -> tabela cep_cache -> ViaCEP.
+    CEPs inexistentes também são cacheados (com TTL menor). Consultas
+    simultâneas compartilham uma única ida ao banco, e o mesmo CEP uma
+    única chamada ao ViaCEP.
+
     Args:
         cep: CEP no formato "00000000" ou "00000-000"
-    
+
     Returns:
         AddressFromCEP se encontrado, None se CEP inválido
     """
     # Remove caracteres não numéricos
     cep_clean = "".join(filter(str.isdigit, cep))
-    
+
     if len(cep_clean) != 8:
         return None
-    
-    url = f"https://viacep.com.br/ws/{cep_clean}/json/"
-    
+
+    cached = _cep_cache.get(cep_clean)
+    if cached is not MISSING:
+        return cached
+
+    return await _cep_loader.load(cep_clean)
+
+
+async def _resolve_many(ceps: list[str]) -> dict[str, AddressFromCEP | None]:
+    """Banco -> ViaCEP para os CEPs fora do LRU pedidos na mesma volta do event loop"""
+    results: dict[str, AddressFromCEP | None] = {}
+    persisted = await _lookup_persisted(ceps)
+    for cep_clean, (address, remaining) in persisted.items():
+        _cep_stats["db_hits"] += 1
+        _cep_cache.set(cep_clean, address, ttl_seconds=remaining)
+        results[cep_clean] = address
+
+    missing = [cep_clean for cep_clean in ceps if cep_clean not in persisted]
+    if not missing:
+        return results
+    _cep_stats["db_misses"] += len(missing)
+
+    fetched = await asyncio.gather(*(_fetch_viacep(cep_clean) for cep_clean in missing))
+    to_persist = {}
+    for cep_clean, (ok, address) in zip(missing, fetched):
+        results[cep_clean] = address
+        if ok:
+            _cep_cache.set(cep_clean, address, ttl_seconds=_ttl_for(address is not None))
+            to_persist[cep_clean] = address
+
+    if to_persist:
+        await _persist(to_persist)
+    return results
+
+
+async def _fetch_viacep(cep_clean: str) -> tuple[bool, AddressFromCEP | None]:
+    """(sucesso, endereço); falhas de rede viram (False, None) e não são cacheadas"""
+    _cep_stats["api_calls"] += 1
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(url)
-            response.raise_for_status()
-            data = response.json()
-            
-            # ViaCEP retorna {"erro": true} para CEPs não encontrados
-            if data.get("erro"):
-                return None
-            
-            return AddressFromCEP(
-                cep=data.get("cep", "").replace("-", ""),
-                street=data.get("logradouro", ""),
-                neighborhood=data.get("bairro", ""),
-                city=data.get("localidade", ""),
-                state=data.get("uf", ""),
-            )
+        with measure_external("viacep"):
+            return True, await _request_viacep(cep_clean)
     except Exception:
-        return None
+        _cep_stats["api_errors"] += 1
+        return False, None
+
+
+# Buscas fora do LRU pedidas juntas (ex: origem e destino, ou um lote do
+# /orders/bulk) viram uma query no cep_cache; o mesmo CEP em andamento é
+# compartilhado em vez de chamar o ViaCEP de novo
+_cep_loader = BatchLoader(_resolve_many)
+
 
+def get_cep_cache_stats() -> dict:
+    """Métricas do cache de CEP (memória + banco + chamadas à API)"""
+    return {"memory": _cep_cache.stats(), **_cep_stats, "coalesced": _cep_loader.coalesced}
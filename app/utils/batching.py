@@ -0,0 +1,84 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class BatchLoader:
+    """
+    Agrupa as chamadas de `load(key)` feitas na mesma volta do event loop
+    em uma única chamada de `load_many(keys)` (ex: um SELECT ... IN para
+    origem e destino, em vez de uma query por endereço).
+
+    - Chaves já em andamento compartilham o mesmo resultado (coalescing).
+    - `load_many` retorna {chave: valor}; chaves ausentes viram None.
+    - Se quem chamou desistir (timeout), o lote continua para os demais.
+
+    Vale por event loop: ao trocar de loop (ex: testes), o estado recomeça.
+    """
+
+    def __init__(self, load_many: Callable[[list[Hashable]], Awaitable[dict[Hashable, Any]]]):
+        self._load_many = load_many
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._futures: dict[Hashable, asyncio.Future] = {}
+        self._pending: list[Hashable] = []
+        self._tasks: set[asyncio.Task] = set()
+
+        # Métricas
+        self.batches = 0
+        self.keys_loaded = 0
+        self.coalesced = 0
+
+    async def load(self, key: Hashable) -> Any:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._futures = {}
+            self._pending = []
+            self._tasks = set()
+
+        future = self._futures.get(key)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            future = loop.create_future()
+            self._futures[key] = future
+            if not self._pending:
+                loop.call_soon(self._dispatch)
+            self._pending.append(key)
+
+        return await asyncio.shield(future)
+
+    def _dispatch(self) -> None:
+        keys, self._pending = self._pending, []
+        if not keys:
+            return
+        task = self._loop.create_task(self._run(keys))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, keys: list[Hashable]) -> None:
+        self.batches += 1
+        self.keys_loaded += len(keys)
+        try:
+            results = await self._load_many(keys)
+        except BaseException as exc:
+            for key in keys:
+                future = self._futures.pop(key, None)
+                if future is not None and not future.done():
+                    future.set_exception(exc)
+                    future.exception()  # evita warning se ninguém mais estiver esperando
+            if not isinstance(exc, Exception):
+                raise
+            return
+
+        for key in keys:
+            future = self._futures.pop(key, None)
+            if future is not None and not future.done():
+                future.set_result(results.get(key))
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "keys_loaded": self.keys_loaded,
+            "coalesced": self.coalesced,
+            "keys_per_batch_avg": round(self.keys_loaded / self.batches, 2) if self.batches else 0.0,
+        }
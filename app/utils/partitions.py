@@ -0,0 +1,108 @@
+"""
+Partições mensais por intervalo (RANGE) no Postgres.
+
+Cada mês vira uma tabela `<tabela>_yYYYYmMM` com [1º dia do mês, 1º dia do
+mês seguinte); linhas fora de qualquer intervalo caem em `<tabela>_default`.
+Em outros bancos (SQLite de testes) nada disso se aplica.
+"""
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+
+def month_start(value: date) -> date:
+    return value.replace(day=1)
+
+
+def add_months(value: date, months: int) -> date:
+    """1º dia do mês `months` meses depois de `value`"""
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_y{month.year:04d}m{month.month:02d}"
+
+
+def is_partitioned(conn: Connection, table: str) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    return bool(conn.scalar(
+        text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p "
+            "JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = :table AND pg_table_is_visible(c.oid))"
+        ),
+        {"table": table},
+    ))
+
+
+def list_partitions(conn: Connection, table: str) -> list[str]:
+    return list(conn.scalars(
+        text(
+            "SELECT child.relname FROM pg_inherits i "
+            "JOIN pg_class parent ON parent.oid = i.inhparent "
+            "JOIN pg_class child ON child.oid = i.inhrelid "
+            "WHERE parent.relname = :table AND pg_table_is_visible(parent.oid) "
+            "ORDER BY child.relname"
+        ),
+        {"table": table},
+    ))
+
+
+def create_default_partition(conn: Connection, table: str) -> None:
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT"))
+
+
+def ensure_monthly_partitions(conn: Connection, table: str, start: date, end: date) -> list[str]:
+    """
+    Cria as partições mensais de `start` até `end` (inclusive) que ainda
+    não existem. Criar com antecedência evita que linhas novas caiam na
+    partição default.
+
+    Returns:
+        Nomes das partições criadas.
+    """
+    if not is_partitioned(conn, table):
+        return []
+
+    existing = set(list_partitions(conn, table))
+    created = []
+    month = month_start(start)
+    while month <= end:
+        name = partition_name(table, month)
+        if name not in existing:
+            conn.execute(text(
+                f"CREATE TABLE {name} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+            ))
+            created.append(name)
+        month = add_months(month, 1)
+    return created
+
+
+def drop_empty_partitions(conn: Connection, table: str, before: date) -> list[str]:
+    """
+    Remove partições mensais vazias que terminam antes de `before` (ex:
+    meses cujo conteúdo já foi todo arquivado). A default nunca é removida.
+
+    Returns:
+        Nomes das partições removidas.
+    """
+    if not is_partitioned(conn, table):
+        return []
+
+    dropped = []
+    for name in list_partitions(conn, table):
+        suffix = name[len(table) + 1:]
+        if not (len(suffix) == 8 and suffix[0] == "y" and suffix[5] == "m"):
+            continue
+        month = date(int(suffix[1:5]), int(suffix[6:8]), 1)
+        if add_months(month, 1) > before:
+            continue
+        if conn.scalar(text(f"SELECT EXISTS (SELECT 1 FROM {name})")):
+            continue
+        conn.execute(text(f"DROP TABLE {name}"))
+        dropped.append(name)
+    return dropped
@@ -0,0 +1,210 @@
+import asyncio
+import contextvars
+import itertools
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Hashable
+
+
+# Prioridades (menor = atendido primeiro)
+PRIORITY_INTERACTIVE = 0  # requests de usuário esperando resposta
+PRIORITY_SPECULATIVE = 5  # chamadas adiantadas que talvez nem sejam usadas
+PRIORITY_BACKGROUND = 10  # backfill / jobs em segundo plano
+
+
+@dataclass
+class _Job:
+    future: asyncio.Future
+    factory: Callable[[], Awaitable[Any]]
+    priority: int
+    enqueued_at: float
+    context: contextvars.Context
+    started: bool = False
+    waiters: int = 0
+
+
+class TokenBucketScheduler:
+    """
+    Fila com token bucket para APIs externas com limite de taxa.
+
+    - No máximo `rate` chamadas por segundo (com rajada de até `burst`).
+    - Chamadas idênticas em andamento (mesma `key`) compartilham o mesmo
+      resultado em vez de gerar uma nova chamada (coalescing).
+    - Chamadas interativas passam na frente das de segundo plano.
+    - Jobs que ainda não começaram e não têm mais ninguém esperando (todos
+      desistiram) saem da fila sem gastar token.
+    - `factory()` roda no contexto (contextvars) de quem criou o job: o que
+      ela medir conta uma vez só, na request que originou a chamada.
+
+    Vale por processo: com vários workers do uvicorn, cada um tem seu bucket.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._jobs: dict[Hashable, _Job] = {}
+        self._seq = itertools.count()
+        self._queue: asyncio.PriorityQueue | None = None
+        self._worker: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+        # Métricas
+        self.submitted = 0
+        self.coalesced = 0
+        self.executed = 0
+        self.throttled = 0
+        self.dropped = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    async def submit(
+        self,
+        key: Hashable,
+        factory: Callable[[], Awaitable[Any]],
+        priority: int = PRIORITY_INTERACTIVE,
+    ) -> Any:
+        """Agenda `factory()` respeitando o limite de taxa e aguarda o resultado"""
+        self._ensure_worker()
+        self.submitted += 1
+
+        job = self._jobs.get(key)
+        if job is not None:
+            self.coalesced += 1
+            if priority < job.priority and not job.started:
+                # Um request interativo "promove" o job que estava na fila
+                job.priority = priority
+                self._enqueue(key, job)
+        else:
+            job = _Job(
+                future=self._loop.create_future(),
+                factory=factory,
+                priority=priority,
+                enqueued_at=time.monotonic(),
+                context=contextvars.copy_context(),
+            )
+            self._jobs[key] = job
+            self._enqueue(key, job)
+
+        # shield: se quem chamou desistir (timeout), o job continua para os demais
+        job.waiters += 1
+        try:
+            return await asyncio.shield(job.future)
+        finally:
+            job.waiters -= 1
+            if job.waiters == 0 and not job.started and self._jobs.get(key) is job:
+                # Ninguém mais quer o resultado: não vale um token
+                del self._jobs[key]
+                job.future.cancel()
+                self.dropped += 1
+
+    def spare_tokens(self) -> float:
+        """Tokens disponíveis agora, descontados os jobs já na fila (0 se pausado)"""
+        now = time.monotonic()
+        if now < self._paused_until:
+            return 0.0
+        tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        queued = sum(1 for job in self._jobs.values() if not job.started)
+        return max(tokens - queued, 0.0)
+
+    def pause(self, seconds: float) -> None:
+        """Suspende novas chamadas (ex: a API respondeu 429 Too Many Requests)"""
+        self.throttled += 1
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+    async def close(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+        self._worker = None
+        self._queue = None
+        self._loop = None
+        self._jobs.clear()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "rate_per_second": self.rate,
+            "queue_size": self._queue.qsize() if self._queue is not None else 0,
+            "in_flight": len(self._jobs),
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "executed": self.executed,
+            "throttled": self.throttled,
+            "dropped": self.dropped,
+            "wait_seconds_avg": (
+                round(self.wait_time_total / self.executed, 4) if self.executed else 0.0
+            ),
+            "wait_seconds_max": round(self.wait_time_max, 4),
+        }
+
+    def _ensure_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._worker is not None and not self._worker.done() and self._loop is loop:
+            return
+        self._loop = loop
+        self._queue = asyncio.PriorityQueue()
+        self._jobs.clear()
+        # Contexto vazio: o worker não pertence à request que o iniciou
+        self._worker = loop.create_task(self._run(), context=contextvars.Context())
+
+    def _enqueue(self, key: Hashable, job: _Job) -> None:
+        self._queue.put_nowait((job.priority, next(self._seq), key, job))
+
+    def _is_live(self, entry: tuple) -> bool:
+        # Entradas duplicadas (job promovido), jobs já executados ou abandonados
+        _, _, key, job = entry
+        return not job.started and self._jobs.get(key) is job
+
+    async def _run(self) -> None:
+        while True:
+            entry = await self._queue.get()
+            if not self._is_live(entry):
+                continue
+            await self._take_token()
+
+            # Enquanto esperava o token podem ter chegado jobs mais prioritários
+            # (ou o job pode ter sido abandonado)
+            self._queue.put_nowait(entry)
+            entry = self._queue.get_nowait()
+            while not self._is_live(entry) and not self._queue.empty():
+                entry = self._queue.get_nowait()
+            if not self._is_live(entry):
+                self._tokens = min(self._tokens + 1, self.burst)
+                continue
+
+            _, _, key, job = entry
+            job.started = True
+            waited = time.monotonic() - job.enqueued_at
+            self.executed += 1
+            self.wait_time_total += waited
+            self.wait_time_max = max(self.wait_time_max, waited)
+            self._loop.create_task(self._execute(key, job), context=job.context)
+
+    async def _take_token(self) -> None:
+        while True:
+            now = time.monotonic()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    async def _execute(self, key: Hashable, job: _Job) -> None:
+        try:
+            result = await job.factory()
+        except Exception as exc:
+            job.future.set_exception(exc)
+            job.future.exception()  # evita warning se ninguém mais estiver esperando
+        else:
+            job.future.set_result(result)
+        finally:
+            if self._jobs.get(key) is job:
+                del self._jobs[key]
@@ -1,20 +1,104 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Any, Optional
+from typing import Any, Callable, Optional, TypeVar
 
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+T = TypeVar("T")
 
+# Hashes com custo diferente de PASSWORD_HASH_ROUNDS são marcados para atualização
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.PASSWORD_HASH_ROUNDS,
+)
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
 
+class PasswordHasher:
+    """
+    Pool de threads exclusivo para o bcrypt (~250 ms de CPU por operação).
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    Fora do threadpool padrão, uma rajada de logins não trava as demais
+    rotas sync; o bcrypt libera o GIL, então as threads rodam em paralelo.
+    Mede quanto tempo cada operação esperou na fila antes de rodar.
+
+    Único caminho para o bcrypt no projeto: rotas usam os métodos async e
+    scripts sync (create_admin, seed do benchmark) usam `hash_sync`.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="password-hash",
+        )
+        self._lock = threading.Lock()
+
+        # Métricas
+        self.pending = 0
+        self.completed = 0
+        self.queue_time_total = 0.0
+        self.queue_time_max = 0.0
+
+    def _submit(self, func: Callable[..., T], *args: Any) -> Future[T]:
+        enqueued_at = time.monotonic()
+        with self._lock:
+            self.pending += 1
+
+        def task() -> T:
+            waited = time.monotonic() - enqueued_at
+            with self._lock:
+                self.pending -= 1
+                self.completed += 1
+                self.queue_time_total += waited
+                self.queue_time_max = max(self.queue_time_max, waited)
+            return func(*args)
+
+        return self._executor.submit(task)
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        return await asyncio.wrap_future(self._submit(func, *args))
+
+    async def hash(self, password: str) -> str:
+        return await self.run(pwd_context.hash, password)
+
+    def hash_sync(self, password: str) -> str:
+        """Para scripts fora do event loop"""
+        return self._submit(pwd_context.hash, password).result()
+
+    async def verify_and_update(
+        self, plain_password: str, hashed_password: str
+    ) -> tuple[bool, str | None]:
+        """
+        Returns:
+            (senha confere, novo hash ou None). O novo hash vem preenchido
+            quando o custo configurado mudou e o hash deve ser regravado.
+        """
+        return await self.run(pwd_context.verify_and_update, plain_password, hashed_password)
+
+    async def dummy_verify(self) -> None:
+        """Gasta o mesmo tempo de uma verificação (e-mail inexistente)"""
+        await self.run(pwd_context.dummy_verify)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "workers": self.max_workers,
+            "pending": self.pending,
+            "completed": self.completed,
+            "queue_seconds_avg": (
+                round(self.queue_time_total / self.completed, 4) if self.completed else 0.0
+            ),
+            "queue_seconds_max": round(self.queue_time_max, 4),
+        }
+
+
+password_hasher = PasswordHasher(max_workers=settings.PASSWORD_HASH_WORKERS)
 
 
 def create_access_token(data: dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
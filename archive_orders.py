@@ -0,0 +1,35 @@
+"""
+Arquiva pedidos finalizados e mantém as partições de order_events.
+
+Rode periodicamente (ex: cron diário):
+    python archive_orders.py
+    python archive_orders.py --older-than-days 30 --max-batches 100
+"""
+import argparse
+import logging
+
+from app.core.config import settings
+from app.services.archive_service import archive_finished_orders, maintain_event_partitions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Arquiva pedidos entregues/cancelados antigos")
+    parser.add_argument("--older-than-days", type=int, default=settings.ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=settings.ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--max-batches", type=int, help="Limita o trabalho desta execução")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    archived = archive_finished_orders(args.older_than_days, args.batch_size, args.max_batches)
+    print(f"Pedidos arquivados: {archived}")
+
+    created, dropped = maintain_event_partitions()
+    if created:
+        print(f"Partições criadas: {', '.join(created)}")
+    if dropped:
+        print(f"Partições vazias removidas: {', '.join(dropped)}")
+
+
+if __name__ == "__main__":
+    main()
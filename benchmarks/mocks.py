@@ -0,0 +1,70 @@
+"""
+Servidores falsos do ViaCEP e do Nominatim (httpx.MockTransport).
+
+A latência de cada integração é simulada com asyncio.sleep, então o
+benchmark mede o comportamento da API (filas, cache, concorrência) sem
+depender da rede nem violar a política de uso do Nominatim.
+"""
+import asyncio
+import random
+
+import httpx
+
+# CEPs válidos usados na criação de pedidos (e um inexistente)
+KNOWN_CEPS = [f"{cep:08d}" for cep in range(1310100, 1310100 + 200)]
+UNKNOWN_CEP = "00000000"
+
+
+def _viacep_response(cep: str) -> httpx.Response:
+    if cep == UNKNOWN_CEP:
+        return httpx.Response(200, json={"erro": True})
+    return httpx.Response(
+        200,
+        json={
+            "cep": f"{cep[:5]}-{cep[5:]}",
+            "logradouro": "Avenida Paulista",
+            "complemento": "",
+            "bairro": "Bela Vista",
+            "localidade": "São Paulo",
+            "uf": "SP",
+        },
+    )
+
+
+def _nominatim_response() -> httpx.Response:
+    lat = -23.56 + random.uniform(-0.05, 0.05)
+    lon = -46.65 + random.uniform(-0.05, 0.05)
+    return httpx.Response(200, json=[{"lat": f"{lat:.6f}", "lon": f"{lon:.6f}"}])
+
+
+def build_mock_transport(viacep_latency: float, nominatim_latency: float) -> httpx.MockTransport:
+    """Transport que responde como ViaCEP / Nominatim, com a latência informada (s)"""
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        if host == "viacep.com.br":
+            await asyncio.sleep(viacep_latency)
+            return _viacep_response(request.url.path.split("/")[2])
+        if host == "nominatim.openstreetmap.org":
+            await asyncio.sleep(nominatim_latency)
+            return _nominatim_response()
+        return httpx.Response(404)
+
+    return httpx.MockTransport(handler)
+
+
+def install_mock_transport(viacep_latency: float, nominatim_latency: float) -> None:
+    """Faz os clientes compartilhados de http_client usarem o transport falso"""
+    from app.core.instrumentation import httpx_event_hooks
+    from app.services import http_client
+
+    transport = build_mock_transport(viacep_latency, nominatim_latency)
+
+    def build_client(name: str) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            transport=transport,
+            event_hooks=httpx_event_hooks(name),
+            **http_client._CLIENT_OPTIONS.get(name, {}),
+        )
+
+    http_client._build_client = build_client
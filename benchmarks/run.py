@@ -0,0 +1,303 @@
+"""
+Benchmark dos endpoints quentes da API.
+
+Sobe a aplicação em processo (httpx + ASGITransport, com lifespan), contra
+um banco descartável e ViaCEP/Nominatim falsos, semeia usuários/pedidos/
+eventos e mede vazão e latência (p50/p90/p99) de cada cenário.
+
+Execute:
+    python -m benchmarks.run                              # SQLite temporário
+    python -m benchmarks.run --output bench.json          # salva o relatório
+    python -m benchmarks.run --baseline bench.json        # falha se regredir
+    python -m benchmarks.run --database-url postgresql+psycopg2://... --reset-database
+
+⚠️ Com --database-url, TODAS as tabelas do banco são recriadas: use um banco
+só para benchmark.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import re
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+_SERVER_TIMING_DB = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries"')
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+    db_queries: list[int] = field(default_factory=list)
+    wall_seconds: float = 0.0
+
+    def summary(self) -> dict:
+        ordered = sorted(self.latencies)
+        total = len(ordered) + self.errors
+
+        def pct(p: float) -> float:
+            if not ordered:
+                return 0.0
+            index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+            return round(ordered[index] * 1000, 3)
+
+        return {
+            "requests": total,
+            "errors": self.errors,
+            "throughput_rps": round(total / self.wall_seconds, 2) if self.wall_seconds else 0.0,
+            "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3) if ordered else 0.0,
+            "p50_ms": pct(50),
+            "p90_ms": pct(90),
+            "p99_ms": pct(99),
+            "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+            "db_queries_per_request": (
+                round(sum(self.db_queries) / len(self.db_queries), 2) if self.db_queries else None
+            ),
+        }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark dos endpoints quentes da API")
+    parser.add_argument("--database-url", help="Banco descartável (padrão: SQLite temporário)")
+    parser.add_argument("--reset-database", action="store_true",
+                        help="Confirma que as tabelas de --database-url podem ser recriadas")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--orders", type=int, default=5_000)
+    parser.add_argument("--events-per-order", type=int, default=3)
+    parser.add_argument("--requests", type=int, default=500, help="Requests por cenário")
+    parser.add_argument("--login-requests", type=int, default=50, help="Requests de login (bcrypt é caro)")
+    parser.add_argument("--create-requests", type=int, default=100, help="Requests de POST /orders/")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--viacep-latency-ms", type=float, default=20.0)
+    parser.add_argument("--nominatim-latency-ms", type=float, default=50.0)
+    parser.add_argument("--seed", type=int, default=42, help="Semente do gerador aleatório")
+    parser.add_argument("--only", action="append", help="Roda só os cenários informados")
+    parser.add_argument("--output", help="Arquivo do relatório JSON (padrão: stdout)")
+    parser.add_argument("--baseline", help="Relatório anterior para comparar")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Piora aceita em relação ao baseline (0.25 = 25%%)")
+    return parser.parse_args()
+
+
+def configure_environment(args: argparse.Namespace) -> None:
+    """Variáveis lidas pelo Settings: precisam existir antes de importar `app`"""
+    url = args.database_url
+    if url is None:
+        path = os.path.join(tempfile.mkdtemp(prefix="dt-bench-"), "bench.db")
+        url = f"sqlite:///{path}"
+    elif not args.reset_database:
+        sys.exit("--database-url recria todas as tabelas; confirme com --reset-database")
+
+    os.environ["DATABASE_URL"] = url
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    # Nominatim falso: sem o limite de 1 request/s da política pública
+    os.environ.setdefault("NOMINATIM_RATE_PER_SECOND", "1000")
+    os.environ.setdefault("NOMINATIM_BURST", "100")
+
+
+async def run_scenario(name, client, make_request, total: int, concurrency: int) -> ScenarioResult:
+    """Dispara `total` requests com no máximo `concurrency` simultâneas"""
+    result = ScenarioResult(name=name)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await make_request(client, i)
+            except Exception:
+                result.errors += 1
+                return
+            elapsed = time.perf_counter() - start
+
+            if response.status_code >= 400:
+                result.errors += 1
+                return
+            result.latencies.append(elapsed)
+            match = _SERVER_TIMING_DB.search(response.headers.get("server-timing", ""))
+            if match:
+                result.db_queries.append(int(match.group(1)))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    result.wall_seconds = time.perf_counter() - start
+    return result
+
+
+async def run_benchmarks(args: argparse.Namespace, seeded, rng: random.Random) -> dict[str, dict]:
+    import httpx
+
+    from app.main import app
+    from benchmarks.mocks import KNOWN_CEPS
+    from benchmarks.seed import ADMIN_EMAIL, PASSWORD
+
+    base = "/api/v1"
+    transport = httpx.ASGITransport(app=app)
+
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+            async def login(email: str) -> dict:
+                response = await client.post(
+                    f"{base}/auth/login", data={"username": email, "password": PASSWORD}
+                )
+                response.raise_for_status()
+                return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+            admin_headers = await login(ADMIN_EMAIL)
+            user_headers = [await login(email) for email in seeded.user_emails[:10]]
+
+            codes = seeded.tracking_codes
+            emails = seeded.user_emails
+            # Todo o período semeado (180 dias)
+            stats_from = (datetime.now(timezone.utc) - timedelta(days=180)).date().isoformat()
+
+            scenarios = {
+                "track": (
+                    lambda c, i: c.get(f"{base}/track/{rng.choice(codes)}"),
+                    args.requests,
+                ),
+                "orders_mine": (
+                    lambda c, i: c.get(f"{base}/orders/", headers=user_headers[i % len(user_headers)]),
+                    args.requests,
+                ),
+                "orders_all": (
+                    lambda c, i: c.get(f"{base}/orders/all", headers=admin_headers),
+                    args.requests,
+                ),
+                "orders_all_filtered": (
+                    lambda c, i: c.get(
+                        f"{base}/orders/all", params={"status_filter": "in_transit"}, headers=admin_headers
+                    ),
+                    args.requests,
+                ),
+                "orders_all_last_event": (
+                    lambda c, i: c.get(
+                        f"{base}/orders/all", params={"include_last_event": "true"}, headers=admin_headers
+                    ),
+                    args.requests,
+                ),
+                "orders_stats": (
+                    lambda c, i: c.get(
+                        f"{base}/orders/stats", params={"date_from": stats_from}, headers=admin_headers
+                    ),
+                    args.requests,
+                ),
+                "create_order": (
+                    lambda c, i: c.post(
+                        f"{base}/orders/",
+                        json={
+                            "origin_address": {"cep": rng.choice(KNOWN_CEPS), "number": str(rng.randint(1, 50))},
+                            "destination_address": {"cep": rng.choice(KNOWN_CEPS), "number": str(rng.randint(1, 50))},
+                        },
+                        headers=user_headers[i % len(user_headers)],
+                    ),
+                    args.create_requests,
+                ),
+                "login": (
+                    lambda c, i: c.post(
+                        f"{base}/auth/login",
+                        data={"username": emails[i % len(emails)], "password": PASSWORD},
+                    ),
+                    args.login_requests,
+                ),
+            }
+
+            results = {}
+            for name, (make_request, total) in scenarios.items():
+                if args.only and name not in args.only:
+                    continue
+                print(f"▶️  {name} ({total} requests)", file=sys.stderr)
+                result = await run_scenario(name, client, make_request, total, args.concurrency)
+                results[name] = result.summary()
+
+            return results
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Cenários que ficaram mais lentos (p99) ou com menos vazão que o baseline"""
+    regressions = []
+    for name, current in report["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if previous is None:
+            continue
+        if previous["p99_ms"] and current["p99_ms"] > previous["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {previous['p99_ms']}ms -> {current['p99_ms']}ms")
+        if previous["throughput_rps"] and current["throughput_rps"] < previous["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: vazão {previous['throughput_rps']} -> {current['throughput_rps']} req/s"
+            )
+        if current["errors"] > previous["errors"]:
+            regressions.append(f"{name}: erros {previous['errors']} -> {current['errors']}")
+    return regressions
+
+
+def main():
+    args = parse_args()
+    configure_environment(args)
+    rng = random.Random(args.seed)
+
+    import sqlalchemy
+
+    from app.database import engine
+    from benchmarks.mocks import install_mock_transport
+    from benchmarks.seed import reset_database, seed
+
+    install_mock_transport(args.viacep_latency_ms / 1000, args.nominatim_latency_ms / 1000)
+
+    print(f"🌱 Semeando {args.users} usuários / {args.orders} pedidos...", file=sys.stderr)
+    reset_database(engine)
+    start = time.perf_counter()
+    seeded = seed(engine, args.users, args.orders, args.events_per_order, rng)
+    seed_seconds = time.perf_counter() - start
+
+    scenarios = asyncio.run(run_benchmarks(args, seeded, rng))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "database": engine.dialect.name,
+            "database_url": engine.url.render_as_string(hide_password=True),
+            "users": args.users,
+            "orders": args.orders,
+            "events_per_order": args.events_per_order,
+            "concurrency": args.concurrency,
+            "viacep_latency_ms": args.viacep_latency_ms,
+            "nominatim_latency_ms": args.nominatim_latency_ms,
+            "seed": args.seed,
+            "seed_seconds": round(seed_seconds, 3),
+        },
+        "scenarios": scenarios,
+    }
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+        print(f"📄 Relatório salvo em {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print("❌ Regressões em relação ao baseline:", file=sys.stderr)
+            for line in regressions:
+                print(f"   - {line}", file=sys.stderr)
+            sys.exit(1)
+        print("✅ Sem regressões em relação ao baseline", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
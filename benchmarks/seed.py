@@ -0,0 +1,129 @@
+"""
+Popula um banco descartável com usuários, pedidos e eventos.
+
+Usa INSERTs de várias linhas direto no engine (sem ORM), para que
+semear dezenas de milhares de pedidos leve segundos.
+"""
+import random
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from benchmarks.mocks import KNOWN_CEPS
+
+PASSWORD = "benchmark"
+ADMIN_EMAIL = "admin@bench.local"
+
+_BATCH = 1_000
+_FLOW = ["created", "in_transit", "delivered"]
+
+
+@dataclass
+class SeedResult:
+    user_emails: list[str]
+    tracking_codes: list[str]
+
+
+def _batches(rows: list[dict]):
+    for start in range(0, len(rows), _BATCH):
+        yield rows[start:start + _BATCH]
+
+
+def reset_database(engine) -> None:
+    """Recria todas as tabelas e aplica as migrações"""
+    import app.models  # noqa: F401 (registra os models no metadata)
+    from app.database import Base
+    from app.migrations import run_migrations
+
+    Base.metadata.drop_all(engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE IF EXISTS schema_migrations")
+    Base.metadata.create_all(engine)
+    run_migrations(engine)
+
+
+def seed(engine, users: int, orders: int, events_per_order: int, rng: random.Random) -> SeedResult:
+    from app.models.address import Address
+    from app.models.order import Order
+    from app.models.order_event import OrderEvent, STATUS_LABELS
+    from app.models.order_rollup import DeliveryTimeRollup, OrderDailyRollup
+    from app.models.user import User
+    from app.services.analytics_service import delivery_bucket, upsert_counts
+    from app.utils.security import password_hasher
+
+    # bcrypt uma vez só: todos os usuários têm a mesma senha
+    hashed = password_hasher.hash_sync(PASSWORD)
+    emails = [f"user{i}@bench.local" for i in range(users)]
+    now = datetime.utcnow()
+
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"email": ADMIN_EMAIL, "hashed_password": hashed, "role": "admin"},
+            *({"email": email, "hashed_password": hashed, "role": "user"} for email in emails),
+        ])
+
+        # Endereços: um por pedido em cada ponta (origem = 2i+1, destino = 2i+2)
+        for chunk in _batches([
+            {
+                "cep": rng.choice(KNOWN_CEPS),
+                "street": "Avenida Paulista",
+                "number": str(rng.randint(1, 3000)),
+                "city": "São Paulo",
+                "state": "SP",
+                "latitude": -23.56,
+                "longitude": -46.65,
+            }
+            for _ in range(orders * 2)
+        ]):
+            conn.execute(insert(Address), chunk)
+
+        codes = [f"DT-{uuid.UUID(int=rng.getrandbits(128)).hex[:8].upper()}" for _ in range(orders)]
+        order_rows = []
+        event_rows = []
+        for i, code in enumerate(codes):
+            created_at = now - timedelta(minutes=rng.randint(0, 60 * 24 * 180))
+            flow = _FLOW[:max(1, min(events_per_order, len(_FLOW)))]
+            order_rows.append({
+                "tracking_code": code,
+                "status": flow[-1],
+                "owner_id": 2 + i % users,  # id 1 é o admin
+                "origin_address_id": 2 * i + 1,
+                "destination_address_id": 2 * i + 2,
+                "last_event_label": STATUS_LABELS[flow[-1]],
+                "last_event_at": created_at + timedelta(hours=len(flow) - 1),
+                "event_count": len(flow),
+                "created_at": created_at,
+                "updated_at": created_at,
+            })
+            for step, status in enumerate(flow):
+                event_rows.append({
+                    "order_id": i + 1,
+                    "status": status,
+                    "status_label": STATUS_LABELS[status],
+                    "created_at": created_at + timedelta(hours=step),
+                })
+
+        for chunk in _batches(order_rows):
+            conn.execute(insert(Order), chunk)
+        for chunk in _batches(event_rows):
+            conn.execute(insert(OrderEvent), chunk)
+
+        # Rollups do /orders/stats (todos os endereços semeados são SP -> SP)
+        daily = defaultdict(int)
+        delivery = defaultdict(int)
+        for event in event_rows:
+            day = event["created_at"].date()
+            daily[(day, event["status"], "SP", "SP")] += 1
+            if event["status"] == "delivered":
+                created_at = order_rows[event["order_id"] - 1]["created_at"]
+                seconds = (event["created_at"] - created_at).total_seconds()
+                delivery[(day, "SP", delivery_bucket(seconds))] += 1
+        upsert_counts(
+            conn, OrderDailyRollup.__table__, ("day", "status", "origin_state", "destination_state"), daily
+        )
+        upsert_counts(conn, DeliveryTimeRollup.__table__, ("day", "destination_state", "bucket"), delivery)
+
+    return SeedResult(user_emails=emails, tracking_codes=codes)
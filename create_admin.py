@@ -4,7 +4,7 @@ Execute: python create_admin.py
 """
 from app.database import SessionLocal
 from app.models.user import User, UserRole
-from app.utils.security import get_password_hash
+from app.utils.security import password_hasher
 
 
 def create_admin():
@@ -34,7 +34,7 @@ def create_admin():
         # Cria o admin
         admin = User(
             email=admin_email,
-            hashed_password=get_password_hash(admin_password),
+            hashed_password=password_hasher.hash_sync(admin_password),
             full_name=admin_name,
             role=UserRole.ADMIN.value,
         )
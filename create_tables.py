@@ -1,10 +1,16 @@
 from app.database import Base, engine
 from app.models import user  # importa para registrar o model no metadata
+from app.migrations import run_migrations
 
 def main():
     print("Criando tabelas no banco...")
     Base.metadata.create_all(bind=engine)
     print("Tabelas criadas com sucesso!")
 
+    # Bancos já existentes recebem as alterações (índices, colunas novas...)
+    applied = run_migrations(engine)
+    if applied:
+        print(f"Migrações aplicadas: {applied}")
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,32 @@
+"""
+Aplica as migrações pendentes do schema.
+Execute: python migrate.py          (aplica)
+         python migrate.py --status (só mostra o estado)
+"""
+import sys
+
+from app.database import engine
+from app.migrations import applied_versions, load_migrations, run_migrations
+
+
+def show_status():
+    done = applied_versions(engine)
+    for migration in load_migrations():
+        mark = "✅" if migration.VERSION in done else "⏳"
+        print(f"{mark} {migration.VERSION:04d} {migration.DESCRIPTION}")
+
+
+def main():
+    if "--status" in sys.argv:
+        show_status()
+        return
+
+    applied = run_migrations(engine)
+    if applied:
+        print(f"✅ Migrações aplicadas: {applied}")
+    else:
+        print("Nenhuma migração pendente.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Configuração dos testes: SQLite temporário (aiosqlite nas rotas async),
+ViaCEP/Nominatim falsos (benchmarks.mocks) e tokens JWT reais.
+
+As variáveis precisam existir antes de importar `app` (lidas pelo Settings).
+"""
+import os
+import tempfile
+
+_DB_PATH = os.path.join(tempfile.mkdtemp(prefix="dt-tests-"), "tests.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_PATH}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ.setdefault("SECRET_KEY", "tests-secret")
+# Nominatim falso: sem o limite de 1 request/s da política pública
+os.environ.setdefault("NOMINATIM_RATE_PER_SECOND", "1000")
+os.environ.setdefault("NOMINATIM_BURST", "100")
+# bcrypt com o custo mínimo: os testes de login não precisam de ~250 ms por hash
+os.environ.setdefault("PASSWORD_HASH_ROUNDS", "4")
+
+import itertools  # noqa: E402
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+from sqlalchemy import event, insert  # noqa: E402
+
+_emails = itertools.count(1)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+def engine():
+    import app.models  # noqa: F401 (registra os models no metadata)
+    from app.database import Base, engine
+    from app.migrations import run_migrations
+
+    Base.metadata.create_all(engine)
+    run_migrations(engine)
+    return engine
+
+
+@pytest.fixture(autouse=True)
+def clean_state(engine):
+    """Cada teste começa com tabelas vazias e caches em memória limpos"""
+    from app.database import Base
+    from app.models.outbox_event import OutboxSequence
+    from app.services import auth_service, geocoding_service, tracking_cache, viacep_service
+    from app.services.tracking_cache import LocalTrackingCacheBackend, set_tracking_cache_backend
+
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            if table is not OutboxSequence.__table__:
+                conn.execute(table.delete())
+
+    viacep_service._cep_cache.clear()
+    geocoding_service._geocode_cache.clear()
+    auth_service._token_cache.clear()
+    auth_service._principal_cache.clear()
+    tracking_cache._generations.clear()
+    set_tracking_cache_backend(LocalTrackingCacheBackend(max_size=1000, ttl_seconds=60))
+
+
+@pytest.fixture
+async def client(engine):
+    """Cliente HTTP da API em processo (sem lifespan: workers ficam parados)"""
+    from app.database import async_engine
+    from app.main import app
+    from app.services.geocoding_service import nominatim_scheduler
+    from app.services.http_client import close_http_clients
+    from benchmarks.mocks import install_mock_transport
+
+    install_mock_transport(viacep_latency=0, nominatim_latency=0)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test/api/v1") as api:
+        yield api
+
+    await nominatim_scheduler.close()
+    await close_http_clients()
+    # Conexões do aiosqlite ficam presas ao event loop de cada teste
+    await async_engine.dispose()
+
+
+@pytest.fixture
+def make_user(engine):
+    """Cria um usuário e retorna (id, headers com Bearer token)"""
+    from app.models.user import User
+    from app.utils.security import create_access_token
+
+    def make(role: str = "user") -> tuple[int, dict]:
+        with engine.begin() as conn:
+            user_id = conn.execute(
+                insert(User).returning(User.id),
+                {"email": f"user{next(_emails)}@example.com", "hashed_password": "x", "role": role},
+            ).scalar_one()
+        token = create_access_token({"sub": str(user_id), "role": role})
+        return user_id, {"Authorization": f"Bearer {token}"}
+
+    return make
+
+
+@pytest.fixture
+def count_queries():
+    """Context manager que conta os statements SQL executados no engine async"""
+    from contextlib import contextmanager
+
+    from app.database import async_engine
+
+    @contextmanager
+    def counting():
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+    return counting
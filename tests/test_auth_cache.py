@@ -0,0 +1,38 @@
+"""Caches de autenticação: TTL próprio para tokens e admin pelo role do token"""
+import pytest
+from sqlalchemy import delete
+
+from app.core.config import settings
+from app.models.user import User
+from app.services import auth_service
+from app.services.auth_service import CurrentUser, Principal, get_current_admin
+
+pytestmark = pytest.mark.anyio
+
+
+def test_token_cache_has_its_own_ttl():
+    assert auth_service._token_cache.ttl_seconds == settings.AUTH_TOKEN_CACHE_TTL_SECONDS
+    assert auth_service._principal_cache.ttl_seconds == settings.AUTH_PRINCIPAL_CACHE_TTL_SECONDS
+
+
+async def test_trusted_role_claim_returns_principal_without_profile(engine, make_user, monkeypatch):
+    monkeypatch.setattr(settings, "AUTH_TRUST_ROLE_CLAIM", True)
+    user_id, headers = make_user(role="admin")
+    token = headers["Authorization"].removeprefix("Bearer ")
+    # Sem consultar o banco: nem precisa existir a linha em users
+    with engine.begin() as conn:
+        conn.execute(delete(User).where(User.id == user_id))
+
+    principal = await get_current_admin(db=None, token=token)
+
+    assert principal == Principal(id=user_id, role="admin")
+    assert not isinstance(principal, CurrentUser)
+
+
+async def test_admin_from_database_is_full_user(client, make_user):
+    _, headers = make_user(role="admin")
+
+    response = await client.get("/users/me", headers=headers)
+
+    assert response.status_code == 200
+    assert response.json()["email"].endswith("@example.com")
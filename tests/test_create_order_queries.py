@@ -0,0 +1,83 @@
+"""
+POST /orders/ lê cada camada de cache com uma query para origem + destino e
+grava o resumo da timeline no próprio INSERT do pedido
+"""
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+ORDER = {
+    "origin_address": {"cep": "01310-100", "number": "1000"},
+    "destination_address": {"cep": "01310-200", "number": "50"},
+}
+
+
+def _count(statements: list[str], prefix: str) -> int:
+    return sum(1 for statement in statements if statement.lstrip().startswith(prefix))
+
+
+async def test_cold_create_batches_cache_reads(client, make_user, count_queries):
+    _, headers = make_user()
+
+    with count_queries() as statements:
+        response = await client.post("/orders/", json=ORDER, headers=headers)
+
+    assert response.status_code == 201, response.text
+    body = response.json()
+    assert body["origin_address"]["latitude"] is not None
+    assert body["destination_address"]["latitude"] is not None
+
+    reads = [s for s in statements if s.lstrip().startswith("SELECT")]
+    assert sum("FROM cep_cache" in s for s in reads) == 1
+    assert sum("FROM addresses" in s for s in reads) == 1
+    # Uma leitura para o fallback por CEP (especulativo) e outra para o endereço completo
+    assert sum("FROM geocode_cache" in s for s in reads) == 2
+    assert _count(statements, "INSERT INTO cep_cache") == 1
+
+
+async def test_warm_create_reuses_persisted_addresses(client, make_user, count_queries):
+    from app.services import geocoding_service, viacep_service
+
+    _, headers = make_user()
+    first = await client.post("/orders/", json=ORDER, headers=headers)
+    assert first.status_code == 201, first.text
+
+    # Outro processo: só o banco está quente
+    viacep_service._cep_cache.clear()
+    geocoding_service._geocode_cache.clear()
+
+    with count_queries() as statements:
+        response = await client.post("/orders/", json=ORDER, headers=headers)
+
+    assert response.status_code == 201, response.text
+    assert response.json()["origin_address"]["latitude"] == first.json()["origin_address"]["latitude"]
+    assert _count(statements, "INSERT INTO cep_cache") == 0
+    reads = [s for s in statements if s.lstrip().startswith("SELECT")]
+    assert sum("FROM cep_cache" in s for s in reads) == 1
+
+
+async def test_create_writes_timeline_summary_in_the_insert(client, make_user, count_queries):
+    _, headers = make_user()
+
+    with count_queries() as statements:
+        response = await client.post("/orders/", json=ORDER, headers=headers)
+
+    assert response.status_code == 201, response.text
+    assert _count(statements, "UPDATE orders") == 0
+    page = (await client.get("/orders/", params={"include_last_event": "true"}, headers=headers)).json()
+    [item] = page["items"]
+    assert item["event_count"] == 1
+    assert item["last_event_label"] is not None
+
+
+async def test_status_update_increments_event_count(client, make_user):
+    _, headers = make_user()
+    order = (await client.post("/orders/", json=ORDER, headers=headers)).json()
+
+    response = await client.patch(
+        f"/orders/{order['id']}/status", json={"status": "in_transit"}, headers=headers
+    )
+
+    assert response.status_code == 200, response.text
+    page = (await client.get("/orders/", params={"include_last_event": "true"}, headers=headers)).json()
+    assert page["items"][0]["event_count"] == 2
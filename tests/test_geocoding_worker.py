@@ -0,0 +1,100 @@
+"""Worker de geocoding: reserva do job, timers de retry e cache negativo"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert, select
+
+from app.models.address import Address
+from app.models.geocoding_job import GeocodingJob
+from app.services import geocoding_service
+from app.services.geocoding_service import normalize_address_key
+from app.services.geocoding_worker import GeocodingWorker, _claim_job
+
+pytestmark = pytest.mark.anyio
+
+ADDRESS = {
+    "cep": "01310100", "street": "Avenida Paulista", "number": "1000",
+    "city": "São Paulo", "state": "SP",
+}
+
+
+def _create_job(engine, attempts: int = 0, next_attempt_at: datetime | None = None) -> tuple[int, int]:
+    with engine.begin() as conn:
+        address_id = conn.execute(insert(Address).returning(Address.id), ADDRESS).scalar_one()
+        job_id = conn.execute(
+            insert(GeocodingJob).returning(GeocodingJob.id),
+            {
+                "address_id": address_id,
+                "attempts": attempts,
+                "next_attempt_at": next_attempt_at or datetime.utcnow() - timedelta(seconds=1),
+            },
+        ).scalar_one()
+    return job_id, address_id
+
+
+def _cache_not_found() -> None:
+    """Simula buscas anteriores que deram "não encontrado" no Nominatim"""
+    street_key = "q:" + normalize_address_key(
+        ADDRESS["street"], ADDRESS["number"], ADDRESS["city"], ADDRESS["state"], "Brazil"
+    )
+    geocoding_service._geocode_cache.set(street_key, None)
+    geocoding_service._geocode_cache.set("cep:" + normalize_address_key(ADDRESS["cep"], "Brazil"), None)
+
+
+async def test_only_one_process_claims_a_job(engine):
+    job_id, address_id = _create_job(engine)
+
+    first, second = await asyncio.gather(_claim_job(job_id), _claim_job(job_id))
+
+    claimed = [result for result in (first, second) if isinstance(result, tuple)]
+    assert len(claimed) == 1
+    address, attempts = claimed[0]
+    assert (address.id, attempts) == (address_id, 0)
+    # O outro recebe o fim do lease, para tentar de novo se o dono cair
+    leased = first if first is not claimed[0] else second
+    assert leased > datetime.utcnow()
+
+
+async def test_job_not_due_is_not_claimed(engine):
+    retry_at = datetime.utcnow() + timedelta(minutes=5)
+    job_id, _ = _create_job(engine, attempts=1, next_attempt_at=retry_at)
+
+    assert await _claim_job(job_id) == retry_at
+
+
+async def test_fired_timers_are_released():
+    worker = GeocodingWorker()
+    worker._queue = asyncio.Queue()
+
+    worker._schedule(42, 0.01)
+    assert len(worker._timers) == 1
+
+    assert await asyncio.wait_for(worker._queue.get(), timeout=1) == 42
+    assert worker._timers == set()
+
+
+async def test_first_attempt_honors_negative_cache(engine, client):
+    job_id, address_id = _create_job(engine)
+    _cache_not_found()
+
+    await GeocodingWorker()._process(job_id)
+
+    with engine.connect() as conn:
+        job = conn.execute(select(GeocodingJob).where(GeocodingJob.id == job_id)).one()
+        latitude = conn.scalar(select(Address.latitude).where(Address.id == address_id))
+    assert job.attempts == 1
+    assert latitude is None
+
+
+async def test_retry_skips_negative_cache(engine, client):
+    job_id, address_id = _create_job(engine, attempts=1)
+    _cache_not_found()
+
+    await GeocodingWorker()._process(job_id)
+
+    with engine.connect() as conn:
+        remaining = conn.scalar(select(GeocodingJob.id).where(GeocodingJob.id == job_id))
+        latitude = conn.scalar(select(Address.latitude).where(Address.id == address_id))
+    assert remaining is None
+    assert latitude is not None
@@ -0,0 +1,84 @@
+"""Métricas: tempo externo sem a fila, streaming fora do histograma e /metrics opt-in"""
+import asyncio
+
+import pytest
+
+from app.core import instrumentation
+from app.core.config import settings
+from app.core.instrumentation import REQUEST_DURATION, MetricsMiddleware, RequestTimings, measure_external
+from app.utils.rate_limiter import TokenBucketScheduler
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_external_time_counts_once_and_excludes_queue_wait():
+    scheduler = TokenBucketScheduler(rate=10, burst=1)
+
+    async def call():
+        with measure_external("nominatim"):
+            await asyncio.sleep(0.01)
+        return "ok"
+
+    async def request(key: str) -> RequestTimings:
+        timings = RequestTimings()
+        instrumentation._current_timings.set(timings)
+        await scheduler.submit(key, call)
+        return timings
+
+    try:
+        # "b" espera ~100 ms pelo token; "b" de novo só aguarda o mesmo job
+        first, queued, coalesced = await asyncio.gather(request("a"), request("b"), request("b"))
+    finally:
+        await scheduler.close()
+
+    assert 0.01 <= first.external["nominatim"] < 0.05
+    assert 0.01 <= queued.external["nominatim"] < 0.05
+    assert coalesced.external == {}
+
+
+def _asgi_app(content_type: bytes):
+    async def app(scope, receive, send):
+        scope["route"] = type("Route", (), {"path": scope["path"]})()
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", content_type)]})
+        await send({"type": "http.response.body", "body": b""})
+    return app
+
+
+async def _call(app, path: str) -> None:
+    scope = {"type": "http", "method": "GET", "path": path, "headers": []}
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    await MetricsMiddleware(app, server_timing=False)(scope, receive, send)
+
+
+async def test_streaming_responses_stay_out_of_latency_histogram():
+    await _call(_asgi_app(b"text/event-stream; charset=utf-8"), "/test/stream")
+    await _call(_asgi_app(b"application/json"), "/test/json")
+
+    routes = {labels[1] for labels in REQUEST_DURATION._series}
+    assert "/test/json" in routes
+    assert "/test/stream" not in routes
+
+
+async def test_metrics_endpoint_is_opt_in(client):
+    response = await client.get("http://test/metrics")
+
+    assert response.status_code == 404
+
+
+async def test_metrics_endpoint_requires_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_ENDPOINT_ENABLED", True)
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-secret")
+
+    denied = await client.get("http://test/metrics")
+    allowed = await client.get("http://test/metrics", headers={"Authorization": "Bearer scrape-secret"})
+
+    assert denied.status_code == 401
+    assert allowed.status_code == 200
+    assert "http_request_duration_seconds" in allowed.text
@@ -0,0 +1,104 @@
+"""Paginação keyset das listagens de pedidos: (created_at, id) DESC"""
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from app.models.address import Address
+from app.models.order import Order
+
+pytestmark = pytest.mark.anyio
+
+BASE = datetime(2026, 3, 10, 12, 0, 0)
+
+
+def _create_orders(engine, owner_id: int, created_ats: list[datetime]) -> list[int]:
+    with engine.begin() as conn:
+        address_id = conn.execute(
+            insert(Address).returning(Address.id),
+            {"cep": "01310100", "street": "Avenida Paulista", "number": "1",
+             "city": "São Paulo", "state": "SP"},
+        ).scalar_one()
+        return conn.scalars(
+            insert(Order).returning(Order.id, sort_by_parameter_order=True),
+            [
+                {
+                    "tracking_code": f"DT-{uuid.uuid4().hex[:8].upper()}",
+                    "status": "created",
+                    "owner_id": owner_id,
+                    "origin_address_id": address_id,
+                    "destination_address_id": address_id,
+                    "created_at": created_at,
+                }
+                for created_at in created_ats
+            ],
+        ).all()
+
+
+async def _all_pages(client, headers, **params) -> list[list[int]]:
+    pages, cursor = [], None
+    while True:
+        query = {**params, **({"cursor": cursor} if cursor else {})}
+        response = await client.get("/orders/", params=query, headers=headers)
+        assert response.status_code == 200, response.text
+        body = response.json()
+        pages.append([item["id"] for item in body["items"]])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+async def test_pages_are_stable_with_duplicate_created_at(engine, client, make_user):
+    owner_id, headers = make_user()
+    # 7 pedidos no mesmo instante, cercados por um mais novo e um mais antigo
+    created_ats = [BASE - timedelta(hours=1)] + [BASE] * 7 + [BASE + timedelta(hours=1)]
+    ids = _create_orders(engine, owner_id, created_ats)
+
+    pages = await _all_pages(client, headers, limit=2)
+
+    expected = sorted(zip(created_ats, ids), reverse=True)
+    assert [order_id for page in pages for order_id in page] == [order_id for _, order_id in expected]
+    assert all(len(page) == 2 for page in pages[:-1])
+
+
+async def test_cursor_is_not_shifted_by_new_orders(engine, client, make_user):
+    owner_id, headers = make_user()
+    ids = _create_orders(engine, owner_id, [BASE] * 4)
+
+    first = (await client.get("/orders/", params={"limit": 2}, headers=headers)).json()
+    _create_orders(engine, owner_id, [BASE + timedelta(minutes=1), BASE])
+    second = (await client.get(
+        "/orders/", params={"limit": 2, "cursor": first["next_cursor"]}, headers=headers,
+    )).json()
+
+    seen = [item["id"] for item in first["items"] + second["items"]]
+    assert seen == sorted(ids, reverse=True)
+
+
+async def test_created_range_includes_from_and_excludes_to(engine, client, make_user):
+    owner_id, headers = make_user()
+    before, start, middle, end = _create_orders(engine, owner_id, [
+        BASE - timedelta(seconds=1),
+        BASE,
+        BASE + timedelta(minutes=30),
+        BASE + timedelta(hours=1),
+    ])
+
+    response = await client.get("/orders/", headers=headers, params={
+        "created_from": BASE.isoformat(),
+        "created_to": (BASE + timedelta(hours=1)).isoformat(),
+    })
+
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()["items"]] == [middle, start]
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "!!!", "MjAyNi0wMy0xMA"])
+async def test_invalid_cursor_is_rejected(client, make_user, cursor):
+    _, headers = make_user()
+
+    response = await client.get("/orders/", params={"cursor": cursor}, headers=headers)
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Cursor de paginação inválido."
@@ -0,0 +1,115 @@
+"""GET /orders/stats: rollups batem com a contagem direta de order_events e a mediana aproximada com a exata"""
+import math
+import random
+import statistics
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app.models.order import Order
+from app.models.order_event import OrderEvent
+from app.services.analytics_service import approximate_median, delivery_bucket
+from benchmarks.mocks import KNOWN_CEPS
+
+pytestmark = pytest.mark.anyio
+
+# Fator máximo entre a mediana aproximada e a exata (buckets crescem em √2)
+MEDIAN_TOLERANCE = math.sqrt(2)
+
+# Minutos entre a criação e a entrega de cada pedido
+DELIVERY_MINUTES = [3, 30, 95, 240, 700, 1500, 3000]
+
+
+def _order(i: int) -> dict:
+    return {
+        "origin_address": {"cep": KNOWN_CEPS[i], "number": str(i)},
+        "destination_address": {"cep": KNOWN_CEPS[i + 1], "number": str(i)},
+    }
+
+
+def _within_tolerance(approximate: float, exact: float) -> bool:
+    return exact / MEDIAN_TOLERANCE <= approximate <= exact * MEDIAN_TOLERANCE
+
+
+@pytest.fixture
+async def orders_with_events(client, make_user):
+    """Pedidos criados pelas três rotas de escrita, com trânsito, entrega e cancelamento"""
+    _, admin = make_user(role="admin")
+    created = [(await client.post("/orders/", json=_order(i), headers=admin)).json() for i in range(4)]
+    bulk = await client.post(
+        "/orders/bulk", json={"orders": [_order(i) for i in range(4, len(DELIVERY_MINUTES) + 1)]}, headers=admin
+    )
+    created += bulk.json()["results"]
+
+    now = datetime.utcnow()
+    scans = []
+    for order, minutes in zip(created, DELIVERY_MINUTES):
+        scans.append({"tracking_code": order["tracking_code"], "status": "in_transit",
+                      "timestamp": (now + timedelta(minutes=1)).isoformat()})
+        scans.append({"tracking_code": order["tracking_code"], "status": "delivered",
+                      "timestamp": (now + timedelta(minutes=minutes)).isoformat()})
+    response = await client.post("/orders/status/bulk", json={"scans": scans}, headers=admin)
+    assert response.json()["applied"] == len(scans), response.text
+
+    canceled = created[-1]
+    response = await client.patch(
+        f"/orders/{canceled['id']}/status", json={"status": "canceled"}, headers=admin
+    )
+    assert response.status_code == 200, response.text
+    return admin
+
+
+async def _stats(client, headers) -> dict:
+    today = date.today()
+    params = {"date_from": (today - timedelta(days=1)).isoformat(),
+              "date_to": (today + timedelta(days=3)).isoformat()}
+    response = await client.get("/orders/stats", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def test_rollup_totals_match_direct_count(engine, client, orders_with_events):
+    stats = await _stats(client, orders_with_events)
+
+    with engine.connect() as conn:
+        events = conn.execute(select(OrderEvent.status, OrderEvent.created_at)).all()
+    by_status = Counter(status for status, _ in events)
+    by_day = defaultdict(Counter)
+    for status, created_at in events:
+        by_day[created_at.date().isoformat()][status] += 1
+
+    assert {s: stats["totals"][s] for s in by_status} == dict(by_status)
+    assert sum(stats["totals"][s] for s in ("created", "in_transit", "delivered", "canceled")) == len(events)
+    assert {
+        day["day"]: {s: day[s] for s in by_day[day["day"]]} for day in stats["days"]
+    } == {day: dict(counts) for day, counts in by_day.items()}
+    [origin] = stats["by_origin_state"]
+    assert (origin["state"], origin["created"]) == ("SP", by_status["created"])
+
+
+async def test_median_delivery_matches_direct_computation(engine, client, orders_with_events):
+    stats = await _stats(client, orders_with_events)
+
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(OrderEvent.created_at, Order.created_at)
+            .join(Order, Order.id == OrderEvent.order_id)
+            .where(OrderEvent.status == "delivered")
+        ).all()
+    exact_hours = statistics.median(
+        (delivered_at - created_at).total_seconds() / 3600 for delivered_at, created_at in rows
+    )
+
+    assert len(rows) == len(DELIVERY_MINUTES)
+    assert _within_tolerance(stats["totals"]["median_delivery_hours"], exact_hours)
+
+
+def test_approximate_median_stays_within_one_bucket():
+    rng = random.Random(7)
+    for _ in range(50):
+        samples = [rng.lognormvariate(math.log(3 * 3600), 1.5) for _ in range(rng.randint(1, 500))]
+        histogram = Counter(delivery_bucket(seconds) for seconds in samples)
+
+        assert _within_tolerance(approximate_median(histogram), statistics.median(samples))
@@ -0,0 +1,107 @@
+"""POST /orders/bulk: falhas parciais, ordem dos ids, worker de geocoding e timeouts"""
+import asyncio
+
+import pytest
+from sqlalchemy import select
+
+from app.api.api_v1.endpoints import orders as orders_endpoint
+from app.core.config import settings
+from app.models.address import Address
+from app.models.geocoding_job import GeocodingJob
+from app.services.geocoding_worker import geocoding_worker
+from benchmarks.mocks import KNOWN_CEPS, UNKNOWN_CEP
+
+pytestmark = pytest.mark.anyio
+
+
+def _order(origin_cep: str, destination_cep: str, number: str) -> dict:
+    return {
+        "origin_address": {"cep": origin_cep, "number": f"{number}-o"},
+        "destination_address": {"cep": destination_cep, "number": f"{number}-d"},
+    }
+
+
+async def test_invalid_ceps_fail_only_their_items(client, make_user):
+    _, headers = make_user()
+    payload = {"orders": [
+        _order(KNOWN_CEPS[0], KNOWN_CEPS[1], "1"),
+        _order(UNKNOWN_CEP, KNOWN_CEPS[1], "2"),
+        _order(KNOWN_CEPS[2], "9999-999", "3"),  # 7 dígitos
+        _order(KNOWN_CEPS[3], KNOWN_CEPS[0], "4"),
+    ]}
+
+    response = await client.post("/orders/bulk", json=payload, headers=headers)
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert (body["created"], body["failed"]) == (2, 2)
+    assert [(r["index"], r["success"]) for r in body["results"]] == [
+        (0, True), (1, False), (2, False), (3, True),
+    ]
+    assert UNKNOWN_CEP in body["results"][1]["error"]
+    assert not body["results"][1]["retryable"]
+    assert "'9999-999'" in body["results"][2]["error"]
+
+
+async def test_created_ids_match_their_input_items(client, make_user):
+    _, headers = make_user()
+    payload = {"orders": [
+        _order(KNOWN_CEPS[i], KNOWN_CEPS[i + 50], str(i)) for i in range(30)
+    ]}
+
+    response = await client.post("/orders/bulk", json=payload, headers=headers)
+    assert response.status_code == 200, response.text
+
+    for result in response.json()["results"]:
+        detail = (await client.get(f"/orders/{result['id']}", headers=headers)).json()
+        assert detail["tracking_code"] == result["tracking_code"]
+        sent = payload["orders"][result["index"]]
+        assert detail["origin_address"]["number"] == sent["origin_address"]["number"]
+        assert detail["origin_address"]["cep"] == sent["origin_address"]["cep"]
+        assert detail["destination_address"]["number"] == sent["destination_address"]["number"]
+        assert detail["destination_address"]["cep"] == sent["destination_address"]["cep"]
+
+
+async def test_every_address_goes_to_the_geocoding_worker(engine, client, make_user, monkeypatch):
+    enqueued = []
+    monkeypatch.setattr(geocoding_worker, "enqueue", enqueued.extend)
+    _, headers = make_user()
+    payload = {"orders": [_order(KNOWN_CEPS[i], KNOWN_CEPS[i + 1], str(i)) for i in range(3)]}
+
+    response = await client.post("/orders/bulk", json=payload, headers=headers)
+    assert response.status_code == 200, response.text
+
+    with engine.connect() as conn:
+        jobs = conn.execute(select(GeocodingJob.id, GeocodingJob.address_id)).all()
+        coordinates = conn.execute(select(Address.latitude)).scalars().all()
+    assert sorted(enqueued) == sorted(job.id for job in jobs)
+    assert len(jobs) == 6
+    # Nada de Nominatim dentro do request
+    assert coordinates == [None] * 6
+
+
+async def test_cep_timeout_is_reported_as_retryable(client, make_user, monkeypatch):
+    slow_cep = KNOWN_CEPS[9]
+    fetch = orders_endpoint.fetch_address_by_cep
+
+    async def slow_fetch(cep: str):
+        if cep == slow_cep:
+            await asyncio.sleep(5)
+        return await fetch(cep)
+
+    monkeypatch.setattr(orders_endpoint, "fetch_address_by_cep", slow_fetch)
+    monkeypatch.setattr(settings, "ADDRESS_RESOLUTION_TIMEOUT_SECONDS", 0.2)
+    _, headers = make_user()
+    payload = {"orders": [
+        _order(KNOWN_CEPS[0], KNOWN_CEPS[1], "1"),
+        _order(KNOWN_CEPS[0], slow_cep, "2"),
+    ]}
+
+    response = await client.post("/orders/bulk", json=payload, headers=headers)
+
+    assert response.status_code == 200, response.text
+    ok, timed_out = response.json()["results"]
+    assert ok["success"]
+    assert not timed_out["success"]
+    assert timed_out["retryable"]
+    assert "Tempo esgotado" in timed_out["error"]
@@ -0,0 +1,43 @@
+"""/health/outbox: só para admin, sem URLs de webhook nos nomes nem nos erros"""
+import pytest
+
+from app.services import outbox_service
+from app.services.outbox_service import OutboxDispatcher
+
+pytestmark = pytest.mark.anyio
+
+WEBHOOK_URL = "https://hooks.example.com/orders?token=s3cr3t"
+
+
+@pytest.fixture
+def failing_webhook(monkeypatch):
+    dispatcher = OutboxDispatcher()
+
+    async def handler(changes):
+        raise AssertionError("não deveria ser chamado")
+
+    dispatcher.register(f"webhook:{WEBHOOK_URL}", handler, label="webhook#0")
+    consumer = dispatcher._consumers[f"webhook:{WEBHOOK_URL}"]
+    dispatcher._fail(consumer, RuntimeError(
+        f"Server error '500 Internal Server Error' for url '{WEBHOOK_URL}'"
+    ))
+    monkeypatch.setattr(outbox_service, "outbox_dispatcher", dispatcher)
+
+
+async def test_outbox_health_requires_admin(client, make_user, failing_webhook):
+    _, user = make_user()
+
+    assert (await client.get("/health/outbox")).status_code == 401
+    assert (await client.get("/health/outbox", headers=user)).status_code == 403
+
+
+async def test_outbox_health_hides_webhook_urls(client, make_user, failing_webhook):
+    _, admin = make_user(role="admin")
+
+    response = await client.get("/health/outbox", headers=admin)
+
+    assert response.status_code == 200
+    assert "hooks.example.com" not in response.text
+    consumer = response.json()["consumers"]["webhook#0"]
+    assert consumer["failures"] == 1
+    assert consumer["last_error"] == "Server error '500 Internal Server Error' for url '<url>'"
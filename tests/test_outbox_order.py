@@ -0,0 +1,90 @@
+"""
+Feed do outbox em ordem de commit: a posição é dada depois do commit, então
+um id menor commitado depois não fica para trás do cursor, e as escritas de
+pedidos não disputam a sequência.
+"""
+import pytest
+
+from app.database import AsyncSessionLocal, SessionLocal
+from app.models.outbox_event import OutboxEvent
+from app.services.outbox_service import assign_positions, fetch_changes
+
+pytestmark = pytest.mark.anyio
+
+ORDER = {
+    "origin_address": {"cep": "01310-100", "number": "1000"},
+    "destination_address": {"cep": "01310-200", "number": "50"},
+}
+
+
+def _event(event_id: int) -> OutboxEvent:
+    return OutboxEvent(
+        id=event_id,
+        event_type="order.status_changed",
+        order_id=1,
+        tracking_code="DT-ORDER001",
+        payload="{}",
+    )
+
+
+def _commit_event(event_id: int) -> None:
+    with SessionLocal() as db:
+        db.add(_event(event_id))
+        db.commit()
+
+
+async def _assign() -> int:
+    async with AsyncSessionLocal() as db:
+        return await assign_positions(db)
+
+
+async def _feed(since: int) -> list[tuple[int, int]]:
+    async with AsyncSessionLocal() as db:
+        return [(row.id, row.position) for row in await fetch_changes(db, since, 100)]
+
+
+async def test_feed_follows_commit_order_not_id_order(engine):
+    # O INSERT de id 50 aconteceu antes, mas a transação commitou depois
+    _commit_event(9_000_100)
+    assert await _assign() == 1
+    [(_, first)] = await _feed(0)
+    _commit_event(9_000_050)
+    assert await _assign() == 1
+
+    assert await _feed(first) == [(9_000_050, first + 1)]
+
+
+async def test_uncommitted_events_wait_for_the_next_round(engine):
+    with SessionLocal() as writer:
+        writer.add(_event(9_000_200))
+        writer.flush()
+
+        # Transação em andamento: invisível, não é numerada nem trava a numeração
+        assert await _assign() == 0
+
+        writer.commit()
+
+    assert await _assign() == 1
+    assert [event_id for event_id, _ in await _feed(0)] == [9_000_200]
+
+
+async def test_order_writes_do_not_touch_the_sequence(client, make_user, count_queries):
+    _, headers = make_user()
+
+    with count_queries() as statements:
+        response = await client.post("/orders/", json=ORDER, headers=headers)
+
+    assert response.status_code == 201, response.text
+    assert any("outbox_events" in sql for sql in statements)
+    assert not any("outbox_sequence" in sql for sql in statements)
+
+
+async def test_feed_numbers_new_events_on_read(client, make_user):
+    _, user = make_user()
+    _, admin = make_user(role="admin")
+    created = (await client.post("/orders/", json=ORDER, headers=user)).json()
+
+    page = (await client.get("/events/changes", params={"since": 0}, headers=admin)).json()
+
+    assert [item["tracking_code"] for item in page["items"]] == [created["tracking_code"]]
+    assert page["next_cursor"] == page["items"][0]["position"]
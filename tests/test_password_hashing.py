@@ -0,0 +1,41 @@
+"""Senhas: cadastro, login e scripts passam todos pelo PasswordHasher"""
+import pytest
+from sqlalchemy import insert
+
+from app.models.user import User
+from app.utils.security import password_hasher
+
+pytestmark = pytest.mark.anyio
+
+
+async def _login(client, email: str, password: str):
+    return await client.post("/auth/login", data={"username": email, "password": password})
+
+
+async def test_signup_then_login(client):
+    created = await client.post("/users/", json={"email": "ana@example.com", "password": "s3cret!"})
+    assert created.status_code in (200, 201), created.text
+
+    completed = password_hasher.completed
+    assert (await _login(client, "ana@example.com", "s3cret!")).status_code == 200
+    assert (await _login(client, "ana@example.com", "wrong")).status_code == 401
+    assert password_hasher.completed == completed + 2
+
+
+async def test_script_hash_logs_in(engine, client):
+    # Mesmo caminho do create_admin.py e do seed do benchmark
+    with engine.begin() as conn:
+        conn.execute(insert(User), {
+            "email": "admin@example.com",
+            "hashed_password": password_hasher.hash_sync("admin123"),
+            "role": "admin",
+        })
+
+    assert (await _login(client, "admin@example.com", "admin123")).status_code == 200
+
+
+async def test_unknown_email_still_costs_a_verification(client):
+    completed = password_hasher.completed
+
+    assert (await _login(client, "nobody@example.com", "x")).status_code == 401
+    assert password_hasher.completed == completed + 1
@@ -0,0 +1,83 @@
+"""
+Confere via EXPLAIN QUERY PLAN se as queries quentes usam índice.
+
+Os statements não são reescritos aqui: as rotas são chamadas de verdade e
+cada SELECT que elas executam (com os parâmetros reais) passa pelo EXPLAIN.
+Qualquer varredura completa de tabela (SCAN sem índice) falha o teste.
+"""
+import pytest
+from sqlalchemy import event
+
+from app.database import async_engine
+
+pytestmark = pytest.mark.anyio
+
+ORDER = {
+    "origin_address": {"cep": "01310-100", "number": "1000"},
+    "destination_address": {"cep": "01310-200", "number": "50"},
+}
+
+
+@pytest.fixture
+def capture_selects():
+    """Grava (statement, parâmetros) de cada SELECT executado no engine async"""
+    captured: list[tuple[str, tuple]] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and not executemany:
+            captured.append((statement, tuple(parameters)))
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    yield captured
+    event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+
+def _full_scans(engine, statement: str, parameters: tuple) -> list[str]:
+    with engine.connect() as conn:
+        plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        details = [row[-1] for row in plan]
+    # "SCAN orders USING INDEX ..." percorre o índice na ordem do ORDER BY: ok
+    # "SCAN n CONSTANT ROWS" é a lista de um IN (VALUES ...)
+    return [
+        d for d in details
+        if d.startswith("SCAN") and "INDEX" not in d and "CONSTANT ROWS" not in d
+    ]
+
+
+async def _hot_requests(client, make_user) -> None:
+    _, user = make_user()
+    _, admin = make_user(role="admin")
+
+    created = await client.post("/orders/", json=ORDER, headers=user)
+    assert created.status_code == 201, created.text
+    await client.post("/orders/", json=ORDER, headers=user)
+    order = created.json()
+
+    first_page = (await client.get("/orders/", params={"limit": 1}, headers=user)).json()
+    requests = [
+        client.get("/orders/", params={"limit": 1, "cursor": first_page["next_cursor"]}, headers=user),
+        client.get("/orders/", params={"include_last_event": "true"}, headers=user),
+        client.get("/orders/all", headers=admin),
+        client.get("/orders/all", params={"status_filter": "in_transit"}, headers=admin),
+        client.get("/orders/all", params={"created_from": "2026-01-01T00:00:00"}, headers=admin),
+        client.get(f"/orders/{order['id']}", headers=user),
+        client.get(f"/track/{order['tracking_code']}"),
+        client.get("/track/DT-NOTFOUND"),  # cai no arquivo
+        client.get("/events/changes", params={"since": 0}, headers=admin),
+    ]
+    for request in requests:
+        response = await request
+        assert response.status_code in (200, 404), response.text
+
+
+async def test_hot_queries_use_indexes(engine, client, make_user, capture_selects):
+    await _hot_requests(client, make_user)
+    assert len(capture_selects) > 10
+
+    failures = {}
+    for statement, parameters in capture_selects:
+        scans = _full_scans(engine, statement, parameters)
+        if scans:
+            failures[" ".join(statement.split())] = scans
+
+    assert not failures, "\n".join(f"{sql}\n   -> {scans}" for sql, scans in failures.items())
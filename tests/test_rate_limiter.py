@@ -0,0 +1,139 @@
+"""Fila do Nominatim: prioridade, agrupamento, limite de taxa e jobs abandonados"""
+import asyncio
+import time
+
+import pytest
+
+from app.utils.rate_limiter import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_SPECULATIVE,
+    TokenBucketScheduler,
+)
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def scheduler():
+    scheduler = TokenBucketScheduler(rate=50, burst=1)
+    yield scheduler
+    await scheduler.close()
+
+
+def _recorder(calls: list):
+    def factory(key):
+        async def call():
+            calls.append(key)
+            return key.upper()
+        return call
+    return factory
+
+
+async def test_interactive_jobs_run_before_background(scheduler):
+    calls = []
+    factory = _recorder(calls)
+
+    results = await asyncio.gather(
+        scheduler.submit("bg1", factory("bg1"), PRIORITY_BACKGROUND),
+        scheduler.submit("bg2", factory("bg2"), PRIORITY_BACKGROUND),
+        scheduler.submit("spec", factory("spec"), PRIORITY_SPECULATIVE),
+        scheduler.submit("ui", factory("ui"), PRIORITY_INTERACTIVE),
+    )
+
+    assert results == ["BG1", "BG2", "SPEC", "UI"]
+    assert calls == ["ui", "spec", "bg1", "bg2"]
+
+
+async def test_identical_jobs_are_coalesced(scheduler):
+    calls = []
+    factory = _recorder(calls)
+
+    results = await asyncio.gather(*(scheduler.submit("same", factory("same")) for _ in range(5)))
+
+    assert results == ["SAME"] * 5
+    assert calls == ["same"]
+    assert scheduler.stats()["coalesced"] == 4
+
+
+async def test_interactive_submit_promotes_queued_job(scheduler):
+    calls = []
+    factory = _recorder(calls)
+
+    await asyncio.gather(
+        scheduler.submit("bg", factory("bg"), PRIORITY_BACKGROUND),
+        scheduler.submit("other", factory("other"), PRIORITY_SPECULATIVE),
+        scheduler.submit("bg", factory("bg"), PRIORITY_INTERACTIVE),
+    )
+
+    assert calls == ["bg", "other"]
+
+
+async def test_rate_limit_spaces_calls():
+    scheduler = TokenBucketScheduler(rate=20, burst=1)
+    calls = []
+    try:
+        started = time.monotonic()
+        await asyncio.gather(*(
+            scheduler.submit(i, _recorder(calls)(str(i))) for i in range(5)
+        ))
+        elapsed = time.monotonic() - started
+    finally:
+        await scheduler.close()
+
+    # 1 token na rajada + 4 a 20/s
+    assert elapsed >= 4 / 20 * 0.9
+    assert len(calls) == 5
+
+
+async def test_pause_holds_the_queue(scheduler):
+    calls = []
+    await scheduler.submit("warmup", _recorder(calls)("warmup"))
+
+    scheduler.pause(0.2)
+    started = time.monotonic()
+    await scheduler.submit("after", _recorder(calls)("after"))
+
+    assert time.monotonic() - started >= 0.18
+    assert scheduler.stats()["throttled"] == 1
+
+
+async def test_abandoned_job_leaves_queue_without_spending_token():
+    scheduler = TokenBucketScheduler(rate=5, burst=1)
+    calls = []
+    factory = _recorder(calls)
+    try:
+        # Gasta o token da rajada: o próximo job espera ~200 ms na fila
+        await scheduler.submit("first", factory("first"))
+        speculative = asyncio.create_task(
+            scheduler.submit("spec", factory("spec"), PRIORITY_SPECULATIVE)
+        )
+        await asyncio.sleep(0.01)
+        assert scheduler.spare_tokens() == 0
+
+        speculative.cancel()
+        await asyncio.sleep(0.3)
+        assert calls == ["first"]
+        assert scheduler.stats()["dropped"] == 1
+
+        # O token que o abandonado usaria continua disponível
+        started = time.monotonic()
+        await scheduler.submit("next", factory("next"))
+        assert time.monotonic() - started < 0.1
+    finally:
+        await scheduler.close()
+
+
+async def test_abandoned_job_keeps_running_for_remaining_waiters(scheduler):
+    calls = []
+    factory = _recorder(calls)
+    await scheduler.submit("warmup", factory("warmup"))
+
+    first = asyncio.create_task(scheduler.submit("shared", factory("shared"), PRIORITY_SPECULATIVE))
+    second = asyncio.create_task(scheduler.submit("shared", factory("shared")))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == "SHARED"
+    assert calls == ["warmup", "shared"]
+    assert scheduler.stats()["dropped"] == 0
@@ -0,0 +1,52 @@
+"""Sincronização das sessões revogadas: startup sem banco não derruba a API"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.services import session_service
+from app.services.session_service import SessionRevocationSync, is_session_revoked
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_startup_survives_database_outage_and_retries(monkeypatch):
+    calls = []
+
+    async def flaky_load():
+        calls.append(datetime.utcnow())
+        if len(calls) < 3:
+            raise OperationalError("SELECT ...", {}, Exception("connection refused"))
+        return {"sid-from-other-worker": datetime.utcnow() + timedelta(minutes=5)}
+
+    monkeypatch.setattr(session_service, "_load_revoked_sessions", flaky_load)
+    monkeypatch.setattr(session_service, "_STARTUP_RETRY_SECONDS", 0.01)
+    monkeypatch.setattr(session_service, "_revoked_sessions", {})
+    sync = SessionRevocationSync()
+
+    await sync.start()
+    assert sync.last_synced_at is None
+    try:
+        for _ in range(100):
+            if sync.last_synced_at is not None:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        await sync.stop()
+
+    assert len(calls) == 3
+    assert is_session_revoked("sid-from-other-worker")
+
+
+async def test_local_logouts_survive_a_sync(monkeypatch):
+    async def load():
+        return {}
+
+    monkeypatch.setattr(session_service, "_load_revoked_sessions", load)
+    monkeypatch.setattr(session_service, "_revoked_sessions", {})
+    session_service._mark_revoked("sid-local", datetime.utcnow())
+
+    await SessionRevocationSync().sync()
+
+    assert is_session_revoked("sid-local")
@@ -0,0 +1,144 @@
+"""POST /orders/status/bulk: ordem, duplicadas, transições inválidas, corrida e leituras antigas"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import async_engine
+from app.main import app
+from app.models.scan_idempotency_key import ScanIdempotencyKey
+from app.services.db_service import get_async_db
+
+pytestmark = pytest.mark.anyio
+
+ORDER = {
+    "origin_address": {"cep": "01310-100", "number": "1000"},
+    "destination_address": {"cep": "01310-200", "number": "50"},
+}
+
+
+@pytest.fixture
+async def scan(client, make_user):
+    """Cria um pedido e devolve (código, função que envia um lote de leituras)"""
+    _, admin = make_user(role="admin")
+    created = await client.post("/orders/", json=ORDER, headers=admin)
+    assert created.status_code == 201, created.text
+    code = created.json()["tracking_code"]
+
+    async def send(*scans: tuple[str, datetime], **extra):
+        payload = {"scans": [
+            {"tracking_code": extra.get("tracking_code", code), "status": status,
+             "timestamp": at.isoformat()}
+            for status, at in scans
+        ]}
+        return await client.post("/orders/status/bulk", json=payload, headers=admin)
+
+    return code, send
+
+
+async def _timeline(client, code: str) -> list[str]:
+    events = (await client.get(f"/track/{code}")).json()["events"]
+    return [event["status"] for event in reversed(events)]
+
+
+def _later(minutes: int) -> datetime:
+    return datetime.utcnow() + timedelta(minutes=minutes)
+
+
+async def test_scans_apply_in_timestamp_order(client, scan):
+    code, send = scan
+
+    response = await send(("delivered", _later(2)), ("in_transit", _later(1)))
+
+    body = response.json()
+    assert (body["applied"], body["rejected"]) == (2, 0)
+    assert await _timeline(client, code) == ["created", "in_transit", "delivered"]
+
+
+async def test_scan_after_final_status_is_rejected(client, scan):
+    code, send = scan
+
+    body = (await send(("delivered", _later(1)), ("in_transit", _later(2)))).json()
+
+    assert [r["applied"] for r in body["results"]] == [True, False]
+    assert "delivered" in body["results"][1]["error"]
+    assert body["rejected"] == 1
+    assert await _timeline(client, code) == ["created", "delivered"]
+
+
+async def test_unknown_tracking_code_is_rejected(scan):
+    _, send = scan
+
+    body = (await send(("in_transit", _later(1)), tracking_code="DT-NOTFOUND")).json()
+
+    assert body["results"][0]["error"] == "Pedido não encontrado."
+
+
+async def test_duplicates_in_the_same_batch(client, scan):
+    code, send = scan
+    at = _later(1)
+
+    body = (await send(("in_transit", at), ("in_transit", at))).json()
+
+    assert (body["applied"], body["duplicates"]) == (1, 1)
+    assert await _timeline(client, code) == ["created", "in_transit"]
+
+
+async def test_resent_batch_is_all_duplicates(client, scan):
+    code, send = scan
+    scans = (("in_transit", _later(1)), ("delivered", _later(2)))
+    await send(*scans)
+
+    body = (await send(*scans)).json()
+
+    assert (body["applied"], body["duplicates"], body["rejected"]) == (0, 2, 0)
+    assert await _timeline(client, code) == ["created", "in_transit", "delivered"]
+
+
+async def test_scan_older_than_last_event_is_stale(client, scan):
+    code, send = scan
+    await send(("in_transit", _later(10)))
+
+    # Scanner que ficou offline manda uma leitura anterior
+    body = (await send(("in_transit", _later(5)), ("delivered", _later(11)))).json()
+
+    assert [(r["applied"], r["stale"]) for r in body["results"]] == [(False, True), (True, False)]
+    assert (body["stale"], body["rejected"]) == (1, 0)
+    assert await _timeline(client, code) == ["created", "in_transit", "delivered"]
+
+
+async def test_scan_older_than_creation_is_stale(client, scan):
+    code, send = scan
+
+    body = (await send(("delivered", datetime.utcnow() - timedelta(days=1)))).json()
+
+    assert body["results"][0]["stale"]
+    assert await _timeline(client, code) == ["created"]
+
+
+async def test_concurrent_batch_with_same_keys_returns_409(client, scan):
+    code, send = scan
+
+    class RacingSession(AsyncSession):
+        """Outra requisição grava as mesmas chaves entre a leitura e o INSERT"""
+
+        async def execute(self, statement, params=None, **kwargs):
+            table = getattr(statement, "table", None)
+            if table is not None and table.name == ScanIdempotencyKey.__tablename__ and params:
+                await super().execute(insert(ScanIdempotencyKey), params[:1])
+            return await super().execute(statement, params, **kwargs)
+
+    async def racing_db():
+        async with RacingSession(async_engine, expire_on_commit=False) as db:
+            yield db
+
+    app.dependency_overrides[get_async_db] = racing_db
+    try:
+        response = await send(("in_transit", _later(1)))
+    finally:
+        app.dependency_overrides.pop(get_async_db)
+
+    assert response.status_code == 409
+    # Nada do lote foi gravado
+    assert await _timeline(client, code) == ["created"]
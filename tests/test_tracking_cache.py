@@ -0,0 +1,57 @@
+"""Cache do rastreio público: invalidação durante a leitura do banco"""
+import asyncio
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.services import tracking_cache
+from app.services.tracking_cache import (
+    get_cached_tracking,
+    invalidate_tracking,
+    store_tracking,
+    tracking_generation,
+)
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_invalidation_during_db_read_skips_stale_fill():
+    # GET: cache vazio, lê a geração e vai ao banco...
+    generation = tracking_generation("DT-RACE0001")
+    stale = b'{"status":"created"}'
+
+    # ...enquanto isso um PATCH commita e invalida o código
+    invalidate_tracking("DT-RACE0001")
+    await asyncio.gather(*tracking_cache._pending_invalidations)
+
+    etag = await store_tracking("DT-RACE0001", stale, generation)
+    assert etag == tracking_cache.compute_etag(stale)
+    assert await get_cached_tracking("DT-RACE0001") is None
+
+    # O próximo GET lê depois do commit e pode gravar
+    fresh = b'{"status":"in_transit"}'
+    await store_tracking("DT-RACE0001", fresh, tracking_generation("DT-RACE0001"))
+    assert await get_cached_tracking("DT-RACE0001") == (tracking_cache.compute_etag(fresh), fresh)
+
+
+async def test_generation_outlives_response_cache_evictions():
+    # Muitos outros códigos invalidados não tiram a geração do código lido
+    generation = tracking_generation("DT-RACE0002")
+    invalidate_tracking("DT-RACE0002")
+    for i in range(settings.TRACKING_CACHE_MAX_SIZE + 10):
+        tracking_cache._generations.set(f"DT-OTHER{i}", i)
+
+    await store_tracking("DT-RACE0002", b'{"status":"created"}', generation)
+    assert await get_cached_tracking("DT-RACE0002") is None
+
+
+def test_generations_expire_by_age_only():
+    generations = tracking_cache._GenerationMap(ttl_seconds=0.05)
+    generations.set("DT-OLD", 1)
+    assert generations.get("DT-OLD") == 1
+
+    time.sleep(0.06)
+    generations.set("DT-NEW", 2)
+    assert generations.get("DT-OLD") == 0
+    assert len(generations) == 1
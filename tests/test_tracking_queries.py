@@ -0,0 +1,63 @@
+"""GET /track/{code} faz sempre 2 queries, qualquer que seja o tamanho da timeline"""
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from app.models.address import Address
+from app.models.order import Order
+from app.models.order_event import OrderEvent, STATUS_LABELS
+
+pytestmark = pytest.mark.anyio
+
+
+def _create_order(engine, owner_id: int, events: int) -> str:
+    """Pedido com `events` eventos na timeline; retorna o código de rastreio"""
+    code = f"DT-{uuid.uuid4().hex[:8].upper()}"
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        origin_id, destination_id = conn.scalars(
+            insert(Address).returning(Address.id, sort_by_parameter_order=True),
+            [
+                {"cep": "01310100", "street": "Avenida Paulista", "number": "1000",
+                 "city": "São Paulo", "state": "SP"},
+                {"cep": "20040020", "street": "Avenida Rio Branco", "number": "1",
+                 "city": "Rio de Janeiro", "state": "RJ"},
+            ],
+        ).all()
+        statuses = ["created"] + ["in_transit"] * (events - 1)
+        order_id = conn.execute(
+            insert(Order).returning(Order.id),
+            {
+                "tracking_code": code,
+                "status": statuses[-1],
+                "owner_id": owner_id,
+                "origin_address_id": origin_id,
+                "destination_address_id": destination_id,
+                "event_count": events,
+            },
+        ).scalar_one()
+        conn.execute(insert(OrderEvent), [
+            {
+                "order_id": order_id,
+                "status": status,
+                "status_label": STATUS_LABELS[status],
+                "created_at": now + timedelta(minutes=i),
+            }
+            for i, status in enumerate(statuses)
+        ])
+    return code
+
+
+@pytest.mark.parametrize("events", [1, 4, 50])
+async def test_tracking_query_count_does_not_grow_with_events(engine, client, make_user, count_queries, events):
+    owner_id, _ = make_user()
+    code = _create_order(engine, owner_id, events)
+
+    with count_queries() as statements:
+        response = await client.get(f"/track/{code}")
+
+    assert response.status_code == 200
+    assert len(response.json()["events"]) == events
+    assert len(statements) == 2
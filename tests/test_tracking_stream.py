@@ -0,0 +1,252 @@
+"""
+Rastreio ao vivo (SSE e WebSocket): snapshot antes dos eventos, resync no
+estouro da fila e assinatura desfeita ao desconectar ou em 404.
+
+As conexões são dirigidas direto pela interface ASGI: o ASGITransport do
+httpx só devolve a resposta inteira, e um stream nunca termina sozinho.
+"""
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.api.api_v1.endpoints import tracking as tracking_endpoint
+from app.main import app
+from app.services.tracking_hub import start_tracking_hub, stop_tracking_hub, tracking_hub
+
+pytestmark = pytest.mark.anyio
+
+ORDER = {
+    "origin_address": {"cep": "01310-100", "number": "1000"},
+    "destination_address": {"cep": "01310-200", "number": "50"},
+}
+
+
+class AsgiConnection:
+    """Uma conexão ao app: o teste manda mensagens em `inbox` e lê o que sai em `outbox`"""
+
+    def __init__(self, scope: dict, *first_messages: dict):
+        self.inbox: asyncio.Queue[dict] = asyncio.Queue()
+        self.outbox: asyncio.Queue[dict] = asyncio.Queue()
+        for message in first_messages:
+            self.inbox.put_nowait(message)
+        self.task = asyncio.create_task(app(scope, self.inbox.get, self.outbox.put))
+
+    async def next(self) -> dict:
+        return await asyncio.wait_for(self.outbox.get(), 2)
+
+    async def finished(self) -> None:
+        await asyncio.wait_for(self.task, 2)
+
+
+def _scope(kind: str, path: str) -> dict:
+    return {
+        "type": kind,
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http" if kind == "http" else "ws",
+        "path": f"/api/v1/track/{path}",
+        "raw_path": f"/api/v1/track/{path}".encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"test")],
+        "server": ("test", 80),
+        "client": ("127.0.0.1", 1234),
+    }
+
+
+def open_sse(code: str) -> AsgiConnection:
+    return AsgiConnection(_scope("http", f"{code}/stream"), {"type": "http.request", "body": b""})
+
+
+def open_ws(code: str) -> AsgiConnection:
+    return AsgiConnection(_scope("websocket", f"{code}/ws"), {"type": "websocket.connect"})
+
+
+async def _sse_event(connection: AsgiConnection) -> tuple[str, dict]:
+    """Próximo evento SSE (ignora heartbeats) como (nome, dados)"""
+    while True:
+        chunk = (await connection.next())["body"].decode()
+        if chunk.startswith("event: "):
+            name, data = chunk.strip().split("\n")
+            return name.removeprefix("event: "), json.loads(data.removeprefix("data: "))
+
+
+async def _ws_message(connection: AsgiConnection) -> dict:
+    message = await connection.next()
+    assert message["type"] == "websocket.send", message
+    return json.loads(message["text"])
+
+
+@pytest.fixture
+async def hub():
+    await start_tracking_hub()
+    yield tracking_hub
+    await stop_tracking_hub()
+
+
+@pytest.fixture
+async def order(client, make_user):
+    """(código de rastreio, função que registra um novo status)"""
+    _, admin = make_user(role="admin")
+    created = await client.post("/orders/", json=ORDER, headers=admin)
+    assert created.status_code == 201, created.text
+    code = created.json()["tracking_code"]
+
+    async def scan(status: str, minutes: int = 1):
+        at = (datetime.utcnow() + timedelta(minutes=minutes)).isoformat()
+        payload = {"scans": [{"tracking_code": code, "status": status, "timestamp": at}]}
+        response = await client.post("/orders/status/bulk", json=payload, headers=admin)
+        assert response.json()["applied"] == 1, response.text
+
+    return code, scan
+
+
+@pytest.fixture
+def event_during_snapshot(monkeypatch, hub):
+    """Um evento chega ao hub enquanto o snapshot ainda está sendo lido do banco"""
+    get_body = tracking_endpoint.get_tracking_body
+
+    async def racing_get_body(db, code):
+        hub.deliver(code, b'{"type":"event","status":"in_transit"}')
+        return await get_body(db, code)
+
+    monkeypatch.setattr(tracking_endpoint, "get_tracking_body", racing_get_body)
+
+
+# --- SSE ---
+
+async def test_sse_sends_snapshot_then_live_events(hub, order):
+    code, scan = order
+    stream = open_sse(code)
+
+    start = await stream.next()
+    assert start["status"] == 200
+    assert (b"content-type", b"text/event-stream; charset=utf-8") in start["headers"]
+    name, snapshot = await _sse_event(stream)
+    assert (name, snapshot["tracking_code"]) == ("snapshot", code)
+
+    await scan("in_transit")
+
+    name, update = await _sse_event(stream)
+    assert (name, update["status"]) == ("event", "in_transit")
+    stream.inbox.put_nowait({"type": "http.disconnect"})
+    await stream.finished()
+
+
+async def test_sse_event_during_snapshot_comes_after_it(hub, order, event_during_snapshot):
+    code, _ = order
+    stream = open_sse(code)
+    await stream.next()
+
+    assert (await _sse_event(stream))[0] == "snapshot"
+    assert (await _sse_event(stream))[0] == "event"
+    stream.inbox.put_nowait({"type": "http.disconnect"})
+    await stream.finished()
+
+
+async def test_sse_overflow_sends_resync_and_ends(hub, order, monkeypatch):
+    code, _ = order
+    monkeypatch.setattr(hub, "queue_size", 2)
+    stream = open_sse(code)
+    await stream.next()
+    assert (await _sse_event(stream))[0] == "snapshot"
+
+    # Cliente lento: três mensagens seguidas numa fila de duas
+    for _ in range(3):
+        hub.deliver(code, b'{"type":"event"}')
+
+    assert (await _sse_event(stream))[0] == "resync"
+    assert not (await stream.next()).get("more_body", False)
+    await stream.finished()
+    assert hub.stats()["subscribers"] == 0
+    assert hub.overflowed == 1
+
+
+async def test_sse_disconnect_unsubscribes(hub, order):
+    code, _ = order
+    stream = open_sse(code)
+    await stream.next()
+    await _sse_event(stream)
+    assert hub.stats()["subscribers"] == 1
+
+    stream.inbox.put_nowait({"type": "http.disconnect"})
+    await stream.finished()
+
+    assert hub.stats()["subscribers"] == 0
+
+
+async def test_sse_unknown_code_is_404_without_subscription(hub, client):
+    stream = open_sse("DT-NOTFOUND")
+
+    assert (await stream.next())["status"] == 404
+    await stream.finished()
+    assert hub.stats()["subscribers"] == 0
+
+
+# --- WebSocket ---
+
+async def test_ws_sends_snapshot_then_live_events(hub, order):
+    code, scan = order
+    socket = open_ws(code)
+
+    assert (await socket.next())["type"] == "websocket.accept"
+    snapshot = await _ws_message(socket)
+    assert (snapshot["type"], snapshot["tracking"]["tracking_code"]) == ("snapshot", code)
+
+    await scan("in_transit")
+
+    assert (await _ws_message(socket))["status"] == "in_transit"
+    socket.inbox.put_nowait({"type": "websocket.disconnect", "code": 1000})
+    await socket.finished()
+
+
+async def test_ws_event_during_snapshot_comes_after_it(hub, order, event_during_snapshot):
+    code, _ = order
+    socket = open_ws(code)
+    await socket.next()
+
+    assert (await _ws_message(socket))["type"] == "snapshot"
+    assert (await _ws_message(socket))["type"] == "event"
+    socket.inbox.put_nowait({"type": "websocket.disconnect", "code": 1000})
+    await socket.finished()
+
+
+async def test_ws_overflow_sends_resync_and_closes(hub, order, monkeypatch):
+    code, _ = order
+    monkeypatch.setattr(hub, "queue_size", 2)
+    socket = open_ws(code)
+    await socket.next()
+    await _ws_message(socket)
+
+    for _ in range(3):
+        hub.deliver(code, b'{"type":"event"}')
+
+    assert (await _ws_message(socket))["type"] == "resync"
+    assert (await socket.next())["type"] == "websocket.close"
+    await socket.finished()
+    assert hub.stats()["subscribers"] == 0
+
+
+async def test_ws_disconnect_unsubscribes(hub, order):
+    code, _ = order
+    socket = open_ws(code)
+    await socket.next()
+    await _ws_message(socket)
+    assert hub.stats()["subscribers"] == 1
+
+    socket.inbox.put_nowait({"type": "websocket.disconnect", "code": 1000})
+    await socket.finished()
+
+    assert hub.stats()["subscribers"] == 0
+
+
+async def test_ws_unknown_code_closes_without_subscription(hub, client):
+    socket = open_ws("DT-NOTFOUND")
+
+    closed = await socket.next()
+    assert (closed["type"], closed["code"]) == ("websocket.close", 4404)
+    await socket.finished()
+    assert hub.stats()["subscribers"] == 0